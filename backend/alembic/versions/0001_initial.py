@@ -0,0 +1,102 @@
+"""Исходная схема
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=True),
+        sa.Column("username", sa.String(100), nullable=True),
+        sa.Column("full_name", sa.String(200)),
+        sa.Column("email", sa.String(100), nullable=True),
+        sa.Column("hashed_password", sa.String(255), nullable=True),
+        sa.Column("role", sa.String(20)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "tickets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_number", sa.String(20)),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("category", sa.String(50)),
+        sa.Column("priority", sa.String(20)),
+        sa.Column("status", sa.String(20)),
+        sa.Column("creator_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("assigned_to", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("location", sa.String(200)),
+        sa.Column("equipment_type", sa.String(100)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_tickets_id", "tickets", ["id"])
+    op.create_index("ix_tickets_ticket_number", "tickets", ["ticket_number"], unique=True)
+    op.create_index("ix_tickets_category", "tickets", ["category"])
+    op.create_index("ix_tickets_priority", "tickets", ["priority"])
+    op.create_index("ix_tickets_status", "tickets", ["status"])
+
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("comment_text", sa.Text(), nullable=False),
+        sa.Column("is_internal", sa.String(10)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_comments_id", "comments", ["id"])
+
+    op.create_table(
+        "ticket_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("action", sa.String(50), nullable=False),
+        sa.Column("old_value", sa.Text()),
+        sa.Column("new_value", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_ticket_history_id", "ticket_history", ["id"])
+
+    op.create_table(
+        "attachments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets.id"), nullable=False),
+        sa.Column("file_name", sa.String(255), nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("file_type", sa.String(50)),
+        sa.Column("uploaded_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_attachments_id", "attachments", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("attachments")
+    op.drop_table("ticket_history")
+    op.drop_table("comments")
+    op.drop_table("tickets")
+    op.drop_table("users")
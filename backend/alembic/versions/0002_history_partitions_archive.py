@@ -0,0 +1,164 @@
+"""Секционирование ticket_history по месяцам и архивные таблицы
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.services.partitions import partitions_ddl
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def archive_columns(*columns):
+    return [sa.Column(name, type_, primary_key=name == "id", autoincrement=False) for name, type_ in columns]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        # Пересоздаем ticket_history как секционированную таблицу, сохраняя последовательность id
+        op.execute("ALTER TABLE ticket_history RENAME TO ticket_history_old")
+        op.execute("ALTER INDEX ix_ticket_history_id RENAME TO ix_ticket_history_old_id")
+        op.execute(
+            """
+            CREATE TABLE ticket_history (
+                id INTEGER NOT NULL DEFAULT nextval('ticket_history_id_seq'),
+                ticket_id INTEGER NOT NULL REFERENCES tickets (id),
+                user_id INTEGER NOT NULL REFERENCES users (id),
+                action VARCHAR(50) NOT NULL,
+                old_value TEXT,
+                new_value TEXT,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+            """
+        )
+        op.execute("ALTER SEQUENCE ticket_history_id_seq OWNED BY ticket_history.id")
+
+        oldest = bind.execute(sa.text("SELECT MIN(created_at) FROM ticket_history_old")).scalar()
+        for statement in partitions_ddl(oldest or datetime.now(timezone.utc), settings.HISTORY_PARTITIONS_AHEAD):
+            op.execute(statement)
+
+        op.execute(
+            "INSERT INTO ticket_history (id, ticket_id, user_id, action, old_value, new_value, created_at) "
+            "SELECT id, ticket_id, user_id, action, old_value, new_value, COALESCE(created_at, now()) "
+            "FROM ticket_history_old"
+        )
+        op.drop_table("ticket_history_old")
+        op.create_index("ix_ticket_history_id", "ticket_history", ["id"])
+
+    op.create_index("ix_ticket_history_ticket_id", "ticket_history", ["ticket_id"])
+
+    op.create_table(
+        "tickets_archive",
+        *archive_columns(
+            ("id", sa.Integer()),
+            ("ticket_number", sa.String(20)),
+            ("title", sa.String(200)),
+            ("description", sa.Text()),
+            ("category", sa.String(50)),
+            ("priority", sa.String(20)),
+            ("status", sa.String(20)),
+            ("creator_id", sa.Integer()),
+            ("assigned_to", sa.Integer()),
+            ("location", sa.String(200)),
+            ("equipment_type", sa.String(100)),
+            ("created_at", sa.DateTime(timezone=True)),
+            ("updated_at", sa.DateTime(timezone=True)),
+            ("closed_at", sa.DateTime(timezone=True)),
+        ),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_tickets_archive_ticket_number", "tickets_archive", ["ticket_number"], unique=True)
+
+    op.create_table(
+        "comments_archive",
+        *archive_columns(
+            ("id", sa.Integer()),
+            ("ticket_id", sa.Integer()),
+            ("user_id", sa.Integer()),
+            ("comment_text", sa.Text()),
+            ("is_internal", sa.String(10)),
+            ("created_at", sa.DateTime(timezone=True)),
+        ),
+    )
+    op.create_index("ix_comments_archive_ticket_id", "comments_archive", ["ticket_id"])
+
+    op.create_table(
+        "ticket_history_archive",
+        *archive_columns(
+            ("id", sa.Integer()),
+            ("ticket_id", sa.Integer()),
+            ("user_id", sa.Integer()),
+            ("action", sa.String(50)),
+            ("old_value", sa.Text()),
+            ("new_value", sa.Text()),
+            ("created_at", sa.DateTime(timezone=True)),
+        ),
+    )
+    op.create_index("ix_ticket_history_archive_ticket_id", "ticket_history_archive", ["ticket_id"])
+
+    op.create_table(
+        "attachments_archive",
+        *archive_columns(
+            ("id", sa.Integer()),
+            ("ticket_id", sa.Integer()),
+            ("file_name", sa.String(255)),
+            ("file_path", sa.String(500)),
+            ("file_type", sa.String(50)),
+            ("uploaded_by", sa.Integer()),
+            ("created_at", sa.DateTime(timezone=True)),
+        ),
+    )
+    op.create_index("ix_attachments_archive_ticket_id", "attachments_archive", ["ticket_id"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    # Возвращаем архивные заявки в горячие таблицы
+    for table in ("tickets", "comments", "ticket_history", "attachments"):
+        columns = ", ".join(
+            column["name"] for column in sa.inspect(bind).get_columns(table)
+        )
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_archive")
+
+    for table in ("attachments_archive", "ticket_history_archive", "comments_archive", "tickets_archive"):
+        op.drop_table(table)
+
+    op.drop_index("ix_ticket_history_ticket_id", "ticket_history")
+
+    if bind.dialect.name == "postgresql":
+        op.execute("ALTER TABLE ticket_history RENAME TO ticket_history_partitioned")
+        op.execute("ALTER INDEX ix_ticket_history_id RENAME TO ix_ticket_history_partitioned_id")
+        op.execute(
+            """
+            CREATE TABLE ticket_history (
+                id INTEGER NOT NULL DEFAULT nextval('ticket_history_id_seq') PRIMARY KEY,
+                ticket_id INTEGER NOT NULL REFERENCES tickets (id),
+                user_id INTEGER NOT NULL REFERENCES users (id),
+                action VARCHAR(50) NOT NULL,
+                old_value TEXT,
+                new_value TEXT,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+            )
+            """
+        )
+        op.execute("ALTER SEQUENCE ticket_history_id_seq OWNED BY ticket_history.id")
+        op.execute("INSERT INTO ticket_history SELECT * FROM ticket_history_partitioned")
+        op.execute("DROP TABLE ticket_history_partitioned")
+        op.create_index("ix_ticket_history_id", "ticket_history", ["id"])
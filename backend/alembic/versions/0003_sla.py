@@ -0,0 +1,67 @@
+"""Сроки SLA заявок
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.sla import sla_targets, RESPONSE_TARGETS
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SLA_COLUMNS = ("response_due_at", "resolve_due_at", "due_at", "sla_breached_due_at")
+
+
+def upgrade() -> None:
+    for table in ("tickets", "tickets_archive"):
+        for column in SLA_COLUMNS:
+            op.add_column(table, sa.Column(column, sa.DateTime(timezone=True), nullable=True))
+
+    op.create_index(
+        "ix_tickets_due_at",
+        "tickets",
+        ["due_at"],
+        postgresql_where=sa.text("due_at IS NOT NULL"),
+        sqlite_where=sa.text("due_at IS NOT NULL"),
+    )
+
+    # Системные события (нарушение SLA) пишутся без пользователя
+    with op.batch_alter_table("ticket_history") as batch:
+        batch.alter_column("user_id", existing_type=sa.Integer(), nullable=True)
+
+    if op.get_bind().dialect.name == "postgresql":
+        # Сроки для существующих заявок считаются от даты создания
+        for category in ("hardware", "software"):
+            for priority in RESPONSE_TARGETS:
+                response, resolution = sla_targets(category, priority)
+                op.execute(
+                    sa.text(
+                        "UPDATE tickets SET response_due_at = created_at + :response, "
+                        "resolve_due_at = created_at + :resolution "
+                        "WHERE category = :category AND priority = :priority"
+                    ).bindparams(response=response, resolution=resolution, category=category, priority=priority)
+                )
+        op.execute(
+            "UPDATE tickets SET due_at = CASE status "
+            "WHEN 'new' THEN response_due_at WHEN 'in_progress' THEN resolve_due_at END"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("ticket_history") as batch:
+        batch.alter_column("user_id", existing_type=sa.Integer(), nullable=False)
+
+    op.drop_index("ix_tickets_due_at", "tickets")
+    for table in ("tickets", "tickets_archive"):
+        for column in SLA_COLUMNS:
+            op.drop_column(table, column)
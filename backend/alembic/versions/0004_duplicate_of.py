@@ -0,0 +1,42 @@
+"""Связь заявки с похожей открытой заявкой
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("tickets") as batch:
+        batch.add_column(sa.Column("duplicate_of", sa.Integer(), nullable=True))
+        batch.create_foreign_key(
+            "fk_tickets_duplicate_of", "tickets", ["duplicate_of"], ["id"], ondelete="SET NULL"
+        )
+    op.create_index(
+        "ix_tickets_duplicate_of",
+        "tickets",
+        ["duplicate_of"],
+        postgresql_where=sa.text("duplicate_of IS NOT NULL"),
+        sqlite_where=sa.text("duplicate_of IS NOT NULL"),
+    )
+    op.add_column("tickets_archive", sa.Column("duplicate_of", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("tickets_archive", "duplicate_of")
+    op.drop_index("ix_tickets_duplicate_of", "tickets")
+    with op.batch_alter_table("tickets") as batch:
+        batch.drop_constraint("fk_tickets_duplicate_of", type_="foreignkey")
+        batch.drop_column("duplicate_of")
@@ -0,0 +1,43 @@
+"""Outbox для отложенной записи истории
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.history import outbox_events
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ticket_history_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("events", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    # Неперенесенные события сохраняются в истории
+    outbox = sa.table("ticket_history_outbox", sa.column("id"), sa.column("events", sa.JSON()))
+    batches = op.get_bind().execute(sa.select(outbox.c.events).order_by(outbox.c.id)).scalars().all()
+    if batches:
+        history = sa.table(
+            "ticket_history",
+            *(sa.column(name) for name in ("ticket_id", "user_id", "action", "old_value", "new_value")),
+            sa.column("created_at", sa.DateTime(timezone=True)),
+        )
+        op.bulk_insert(history, outbox_events(batches))
+    op.drop_table("ticket_history_outbox")
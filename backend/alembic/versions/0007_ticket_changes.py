@@ -0,0 +1,43 @@
+"""Синхронизация изменений заявок: индекс updated_at и отметки об удалении
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Раньше updated_at заполнялся только при изменении заявки
+    op.execute("UPDATE tickets SET updated_at = created_at WHERE updated_at IS NULL")
+    with op.batch_alter_table("tickets") as batch:
+        batch.alter_column("updated_at", server_default=sa.func.now())
+    op.create_index("ix_tickets_updated_at", "tickets", ["updated_at"])
+
+    op.create_table(
+        "ticket_tombstones",
+        sa.Column("ticket_id", sa.Integer(), primary_key=True),
+        sa.Column("creator_id", sa.Integer(), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_ticket_tombstones_deleted_at", "ticket_tombstones", ["deleted_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ticket_tombstones_deleted_at", "ticket_tombstones")
+    op.drop_table("ticket_tombstones")
+
+    op.drop_index("ix_tickets_updated_at", "tickets")
+    with op.batch_alter_table("tickets") as batch:
+        batch.alter_column("updated_at", server_default=None)
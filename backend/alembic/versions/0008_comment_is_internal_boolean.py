@@ -0,0 +1,70 @@
+"""Булев is_internal у комментариев и индексы комментариев заявки
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("comments", "comments_archive")
+
+
+def upgrade() -> None:
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    for table in TABLES:
+        # Все, кроме "true" (в том числе NULL), считалось публичным комментарием
+        if postgresql:
+            op.execute(f"UPDATE {table} SET is_internal = 'false' WHERE is_internal IS DISTINCT FROM 'true'")
+        else:
+            # SQLite при пересоздании таблицы приводит значения через CAST: нужны 1/0
+            op.execute(f"UPDATE {table} SET is_internal = CASE WHEN is_internal = 'true' THEN 1 ELSE 0 END")
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(
+                "is_internal",
+                existing_type=sa.String(10),
+                type_=sa.Boolean(),
+                nullable=table == "comments_archive",
+                server_default=sa.false() if table == "comments" else None,
+                postgresql_using="is_internal = 'true'",
+            )
+
+    op.create_index("ix_comments_ticket_id", "comments", ["ticket_id", "created_at"])
+    op.create_index(
+        "ix_comments_public",
+        "comments",
+        ["ticket_id", "created_at"],
+        postgresql_where=sa.text("is_internal = false"),
+        sqlite_where=sa.text("is_internal = 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_comments_public", "comments")
+    op.drop_index("ix_comments_ticket_id", "comments")
+
+    # Булево значение по умолчанию не приводится к строке автоматически
+    with op.batch_alter_table("comments") as batch:
+        batch.alter_column("is_internal", existing_type=sa.Boolean(), server_default=None)
+
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(
+                "is_internal",
+                existing_type=sa.Boolean(),
+                type_=sa.String(10),
+                nullable=True,
+                postgresql_using="CASE WHEN is_internal THEN 'true' ELSE 'false' END",
+            )
+        if op.get_bind().dialect.name != "postgresql":
+            op.execute(f"UPDATE {table} SET is_internal = CASE WHEN is_internal = '1' THEN 'true' ELSE 'false' END")
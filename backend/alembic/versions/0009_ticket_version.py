@@ -0,0 +1,33 @@
+"""Версия заявки для оптимистичной блокировки
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Существующие строки получают версию 1 из server_default без перезаписи таблицы
+    op.add_column("tickets", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    # Архив копирует колонки заявок (см. models/archive.py)
+    op.add_column("tickets_archive", sa.Column("version", sa.Integer(), nullable=True))
+    op.execute("UPDATE tickets_archive SET version = 1")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("tickets_archive") as batch:
+        batch.drop_column("version")
+    with op.batch_alter_table("tickets") as batch:
+        batch.drop_column("version")
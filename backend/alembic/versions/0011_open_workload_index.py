@@ -0,0 +1,32 @@
+"""Частичный индекс нагрузки инженеров для автоназначения
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_tickets_open_workload",
+        "tickets",
+        ["category", "assigned_to", "priority"],
+        postgresql_where=sa.text("status IN ('new', 'in_progress')"),
+        sqlite_where=sa.text("status IN ('new', 'in_progress')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tickets_open_workload", "tickets")
@@ -0,0 +1,32 @@
+"""Статус и число попыток строк outbox истории
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("ticket_history_outbox") as batch:
+        batch.add_column(sa.Column("status", sa.String(20), nullable=False, server_default="pending"))
+        batch.add_column(sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("last_error", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("ticket_history_outbox") as batch:
+        batch.drop_column("last_error")
+        batch.drop_column("attempts")
+        batch.drop_column("status")
@@ -0,0 +1,34 @@
+"""Номер изменения заявок для синхронизации вместо времени изменения
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Существующие строки получают 0: клиенты со старым водяным знаком (время) загружают список заново
+    for table in ("tickets", "ticket_tombstones"):
+        op.add_column(table, sa.Column("change_xid", sa.BigInteger(), nullable=False, server_default="0"))
+        op.create_index(f"ix_{table}_change_xid", table, ["change_xid"])
+    op.add_column("tickets_archive", sa.Column("change_xid", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("tickets_archive", "change_xid")
+    for table in ("ticket_tombstones", "tickets"):
+        op.drop_index(f"ix_{table}_change_xid", table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("change_xid")
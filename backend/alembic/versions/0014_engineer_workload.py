@@ -0,0 +1,47 @@
+"""Счетчики нагрузки инженеров для автоназначения
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0014"
+down_revision: Union[str, None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "engineer_workload",
+        sa.Column("engineer_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("category", sa.String(50), primary_key=True),
+        sa.Column("load", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_engineer_workload_category", "engineer_workload", ["category", "load"])
+
+    # Начальные значения — те же веса, что в services/assignment.py
+    op.execute(
+        """
+        INSERT INTO engineer_workload (engineer_id, category, load)
+        SELECT assigned_to, COALESCE(category, ''), SUM(
+            CASE priority WHEN 'low' THEN 1 WHEN 'medium' THEN 2 WHEN 'high' THEN 4 WHEN 'critical' THEN 8 ELSE 2 END
+            * CASE category WHEN 'hardware' THEN 3 WHEN 'software' THEN 2 ELSE 2 END
+        )
+        FROM tickets
+        WHERE status IN ('new', 'in_progress') AND assigned_to IS NOT NULL
+        GROUP BY assigned_to, COALESCE(category, '')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_engineer_workload_category", "engineer_workload")
+    op.drop_table("engineer_workload")
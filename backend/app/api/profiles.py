@@ -0,0 +1,58 @@
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from typing import List
+
+from ..core.profiling import list_profiles, profile_path, read_profile
+from ..models.user import User
+from ..schemas.profile import ProfileDetailResponse, ProfileResponse
+from .users import get_current_user
+
+router = APIRouter()
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав",
+        )
+    return current_user
+
+
+def not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Профиль не найден",
+    )
+
+
+@router.get("/", response_model=List[ProfileResponse])
+async def get_profiles(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(require_admin),
+):
+    """Последние профили запросов (X-Profile: 1 или ?profile=1 от администратора)"""
+    return await asyncio.to_thread(list_profiles, limit)
+
+
+@router.get("/{profile_id}", response_model=ProfileDetailResponse)
+async def get_profile(profile_id: str, current_user: User = Depends(require_admin)):
+    """Сводка профиля с временем SQL по запросам"""
+    try:
+        return await asyncio.to_thread(read_profile, profile_id)
+    except FileNotFoundError:
+        raise not_found()
+
+
+@router.get("/{profile_id}/speedscope")
+async def get_speedscope(profile_id: str, current_user: User = Depends(require_admin)):
+    """Профиль в формате speedscope (открывается на https://www.speedscope.app)"""
+    try:
+        path = profile_path(profile_id, ".speedscope.json")
+    except FileNotFoundError:
+        raise not_found()
+    if not await asyncio.to_thread(os.path.exists, path):
+        raise not_found()
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
@@ -1,68 +1,237 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy import select, or_, and_, true, false, func
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import aiofiles
 import os
 from uuid import uuid4
 
-from ..core.database import get_db
+from ..core.database import async_session_maker, get_db
 from ..core.config import settings
-from ..models.ticket import Ticket, Comment, TicketHistory, Attachment
+from ..core.responses import FastJSONResponse
+from ..models.ticket import Ticket, Comment, TicketHistory, TicketTombstone, Attachment, change_cursor
+from ..models.archive import ARCHIVE_TABLES, attachments_archive, tickets_archive
 from ..models.user import User
 from ..schemas.ticket import (
     TicketCreate,
     TicketUpdate,
     TicketResponse,
+    TicketExpandedResponse,
     TicketDetailResponse,
+    TicketChangesResponse,
     CommentCreate,
     CommentResponse,
+    TicketHistoryResponse,
+    AttachmentResponse,
+    ticket_rows_adapter,
+    ticket_detail_adapter,
+    ticket_changes_adapter,
 )
+from ..services.assignment import auto_assign
+from ..services.cache import ticket_cache
+from ..services.counters import get_counters, ticket_counters
+from ..services.history import add_history
+from ..services.idempotency import KeyReused, claim, complete, request_hash
+from ..services.notifications import notify_ticket
+from ..services.similarity import similarity_index
+from ..services.singleflight import ticket_reads
+from ..services.sla import apply_sla, sla_scheduler
+from ..services.storage import CHUNK_SIZE, new_key, storage
+from ..services.tickets import next_ticket_number
 from .users import get_current_user
 
 router = APIRouter()
 
+# Колонки списка заявок в порядке полей TicketResponse
+TICKET_LIST_COLUMNS = [Ticket.__table__.c[name] for name in TicketResponse.model_fields]
 
-def generate_ticket_number(year: int, count: int) -> str:
-    """Генерация номера заявки"""
-    return f"IT-{year}-{count:04d}"
+# Связанные данные детальной заявки: поле ответа, таблица, схема
+TICKET_RELATIONS = [
+    ("comments", Comment.__table__, CommentResponse),
+    ("history", TicketHistory.__table__, TicketHistoryResponse),
+    ("attachments", Attachment.__table__, AttachmentResponse),
+]
+
+# Связанные пользователи (expand=creator,assignee): поле ответа -> колонка заявки
+TICKET_EXPANSIONS = {"creator": "creator_id", "assignee": "assigned_to"}
+USER_BRIEF_COLUMNS = ("id", "username", "full_name", "role")
+
+
+def parse_fields(fields: Optional[str], schema) -> Optional[set]:
+    """Разбор параметра fields=a,b,c с проверкой по полям схемы ответа"""
+    if fields is None:
+        return None
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    # Автор и исполнитель запрашиваются через expand
+    unknown = requested - (set(schema.model_fields) - set(TICKET_EXPANSIONS))
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {', '.join(sorted(unknown))}" if unknown else "Не указаны поля",
+        )
+    return requested
+
+
+def parse_expand(expand: Optional[str]) -> List[str]:
+    """Разбор параметра expand=creator,assignee"""
+    if not expand:
+        return []
+
+    requested = {name.strip() for name in expand.split(",") if name.strip()}
+    unknown = requested - set(TICKET_EXPANSIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные связи: {', '.join(sorted(unknown))}",
+        )
+    return sorted(requested)
+
+
+def join_users(query, table, expand: List[str]):
+    """LEFT JOIN users для каждой связи из expand в том же запросе, колонки вида creator__full_name"""
+    for name in expand:
+        user = aliased(User)
+        query = query.outerjoin(user, user.id == table.c[TICKET_EXPANSIONS[name]]).add_columns(
+            *(getattr(user, column).label(f"{name}__{column}") for column in USER_BRIEF_COLUMNS)
+        )
+    return query
+
+
+def nest_users(ticket: dict, expand: List[str]) -> dict:
+    """Сборка вложенных объектов пользователей из колонок join_users"""
+    for name in expand:
+        user = {column: ticket.pop(f"{name}__{column}") for column in USER_BRIEF_COLUMNS}
+        ticket[name] = user if user["id"] is not None else None
+    return ticket
+
+
+def ticket_filters(
+    current_user: User,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    assigned_to_me: bool = False,
+    created_by_me: bool = False,
+    overdue: bool = False,
+) -> list:
+    """Условия фильтров списка заявок"""
+    filters = []
+    if status:
+        filters.append(Ticket.status == status)
+    if category:
+        filters.append(Ticket.category == category)
+    if priority:
+        filters.append(Ticket.priority == priority)
+    if assigned_to_me:
+        filters.append(Ticket.assigned_to == current_user.id)
+    if created_by_me:
+        filters.append(Ticket.creator_id == current_user.id)
+    if overdue:
+        # due_at заполнен только у открытых заявок (частичный индекс ix_tickets_due_at)
+        filters.append(Ticket.due_at.isnot(None))
+        filters.append(Ticket.due_at < func.now())
+    return filters
+
+
+def visibility_scope(user: User) -> str:
+    """Область видимости заявки: внутренние комментарии видят только сотрудники"""
+    return "user" if user.role == "user" else "staff"
+
+
+def check_ticket_access(user: User, creator_id: Optional[int]):
+    """Обычный пользователь видит только свои заявки"""
+    if user.role == "user" and creator_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для просмотра этой заявки",
+        )
+
+
+def etag(ticket: Ticket) -> str:
+    return f'"{ticket.version}"'
+
+
+def version_matches(if_match: Optional[str], ticket: Ticket) -> bool:
+    """Проверка If-Match: "3", W/"3" или 3; без заголовка и с * изменение безусловное"""
+    if if_match is None or if_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/").strip('"') for tag in if_match.split(",")}
+    return str(ticket.version) in tags
+
+
+# Потерянное обновление (If-Match не совпал или заявку изменил параллельный запрос) — всегда 412
+CONFLICT_RESPONSES = {
+    status.HTTP_412_PRECONDITION_FAILED: {
+        "model": TicketResponse,
+        "description": "Заявка изменена другим запросом; в ответе ее текущее состояние и ETag",
+    },
+}
+
+
+def conflict_response(ticket: Ticket) -> Response:
+    """Текущее состояние заявки с кодом 412"""
+    return FastJSONResponse(
+        TicketResponse.model_validate(ticket).model_dump_json().encode(),
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        headers={"ETag": etag(ticket)},
+    )
+
+
+async def claim_idempotency_key(
+    db: AsyncSession, user: User, key: Optional[str], operation: str, payload: dict
+) -> Optional[Response]:
+    """Повтор запроса с тем же Idempotency-Key: исходный ответ без повторной записи"""
+    if key is None:
+        return None
+    if not key or len(key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key должен содержать от 1 до 255 символов",
+        )
+    try:
+        replay = await claim(db, user.id, key, request_hash(operation, payload))
+    except KeyReused:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key уже использован для другого запроса",
+        )
+    if replay is None:
+        return None
+    return FastJSONResponse(replay.body, status_code=replay.status_code, headers={"Idempotent-Replayed": "true"})
 
 
 async def create_history_entry(
     db: AsyncSession,
     ticket_id: int,
-    user_id: int,
+    user_id: Optional[int],
     action: str,
     old_value: Optional[str] = None,
     new_value: Optional[str] = None,
 ):
     """Создание записи в истории"""
-    history = TicketHistory(
-        ticket_id=ticket_id,
-        user_id=user_id,
-        action=action,
-        old_value=old_value,
-        new_value=new_value,
-    )
-    db.add(history)
+    add_history(db, ticket_id, user_id, action, old_value, new_value)
 
 
 @router.post("/", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
 async def create_ticket(
     ticket_data: TicketCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Создание новой заявки"""
-    # Генерация номера заявки
-    current_year = datetime.now().year
-    result = await db.execute(
-        select(Ticket).where(Ticket.ticket_number.like(f"IT-{current_year}-%"))
+    """Создание новой заявки; повтор с тем же Idempotency-Key возвращает уже созданную"""
+    replay = await claim_idempotency_key(
+        db, current_user, idempotency_key, "create_ticket", ticket_data.model_dump()
     )
-    existing_tickets = result.scalars().all()
-    ticket_number = generate_ticket_number(current_year, len(existing_tickets) + 1)
+    if replay:
+        return replay
+
+    # Генерация номера заявки
+    ticket_number = await next_ticket_number(db)
 
     # Создание заявки
     new_ticket = Ticket(
@@ -76,22 +245,47 @@ async def create_ticket(
         creator_id=current_user.id,
         status="new",
     )
+    apply_sla(new_ticket)
+
+    # Похожая открытая заявка того же места и типа техники (например, массовый сбой)
+    similar = await similarity_index.search(
+        db, ticket_data.title, ticket_data.description, ticket_data.location, ticket_data.equipment_type
+    )
+    if similar:
+        new_ticket.duplicate_of = similar.id
 
     db.add(new_ticket)
     await db.flush()
 
+    # Автоназначение после вставки: блокировка выбора инженера держится до фиксации
+    engineer_id = await auto_assign(db, new_ticket)
+
     # Создание записи в истории
     await create_history_entry(
         db, new_ticket.id, current_user.id, "created", None, f"Заявка создана: {ticket_data.title}"
     )
+    if similar:
+        await create_history_entry(db, new_ticket.id, None, "duplicate_linked", None, similar.ticket_number)
+    if engineer_id:
+        await create_history_entry(db, new_ticket.id, None, "assigned", "None", str(engineer_id))
+        notify_ticket(db, new_ticket.id, "assigned")
+
+    if idempotency_key:
+        await db.refresh(new_ticket)
+        body = TicketResponse.model_validate(new_ticket).model_dump_json().encode()
+        await complete(db, current_user.id, idempotency_key, status.HTTP_201_CREATED, body)
 
     await db.commit()
+    ticket_counters.invalidate()
+    ticket_reads.invalidate()
+    sla_scheduler.schedule(new_ticket.id, new_ticket.due_at)
     await db.refresh(new_ticket)
+    similarity_index.add(new_ticket)
 
     return new_ticket
 
 
-@router.get("/", response_model=List[TicketResponse])
+@router.get("/", response_model=List[TicketExpandedResponse], response_class=FastJSONResponse)
 async def get_tickets(
     skip: int = 0,
     limit: int = 50,
@@ -100,23 +294,22 @@ async def get_tickets(
     priority: Optional[str] = None,
     assigned_to_me: bool = False,
     created_by_me: bool = False,
+    overdue: bool = False,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ):
     """Получение списка заявок с фильтрацией"""
-    query = select(Ticket)
-
-    # Фильтры
-    if status:
-        query = query.where(Ticket.status == status)
-    if category:
-        query = query.where(Ticket.category == category)
-    if priority:
-        query = query.where(Ticket.priority == priority)
-    if assigned_to_me:
-        query = query.where(Ticket.assigned_to == current_user.id)
-    if created_by_me:
-        query = query.where(Ticket.creator_id == current_user.id)
+    requested = parse_fields(fields, TicketResponse)
+    expand = parse_expand(expand)
+
+    # Выбираем только нужные колонки без ORM-гидрации
+    columns = TICKET_LIST_COLUMNS
+    if requested is not None:
+        columns = [column for column in columns if column.name in requested]
+    query = select(*columns).where(
+        *ticket_filters(current_user, status, category, priority, assigned_to_me, created_by_me, overdue)
+    )
 
     # Для обычных пользователей показываем только их заявки
     if current_user.role == "user":
@@ -124,54 +317,211 @@ async def get_tickets(
 
     query = query.offset(skip).limit(limit).order_by(Ticket.created_at.desc())
 
-    result = await db.execute(query)
-    tickets = result.scalars().all()
+    async def load() -> bytes:
+        # Автор и исполнитель тем же запросом, без обращения к /api/users на каждую заявку
+        async with async_session_maker() as session:
+            result = await session.execute(join_users(query, Ticket.__table__, expand))
+            rows = [nest_users(row._asdict(), expand) for row in result]
+        return ticket_rows_adapter.dump_json(rows)
+
+    # Одинаковые одновременные запросы (например, все открыли критические новые заявки) ждут
+    # один запрос к БД. Пользователь в ключе, если от него зависит результат
+    owner = current_user.id if current_user.role == "user" or assigned_to_me or created_by_me else None
+    key = (
+        "list", visibility_scope(current_user), owner, skip, limit, status, category, priority,
+        assigned_to_me, created_by_me, overdue, tuple(sorted(requested)) if requested else None, tuple(expand),
+    )
+    return FastJSONResponse(await ticket_reads.do(key, load))
 
-    return tickets
 
+def parse_watermark(value: str) -> Optional[Tuple[int, int]]:
+    """(курсор изменений, время выдачи в секундах) из водяного знака "<курсор>.<время>";
+    None — знак прежнего формата (время) или поврежден"""
+    cursor, _, issued = value.partition(".")
+    if not (cursor.isdigit() and issued.isdigit()):
+        return None
+    return int(cursor), int(issued)
 
-@router.get("/{ticket_id}", response_model=TicketDetailResponse)
-async def get_ticket(
-    ticket_id: int,
+
+@router.get("/changes", response_model=TicketChangesResponse, response_class=FastJSONResponse)
+async def get_ticket_changes(
+    since: Optional[str] = None,
+    ticket_status: Optional[str] = Query(None, alias="status"),
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    assigned_to_me: bool = False,
+    created_by_me: bool = False,
+    overdue: bool = False,
+    fields: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Получение детальной информации о заявке"""
-    result = await db.execute(
-        select(Ticket)
-        .where(Ticket.id == ticket_id)
-        .options(
-            selectinload(Ticket.comments),
-            selectinload(Ticket.history),
-            selectinload(Ticket.attachments),
+    """Заявки, измененные после водяного знака since, с теми же фильтрами, что и список.
+    Без since возвращается только водяной знак: его берут до первой загрузки списка"""
+    requested = parse_fields(fields, TicketResponse)
+
+    # Курсор берется до выборки: изменения транзакций, не завершенных к этому моменту,
+    # получат номер не меньше курсора и попадут в следующий ответ, сколько бы ни шла транзакция.
+    # Повторно присланные заявки клиент просто перезаписывает
+    cursor, now = (await db.execute(select(change_cursor(), func.now()))).one()
+    # Время без пояса (SQLite) считается UTC
+    now = now if now.tzinfo else now.replace(tzinfo=timezone.utc)
+    watermark = f"{cursor}.{int(now.timestamp())}"
+    if since is None:
+        payload = {"watermark": watermark, "tickets": [], "removed": []}
+        return FastJSONResponse(ticket_changes_adapter.dump_json(payload))
+
+    parsed = parse_watermark(since)
+    # Отметки об удалении хранятся CHANGES_RETENTION_DAYS: по более старому знаку удаления не найти
+    if parsed is None or parsed[1] < (now - timedelta(days=settings.CHANGES_RETENTION_DAYS)).timestamp():
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Водяной знак устарел, загрузите список заново",
         )
+    since_cursor = parsed[0]
+
+    columns = TICKET_LIST_COLUMNS
+    if requested is not None:
+        columns = [column for column in columns if column.name in requested | {"id"}]
+
+    # Заявка, переставшая подходить под фильтры (например, сменила статус), уходит в removed
+    filters = ticket_filters(current_user, ticket_status, category, priority, assigned_to_me, created_by_me, overdue)
+    visible = and_(*filters) if filters else true()
+    query = (
+        select(*columns, visible.label("visible"))
+        .where(Ticket.change_xid >= since_cursor)
+        .order_by(Ticket.change_xid, Ticket.id)
+        .limit(settings.CHANGES_MAX_ROWS + 1)
     )
-    ticket = result.scalar_one_or_none()
+    tombstones = select(TicketTombstone.ticket_id).where(TicketTombstone.change_xid >= since_cursor)
 
-    if not ticket:
+    # Для обычных пользователей только их заявки
+    if current_user.role == "user":
+        query = query.where(Ticket.creator_id == current_user.id)
+        tombstones = tombstones.where(TicketTombstone.creator_id == current_user.id)
+
+    rows = (await db.execute(query)).all()
+    if len(rows) > settings.CHANGES_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Слишком много изменений, загрузите список заново",
+        )
+
+    tickets, removed = [], []
+    for row in rows:
+        ticket = row._asdict()
+        if ticket.pop("visible"):
+            tickets.append(ticket)
+        else:
+            removed.append(ticket["id"])
+    removed.extend((await db.execute(tombstones)).scalars())
+
+    payload = {"watermark": watermark, "tickets": tickets, "removed": removed}
+    return FastJSONResponse(ticket_changes_adapter.dump_json(payload))
+
+
+@router.get("/counters", response_model=Dict[str, int])
+async def get_ticket_counters(current_user: User = Depends(get_current_user)):
+    """Счетчики стартовой страницы: сотрудникам — new, in_progress, mine, critical (открытые);
+    пользователю — его заявки по статусам new, in_progress, resolved"""
+    return await get_counters(current_user)
+
+
+@router.get("/{ticket_id}", response_model=TicketDetailResponse, response_class=FastJSONResponse)
+async def get_ticket(
+    ticket_id: int,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """Получение детальной информации о заявке"""
+    requested = parse_fields(fields, TicketDetailResponse) or set(TicketDetailResponse.model_fields)
+    expand = parse_expand(expand)
+    scope = visibility_scope(current_user)
+    cacheable = fields is None
+
+    # Полная заявка (в том числе с expand) берется из кэша; выборочные поля всегда читаются из БД
+    if cacheable:
+        cached = await ticket_cache.get(ticket_id, scope, expand)
+        if cached:
+            creator_id, payload = cached
+            check_ticket_access(current_user, creator_id)
+            return FastJSONResponse(payload)
+
+    # Результат не зависит от пользователя внутри области видимости: права проверяются после загрузки
+    key = ("detail", ticket_id, scope, tuple(sorted(requested)), tuple(expand))
+    loaded = await ticket_reads.do(key, lambda: load_ticket(ticket_id, requested, expand, scope, cacheable))
+    if not loaded:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Заявка не найдена",
         )
 
     # Проверка прав доступа
-    if current_user.role == "user" and ticket.creator_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Недостаточно прав для просмотра этой заявки",
-        )
+    creator_id, payload = loaded
+    check_ticket_access(current_user, creator_id)
+
+    return FastJSONResponse(payload)
+
+
+async def load_ticket(
+    ticket_id: int, requested: set, expand: List[str], scope: str, cacheable: bool
+) -> Optional[Tuple[int, bytes]]:
+    """(creator_id, JSON) детальной заявки или None; читает в своей сессии (см. ticket_reads)"""
+    generation = await ticket_cache.generation(ticket_id) if cacheable else 0
+
+    async with async_session_maker() as db:
+        # Закрытые заявки могут быть перенесены в архив: ищем сначала в горячей таблице
+        for table in (Ticket.__table__, tickets_archive):
+            columns = [table.c[name] for name in TicketResponse.model_fields if name in requested]
+
+            # creator_id нужен для проверки прав, даже если не запрошен
+            query = select(table.c.creator_id, *columns).where(table.c.id == ticket_id)
+            result = await db.execute(join_users(query, table, expand))
+            row = result.first()
+            if row:
+                break
+
+        if not row:
+            return None
+
+        archived = table is tickets_archive
+        ticket = {column.name: value for column, value in zip(columns, row[1:])}
+        if expand:
+            users = nest_users(row._asdict(), expand)
+            ticket.update({name: users[name] for name in expand})
+        for name, source, schema in TICKET_RELATIONS:
+            if name in requested:
+                related = ARCHIVE_TABLES[source] if archived else source
+                # Хронология по времени события: при отложенной записи истории id назначаются позже
+                query = (
+                    select(related)
+                    .where(related.c.ticket_id == ticket_id)
+                    .order_by(related.c.created_at, related.c.id)
+                )
+                # Внутренние комментарии не читаются из БД для пользователя (частичный индекс ix_comments_public)
+                if name == "comments" and scope == "user":
+                    query = query.where(related.c.is_internal == false())
+                result = await db.execute(query)
+                ticket[name] = [schema.model_validate(item._asdict()) for item in result]
 
-    return ticket
+    payload = ticket_detail_adapter.dump_json(ticket)
+    if cacheable:
+        await ticket_cache.set(ticket_id, scope, row[0], payload, generation, expand)
+
+    return row[0], payload
 
 
-@router.patch("/{ticket_id}", response_model=TicketResponse)
+@router.patch("/{ticket_id}", response_model=TicketResponse, responses=CONFLICT_RESPONSES)
 async def update_ticket(
     ticket_id: int,
     ticket_data: TicketUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Обновление заявки"""
+    """Обновление заявки; с If-Match — только если версия не изменилась"""
     result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
     ticket = result.scalar_one_or_none()
 
@@ -188,12 +538,17 @@ async def update_ticket(
             detail="Недостаточно прав",
         )
 
+    if not version_matches(if_match, ticket):
+        return conflict_response(ticket)
+
     # Обновление полей и создание истории
+    changed = set()
     for field, value in ticket_data.model_dump(exclude_unset=True).items():
         if value is not None:
             old_value = getattr(ticket, field)
             if old_value != value:
                 setattr(ticket, field, value)
+                changed.add(field)
                 await create_history_entry(
                     db, ticket.id, current_user.id, f"{field}_changed", str(old_value), str(value)
                 )
@@ -202,9 +557,35 @@ async def update_ticket(
     if ticket_data.status == "closed" and not ticket.closed_at:
         ticket.closed_at = datetime.now()
 
-    await db.commit()
+    # Уведомления отправляет воркер задач после фиксации транзакции
+    if "assigned_to" in changed:
+        notify_ticket(db, ticket.id, "assigned", current_user.id)
+    if "status" in changed:
+        notify_ticket(db, ticket.id, "status_changed", current_user.id)
+
+    # Сроки SLA зависят от приоритета, категории и статуса
+    sla_changed = bool(changed & {"priority", "category", "status"})
+    if sla_changed:
+        apply_sla(ticket)
+
+    # Одна команда UPDATE ... WHERE version = ?: параллельное изменение дает конфликт, а не ожидание блокировки
+    try:
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        await db.refresh(ticket)
+        return conflict_response(ticket)
+    ticket_reads.invalidate()
+    await ticket_cache.invalidate(ticket_id)
+    if changed & {"status", "priority", "assigned_to"}:
+        ticket_counters.invalidate()
+    if sla_changed:
+        sla_scheduler.schedule(ticket_id, ticket.due_at)
     await db.refresh(ticket)
+    if changed & {"title", "description", "location", "equipment_type", "status"}:
+        similarity_index.add(ticket)
 
+    response.headers["ETag"] = etag(ticket)
     return ticket
 
 
@@ -213,10 +594,21 @@ async def add_comment(
     ticket_id: int,
     comment_text: str,
     is_internal: bool = False,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Добавление комментария к заявке"""
+    """Добавление комментария к заявке; повтор с тем же Idempotency-Key не создает второй"""
+    replay = await claim_idempotency_key(
+        db,
+        current_user,
+        idempotency_key,
+        "add_comment",
+        {"ticket_id": ticket_id, "comment_text": comment_text, "is_internal": is_internal},
+    )
+    if replay:
+        return replay
+
     result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
     ticket = result.scalar_one_or_none()
 
@@ -237,7 +629,7 @@ async def add_comment(
         ticket_id=ticket_id,
         user_id=current_user.id,
         comment_text=comment_text,
-        is_internal="true" if is_internal else "false",
+        is_internal=is_internal,
     )
 
     db.add(new_comment)
@@ -247,21 +639,32 @@ async def add_comment(
     await create_history_entry(
         db, ticket_id, current_user.id, "commented", None, comment_text[:100]
     )
+    if not is_internal:
+        notify_ticket(db, ticket_id, "commented", current_user.id)
+
+    if idempotency_key:
+        await db.refresh(new_comment)
+        body = CommentResponse.model_validate(new_comment).model_dump_json().encode()
+        await complete(db, current_user.id, idempotency_key, status.HTTP_201_CREATED, body)
 
     await db.commit()
+    ticket_reads.invalidate()
+    await ticket_cache.invalidate(ticket_id)
     await db.refresh(new_comment)
 
     return new_comment
 
 
-@router.post("/{ticket_id}/assign", response_model=TicketResponse)
+@router.post("/{ticket_id}/assign", response_model=TicketResponse, responses=CONFLICT_RESPONSES)
 async def assign_ticket(
     ticket_id: int,
+    response: Response,
     engineer_id: Optional[int] = None,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Назначение заявки на инженера"""
+    """Назначение заявки на инженера; с If-Match — только если версия не изменилась"""
     if current_user.role not in ["engineer", "admin"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -277,6 +680,9 @@ async def assign_ticket(
             detail="Заявка не найдена",
         )
 
+    if not version_matches(if_match, ticket):
+        return conflict_response(ticket)
+
     # Если engineer_id не указан, назначаем на себя
     if engineer_id is None:
         engineer_id = current_user.id
@@ -287,12 +693,114 @@ async def assign_ticket(
     # Обновляем статус, если заявка была новой
     if ticket.status == "new":
         ticket.status = "in_progress"
+        apply_sla(ticket)
 
     await create_history_entry(
         db, ticket_id, current_user.id, "assigned", str(old_assigned), str(engineer_id)
     )
-
-    await db.commit()
+    notify_ticket(db, ticket_id, "assigned", current_user.id)
+
+    # Два инженера, назначающие одну заявку: второй получает конфликт вместо тихой перезаписи
+    try:
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        await db.refresh(ticket)
+        return conflict_response(ticket)
+    ticket_reads.invalidate()
+    await ticket_cache.invalidate(ticket_id)
+    ticket_counters.invalidate()
+    sla_scheduler.schedule(ticket_id, ticket.due_at)
     await db.refresh(ticket)
 
+    response.headers["ETag"] = etag(ticket)
     return ticket
+
+
+@router.post("/{ticket_id}/attachments", response_model=AttachmentResponse, status_code=status.HTTP_201_CREATED)
+async def upload_attachment(
+    ticket_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Загрузка вложения: файл пишется в хранилище кусками, без чтения целиком в память"""
+    ticket = await db.get(Ticket, ticket_id)
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Заявка не найдена",
+        )
+    check_ticket_access(current_user, ticket.creator_id)
+
+    async def chunks():
+        size = 0
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.MAX_UPLOAD_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Файл больше {settings.MAX_UPLOAD_SIZE // 1048576} МБ",
+                )
+            yield chunk
+
+    file_name = os.path.basename(file.filename or "file")[:255]
+    key = new_key(file_name)
+    await storage.save(key, chunks(), file.content_type)
+
+    attachment = Attachment(
+        ticket_id=ticket_id,
+        file_name=file_name,
+        file_path=key,
+        file_type=file.content_type[:50] if file.content_type else None,
+        uploaded_by=current_user.id,
+    )
+    try:
+        db.add(attachment)
+        await create_history_entry(db, ticket_id, current_user.id, "attachment_added", None, file_name[:100])
+        await db.commit()
+    except Exception:
+        await storage.delete(key)
+        raise
+    ticket_reads.invalidate()
+    await ticket_cache.invalidate(ticket_id)
+    await db.refresh(attachment)
+
+    return attachment
+
+
+@router.get("/{ticket_id}/attachments/{attachment_id}")
+async def download_attachment(
+    ticket_id: int,
+    attachment_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Скачивание вложения: из S3 — перенаправлением на подписанную ссылку, с диска — с поддержкой Range"""
+    for tickets, attachments in ((Ticket.__table__, Attachment.__table__), (tickets_archive, attachments_archive)):
+        result = await db.execute(
+            select(tickets.c.creator_id, attachments.c.file_path, attachments.c.file_name, attachments.c.file_type)
+            .select_from(attachments)
+            .join(tickets, tickets.c.id == attachments.c.ticket_id)
+            .where(attachments.c.id == attachment_id, attachments.c.ticket_id == ticket_id)
+        )
+        row = result.first()
+        if row:
+            break
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Вложение не найдено",
+        )
+    check_ticket_access(current_user, row.creator_id)
+
+    # Локальное хранилище отдает файл (с Range), S3 — перенаправляет на подписанную ссылку
+    try:
+        return storage.response(row.file_path, row.file_name, row.file_type, request.headers.get("range"))
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Файл вложения не найден",
+        )
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import false, or_, select
+from pydantic import TypeAdapter
 from typing import List
 
 from ..core.database import get_db
+from ..core.responses import FastJSONResponse
 from ..core.security import decode_access_token
+from ..models.ticket import Comment, Ticket
 from ..models.user import User
-from ..schemas.user import UserResponse, UserUpdate
+from ..schemas.user import UserBrief, UserBriefRow, UserResponse, UserUpdate
 from .auth import oauth2_scheme
 
 router = APIRouter()
@@ -50,6 +53,53 @@ async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+# Не больше идентификаторов в одном запросе GET /api/users/brief?ids=
+MAX_IDS = 100
+
+user_briefs_adapter = TypeAdapter(List[UserBriefRow])
+
+
+def parse_ids(ids: str) -> List[int]:
+    try:
+        values = {int(value) for value in ids.split(",") if value.strip()}
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids должен быть списком чисел через запятую",
+        )
+    if len(values) > MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не более {MAX_IDS} идентификаторов за запрос",
+        )
+    return sorted(values)
+
+
+@router.get("/brief", response_model=List[UserBrief], response_class=FastJSONResponse)
+async def get_user_briefs(
+    ids: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Пакетная выборка кратких данных пользователей: ids=1,2,3. Сотрудники получают любых,
+    обычный пользователь — себя и участников своих заявок (исполнителей, авторов публичных
+    комментариев); остальные id пропускаются"""
+    query = select(User.id, User.username, User.full_name, User.role).where(User.id.in_(parse_ids(ids)))
+    if current_user.role not in ["admin", "engineer"]:
+        own_tickets = Ticket.creator_id == current_user.id
+        query = query.where(or_(
+            User.id == current_user.id,
+            User.id.in_(select(Ticket.assigned_to).where(own_tickets)),
+            User.id.in_(
+                select(Comment.user_id)
+                .join(Ticket, Ticket.id == Comment.ticket_id)
+                .where(own_tickets, Comment.is_internal == false())
+            ),
+        ))
+    result = await db.execute(query.order_by(User.id))
+    return FastJSONResponse(user_briefs_adapter.dump_json([row._asdict() for row in result]))
+
+
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
     skip: int = 0,
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+
+from .config import settings
+from .database import pool_wait
+
+logger = logging.getLogger(__name__)
+
+# Приоритет в очереди: меньше — раньше
+PRIORITY_STAFF = 0
+PRIORITY_USER = 1
+PRIORITY_ANONYMOUS = 2
+
+# Снижение лимита при перегрузке пула; рост — на один запрос за интервал подстройки
+DECREASE_FACTOR = 0.8
+
+# Классы маршрутов: (метод или None для любого, путь) -> класс; остальные GET — read, прочие — write
+ROUTE_CLASSES: List[Tuple[Optional[str], Pattern, str]] = [
+    (None, re.compile(r"^/api/auth/"), "auth"),
+    (None, re.compile(r"^/api/tickets/\d+/attachments"), "export"),
+]
+
+LIST_PATH_RE = re.compile(r"^/api/tickets/?$")
+LIMIT_RE = re.compile(rb"(?:^|&)limit=(\d+)")
+
+
+def route_class(method: str, path: str, query_string: bytes = b"") -> str:
+    for route_method, pattern, name in ROUTE_CLASSES:
+        if (route_method is None or method == route_method) and pattern.match(path):
+            return name
+    if method in ("GET", "HEAD"):
+        # Большие страницы списка не занимают места обычных чтений
+        match = LIMIT_RE.search(query_string)
+        if match and LIST_PATH_RE.match(path) and int(match.group(1)) > settings.ADMISSION_BULK_LIMIT:
+            return "export"
+        return "read"
+    return "write"
+
+
+class ConcurrencyLimiter:
+    """Ограничение одновременных запросов одного класса с короткой очередью по приоритетам"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float, min_limit: int):
+        self.name = name
+        self.max_limit = limit
+        self.min_limit = min(min_limit, limit)
+        self.limit = float(limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self._queues: List[Deque[asyncio.Future]] = [deque() for _ in range(PRIORITY_ANONYMOUS + 1)]
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues)
+
+    async def acquire(self, priority: int) -> bool:
+        """True — запрос допущен (вызвать release), False — отказ"""
+        if self.in_flight < int(self.limit) and not self.queued():
+            self.in_flight += 1
+            return True
+
+        if self.queued() >= self.max_queue and not self._evict(priority):
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._queues[priority]
+        queue.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Клиент отключился: выданное место возвращается
+            if waiter.done() and waiter.result():
+                self.release()
+            elif not waiter.done():
+                waiter.cancel()
+                queue.remove(waiter)
+            raise
+
+        if not waiter.done():
+            waiter.cancel()
+            queue.remove(waiter)
+        if waiter.cancelled() or not waiter.result():
+            self.rejected += 1
+            return False
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self.in_flight < int(self.limit):
+            waiter = next((queue.popleft() for queue in self._queues if queue), None)
+            if waiter is None:
+                return
+            self.in_flight += 1
+            waiter.set_result(True)
+
+    def _evict(self, priority: int) -> bool:
+        """Полная очередь: место освобождает последний запрос с более низким приоритетом"""
+        for queue in reversed(self._queues[priority + 1:]):
+            if queue:
+                queue.pop().set_result(False)
+                return True
+        return False
+
+    def adjust(self, wait: float) -> None:
+        """Лимит снижается, пока запросы ждут соединения пула, и постепенно возвращается"""
+        if wait > settings.ADMISSION_TARGET_POOL_WAIT:
+            self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self._wake()
+
+
+class AdmissionController:
+    """Лимиты допуска по классам маршрутов с подстройкой по ожиданию соединений пула"""
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limiters = {
+            name: ConcurrencyLimiter(
+                name,
+                limit,
+                settings.ADMISSION_QUEUE_SIZE,
+                settings.ADMISSION_QUEUE_TIMEOUT,
+                settings.ADMISSION_MIN_LIMIT,
+            )
+            for name, limit in limits.items()
+        }
+        self._adjusted_at = time.monotonic()
+
+    def limiter(self, name: str) -> ConcurrencyLimiter:
+        return self.limiters[name]
+
+    def maybe_adjust(self) -> None:
+        """Вызывается по завершении запросов, не чаще ADMISSION_ADJUST_INTERVAL"""
+        now = time.monotonic()
+        if now - self._adjusted_at < settings.ADMISSION_ADJUST_INTERVAL:
+            return
+        self._adjusted_at = now
+
+        wait = pool_wait.take()
+        for limiter in self.limiters.values():
+            limiter.adjust(wait)
+        if wait > settings.ADMISSION_TARGET_POOL_WAIT:
+            logger.warning(
+                "Ожидание соединения с БД %.0f мс, лимиты: %s",
+                wait * 1000,
+                ", ".join(f"{name}={int(limiter.limit)}" for name, limiter in self.limiters.items()),
+            )
+
+
+def create_admission_controller() -> AdmissionController:
+    return AdmissionController({
+        "auth": settings.ADMISSION_AUTH_LIMIT,
+        "read": settings.ADMISSION_READ_LIMIT,
+        "write": settings.ADMISSION_WRITE_LIMIT,
+        "export": settings.ADMISSION_EXPORT_LIMIT,
+    })
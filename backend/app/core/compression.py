@@ -0,0 +1,77 @@
+import gzip
+import os
+import re
+from typing import List, Optional
+
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдается только gzip
+    brotli = None
+
+# Расширения предварительно сжатых файлов (см. build_static.py)
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+# Имя с хешем содержимого: style.3f2a9c1b0d.css
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{10}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def available_encodings() -> List[str]:
+    return ["br", "gzip"] if brotli else ["gzip"]
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Поддерживаемые кодировки из Accept-Encoding в порядке предпочтения сервера"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip())
+    return [encoding for encoding in available_encodings() if encoding in accepted or "*" in accepted]
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """Сжатие; для статики при сборке — максимальная степень, для ответов API — быстрая"""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if static else 4)
+    return gzip.compress(body, compresslevel=9 if static else 6, mtime=0)
+
+
+def header_value(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Статика с выбором заранее сжатого варианта (.br/.gz) и кэшированием по хешу в имени"""
+
+    async def get_response(self, path: str, scope) -> FileResponse:
+        response = await super().get_response(path, scope)
+        if response.status_code != 200 or not isinstance(response, FileResponse):
+            return response
+
+        for encoding in accepted_encodings(header_value(scope, b"accept-encoding")):
+            candidate = response.path + SUFFIXES[encoding]
+            if os.path.isfile(candidate):
+                response = FileResponse(
+                    candidate,
+                    media_type=response.media_type,
+                    headers={"Content-Encoding": encoding},
+                )
+                break
+
+        response.headers["Vary"] = "Accept-Encoding"
+        # Файл с хешем в имени никогда не меняется; остальные перепроверяются по ETag
+        response.headers["Cache-Control"] = IMMUTABLE if FINGERPRINT_RE.search(path) else "no-cache"
+        return response
@@ -1,14 +1,29 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
 
+    # Пул соединений рассчитывается из числа воркеров (см. core/database.py)
+    DB_MAX_CONNECTIONS: int = 100  # max_connections PostgreSQL
+    DB_RESERVED_CONNECTIONS: int = 20  # Для воркеров задач, бота, миграций и админов
+    DB_POOL_SIZE: Optional[int] = None  # Явные размеры пула вместо расчетных
+    DB_MAX_OVERFLOW: Optional[int] = None
+
+    # SQLite (DATABASE_URL=sqlite+aiosqlite:///...): один сервер без PostgreSQL и быстрые тесты
+    SQLITE_POOL_SIZE: int = 5  # Постоянных соединений на процесс; читатели в WAL не мешают друг другу
+    # Сверх постоянных: запрос держит до двух соединений (сессия запроса и чтение в своей сессии),
+    # одновременных запросов не больше суммы лимитов допуска (core/admission.py)
+    SQLITE_MAX_OVERFLOW: int = 60
+    SQLITE_BUSY_TIMEOUT: int = 5000  # Ожидание блокировки записи другим процессом, мс
+
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    WEB_CONCURRENCY: Optional[int] = None  # Процессов API в serve.py; по умолчанию по числу CPU
+    GRACEFUL_TIMEOUT: int = 30  # Время на завершение запросов при остановке, секунд
 
     # Security
     SECRET_KEY: str
@@ -22,10 +37,111 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     ENVIRONMENT: str = "development"
 
+    # Сжатие ответов API
+    COMPRESSION_MIN_SIZE: int = 1024  # Меньшие ответы не сжимаются, байт
+    COMPRESSION_OFFLOAD_SIZE: int = 65536  # Большие ответы сжимаются в пуле потоков, байт
+
     # Upload
     UPLOAD_DIR: str = "/app/uploads"
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
 
+    # Хранилище вложений: local (UPLOAD_DIR) или s3 (S3-совместимое, например MinIO)
+    STORAGE_BACKEND: str = "local"
+    STORAGE_ACCEL_REDIRECT: Optional[str] = None  # Префикс internal-location nginx для отдачи через sendfile
+    STORAGE_URL_TTL: int = 300  # Срок действия подписанной ссылки S3, секунд
+    S3_BUCKET: str = "helpdesk"
+    S3_ENDPOINT_URL: Optional[str] = None  # http://minio:9000; для AWS не задается
+    S3_PUBLIC_ENDPOINT_URL: Optional[str] = None  # Адрес хранилища для браузера, если отличается
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY: Optional[str] = None
+    S3_SECRET_KEY: Optional[str] = None
+
+    # Архивация и секционирование
+    HISTORY_PARTITIONS_AHEAD: int = 3  # Сколько месячных секций ticket_history создавать заранее
+    ARCHIVE_AFTER_MONTHS: int = 12  # Закрытые заявки старше этого срока уходят в архив
+    ARCHIVE_BATCH_SIZE: int = 500
+
+    # Синхронизация изменений (GET /api/tickets/changes)
+    CHANGES_MAX_ROWS: int = 1000  # Больше изменений — клиент загружает список заново
+    CHANGES_RETENTION_DAYS: int = 30  # Срок хранения отметок об удаленных заявках
+
+    # Повтор запроса создания с тем же Idempotency-Key возвращает исходный ответ
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_CLEANUP_INTERVAL: int = 3600  # Период удаления просроченных ключей, секунд
+
+    # Отложенная запись истории: события пишутся в outbox и переносятся в ticket_history пакетами
+    HISTORY_WRITE_BEHIND: bool = False
+    HISTORY_FLUSH_INTERVAL: float = 1.0  # секунд
+    HISTORY_FLUSH_BATCH: int = 500  # Строк outbox за одну транзакцию переноса
+    HISTORY_OUTBOX_MAX_ATTEMPTS: int = 5  # Затем строка outbox переходит в статус dead
+
+    # Фоновые задачи (таблица jobs, воркер worker.py)
+    JOB_CONCURRENCY: int = 10  # Задач одновременно в одном воркере
+    JOB_BATCH_SIZE: int = 20  # Задач за одну выборку
+    JOB_POLL_INTERVAL: float = 1.0  # секунд
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_BACKOFF_BASE: float = 5.0  # Задержка первого повтора, секунд; далее удваивается
+    JOB_BACKOFF_MAX: float = 3600.0
+    JOB_TIMEOUT: float = 60.0  # Максимальное время выполнения задачи, секунд
+    JOB_LOCK_TIMEOUT: float = 600.0  # После этого задача упавшего воркера возвращается в очередь
+
+    # Уведомления в Telegram отправляет воркер задач
+    TELEGRAM_BOT_TOKEN: str = ""
+
+    # Кэш детальных заявок: memory (в процессе) или redis (общий для воркеров)
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://redis:6379/0"
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_TTL: int = 60  # секунд
+
+    # Счетчики стартовой страницы (GET /api/tickets/counters)
+    COUNTERS_TTL: float = 5.0  # секунд
+
+    # Ограничение частоты запросов к API (корзины токенов по пользователю)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory или redis (общие корзины для воркеров)
+    RATE_LIMIT_RATE: float = 5.0  # Токенов в секунду
+    RATE_LIMIT_BURST: int = 30  # Емкость корзины
+
+    # Допуск запросов (core/admission.py): одновременные запросы по классам маршрутов,
+    # короткая очередь и быстрый отказ 503 вместо ожидания соединения с БД
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_AUTH_LIMIT: int = 8  # Вход и регистрация (bcrypt)
+    ADMISSION_READ_LIMIT: int = 60
+    ADMISSION_WRITE_LIMIT: int = 20
+    ADMISSION_EXPORT_LIMIT: int = 4  # Вложения и большие выборки
+    ADMISSION_BULK_LIMIT: int = 200  # Список заявок с limit больше этого считается выгрузкой
+    ADMISSION_QUEUE_SIZE: int = 20  # Ожидающих запросов на класс
+    ADMISSION_QUEUE_TIMEOUT: float = 1.0  # Максимальное ожидание в очереди, секунд
+    ADMISSION_RETRY_AFTER: int = 1  # Retry-After ответа 503, секунд
+    # Адаптивные лимиты: при среднем ожидании соединения пула выше порога лимиты снижаются
+    ADMISSION_TARGET_POOL_WAIT: float = 0.05  # секунд
+    ADMISSION_MIN_LIMIT: int = 2
+    ADMISSION_ADJUST_INTERVAL: float = 1.0  # секунд
+
+    # Профилирование отдельного запроса администратором: заголовок X-Profile: 1 или ?profile=1
+    # (нужен пакет pyinstrument); при PROFILING_ENABLED=false middleware не подключается
+    PROFILING_ENABLED: bool = True
+    PROFILING_DIR: str = "/app/profiles"
+    PROFILING_INTERVAL: float = 0.001  # Период сэмплирования, секунд
+    PROFILING_MAX_FILES: int = 100  # Хранятся последние профили
+
+    # Обслуживание (секции, SLA, ключи идемпотентности, outbox истории) выполняет один процесс API
+    LEADER_RETRY_INTERVAL: float = 10.0  # Период попыток стать ведущим и проверки блокировки, секунд
+
+    # SLA
+    SLA_RESCAN_INTERVAL: int = 300  # Период перечитывания сроков из БД, секунд
+    SLA_POLL_INTERVAL: float = 5.0  # Период опроса ближайших сроков (заявки других процессов), секунд
+
+    # Автоназначение новых заявок на наименее загруженного инженера категории
+    AUTO_ASSIGN_ENABLED: bool = False
+    WORKLOAD_RECONCILE_INTERVAL: int = 3600  # Период сверки счетчиков нагрузки с заявками, секунд
+
+    # Поиск похожих заявок при создании
+    SIMILARITY_THRESHOLD: float = 0.5  # Минимальный коэффициент Жаккара по триграммам
+    SIMILARITY_WINDOW_HOURS: int = 72  # Сравниваются только недавние открытые заявки
+    SIMILARITY_REBUILD_INTERVAL: int = 300  # Период перестроения индекса из БД, секунд
+
     class Config:
         env_file = ".env"
         case_sensitive = True
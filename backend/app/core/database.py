@@ -1,17 +1,95 @@
+import asyncio
+import time
+from typing import Tuple
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
+from .sqlite import configure_sqlite, is_sqlite, sqlite_engine_options
+
+
+# Не больше соединений на процесс, чем было до расчета от числа воркеров (10 + 20)
+MAX_CONNECTIONS_PER_PROCESS = 30
+
+
+def pool_limits(workers: int) -> Tuple[int, int]:
+    """(pool_size, max_overflow) на процесс: workers * (pool_size + max_overflow)
+    не превышает DB_MAX_CONNECTIONS за вычетом резерва для воркеров задач, бота и админов"""
+    if settings.DB_POOL_SIZE is not None:
+        return settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW or 0
+    budget = (settings.DB_MAX_CONNECTIONS - settings.DB_RESERVED_CONNECTIONS) // workers
+    budget = max(1, min(budget, MAX_CONNECTIONS_PER_PROCESS))
+    # Постоянных соединений треть, остальное — на пики
+    pool_size = max(1, budget // 3)
+    return pool_size, budget - pool_size
+
+
+class PoolWaitStats:
+    """Ожидание свободного соединения пула за окно между подстройками лимитов допуска"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.total += seconds
+        self.count += 1
+
+    def take(self) -> float:
+        """Среднее ожидание за окно, секунд; окно начинается заново"""
+        average = self.total / self.count if self.count else 0.0
+        self.total, self.count = 0.0, 0
+        return average
+
+
+pool_wait = PoolWaitStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул с замером времени получения соединения (см. core/admission.py)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+
+def engine_options(url: str) -> dict:
+    """Параметры пула: PostgreSQL — по числу воркеров, SQLite — см. core/sqlite.py"""
+    if is_sqlite(url):
+        options = sqlite_engine_options(url)
+        if options["poolclass"] is AsyncAdaptedQueuePool:
+            options["poolclass"] = TimedQueuePool
+        return options
+    # serve.py передает число процессов API через WEB_CONCURRENCY
+    pool_size, max_overflow = pool_limits(settings.WEB_CONCURRENCY or 1)
+    return {
+        "pool_pre_ping": True,
+        "poolclass": TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+    }
+
+
+SQLITE = is_sqlite(settings.DATABASE_URL)
+ENGINE_OPTIONS = engine_options(settings.DATABASE_URL)
+POOL_SIZE = ENGINE_OPTIONS.get("pool_size", 1)
 
 # Создание движка базы данных
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     future=True,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    **ENGINE_OPTIONS,
 )
 
+if SQLITE:
+    configure_sqlite(engine.sync_engine)
+
 # Создание фабрики сессий
 async_session_maker = async_sessionmaker(
     engine,
@@ -25,6 +103,21 @@ async_session_maker = async_sessionmaker(
 Base = declarative_base()
 
 
+def partial_index(condition) -> dict:
+    """Условие частичного индекса (Index(..., **partial_index(...))): PostgreSQL и SQLite"""
+    return {"postgresql_where": condition, "sqlite_where": condition}
+
+
+async def warm_pool(size: int = POOL_SIZE) -> None:
+    """Открытие постоянных соединений до приема трафика: первые запросы не ждут подключения"""
+    connections = await asyncio.gather(*(engine.connect() for _ in range(size)))
+    try:
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in connections))
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
 # Dependency для получения сессии БД
 async def get_db() -> AsyncSession:
     async with async_session_maker() as session:
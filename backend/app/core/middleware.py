@@ -0,0 +1,228 @@
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import List, Optional, Pattern, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+
+from .admission import PRIORITY_ANONYMOUS, PRIORITY_STAFF, PRIORITY_USER, create_admission_controller, route_class
+from .compression import accepted_encodings, compress, header_value, is_compressible
+from .config import settings
+from .profiling import request_profiler
+from .ratelimit import create_rate_limiter
+from .security import decode_access_token
+
+
+# Стоимость запросов в токенах: (метод, путь) -> цена; остальные запросы к API стоят 1
+ROUTE_COSTS: List[Tuple[str, Pattern, float]] = [
+    ("POST", re.compile(r"^/api/tickets/?$"), 5),
+    ("POST", re.compile(r"^/api/tickets/\d+/comments/?$"), 3),
+    ("POST", re.compile(r"^/api/auth/(login|register)/?$"), 5),
+]
+
+
+def route_cost(method: str, path: str) -> float:
+    for route_method, pattern, cost in ROUTE_COSTS:
+        if method == route_method and pattern.match(path):
+            return cost
+    return 1
+
+
+class TokenCache:
+    """Проверенные токены: подпись JWT проверяется один раз, а не на каждый запрос"""
+
+    def __init__(self, max_tokens: int = 10000):
+        self._claims: "OrderedDict[bytes, Tuple[str, Optional[str], float]]" = OrderedDict()
+        self._max_tokens = max_tokens
+
+    def claims(self, authorization: bytes) -> Optional[Tuple[str, Optional[str]]]:
+        """(sub, role) из JWT без запроса к БД"""
+        cached = self._claims.get(authorization)
+        if cached and cached[2] > time.time():
+            return cached[0], cached[1]
+
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        payload = decode_access_token(token) if scheme.lower() == "bearer" else None
+        if not payload or not payload.get("sub"):
+            return None
+
+        self._claims[authorization] = (str(payload["sub"]), payload.get("role"), payload.get("exp", 0))
+        if len(self._claims) > self._max_tokens:
+            self._claims.popitem(last=False)
+        return str(payload["sub"]), payload.get("role")
+
+    def of(self, scope) -> Optional[Tuple[str, Optional[str]]]:
+        authorization = header_value(scope, b"authorization")
+        return self.claims(authorization.encode("latin-1")) if authorization else None
+
+
+token_cache = TokenCache()
+
+
+class RateLimitMiddleware:
+    """ASGI-ограничение частоты запросов к /api/ по пользователю из JWT (или IP)"""
+
+    def __init__(self, app, limiter=None, tokens: TokenCache = token_cache):
+        self.app = app
+        self.limiter = limiter or create_rate_limiter()
+        self.tokens = tokens
+
+    def client_key(self, scope) -> str:
+        claims = self.tokens.of(scope)
+        if claims:
+            return f"user:{claims[0]}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self.limiter.take(self.client_key(scope), route_cost(scope["method"], scope["path"]))
+        if wait:
+            response = JSONResponse(
+                {"detail": "Слишком много запросов, повторите позже"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+
+class AdmissionMiddleware:
+    """Допуск запросов к /api/: лимит одновременных запросов по классу маршрута,
+    очередь с приоритетом сотрудников и быстрый отказ 503 вместо ожидания пула БД"""
+
+    EXEMPT_PATHS = ("/api/health",)
+
+    def __init__(self, app, controller=None, tokens: TokenCache = token_cache):
+        self.app = app
+        self.controller = controller or create_admission_controller()
+        self.tokens = tokens
+
+    def priority(self, scope) -> int:
+        claims = self.tokens.of(scope)
+        if not claims:
+            return PRIORITY_ANONYMOUS
+        return PRIORITY_STAFF if claims[1] in ("engineer", "admin") else PRIORITY_USER
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api/") or path in self.EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.limiter(route_class(scope["method"], path, scope.get("query_string", b"")))
+        if not await limiter.acquire(self.priority(scope)):
+            response = JSONResponse(
+                {"detail": "Сервис перегружен, повторите позже"},
+                status_code=503,
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+            self.controller.maybe_adjust()
+
+
+class ProfilingMiddleware:
+    """Профиль запроса администратора по X-Profile: 1 или ?profile=1; роль берется из JWT.
+    Остальные запросы проходят без изменений"""
+
+    PROFILE_QUERY_RE = re.compile(rb"(?:^|&)profile=(1|true)(?:&|$)")
+
+    def __init__(self, app, profiler=request_profiler, tokens: TokenCache = token_cache):
+        self.app = app
+        self.profiler = profiler
+        self.tokens = tokens
+
+    def requested(self, scope) -> bool:
+        return header_value(scope, b"x-profile") in ("1", "true") or bool(
+            self.PROFILE_QUERY_RE.search(scope.get("query_string", b""))
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        claims = self.tokens.of(scope)
+        if not claims or claims[1] != "admin" or self.profiler.busy:
+            await self.app(scope, receive, send)
+            return
+
+        await self.profiler.run(self.app, scope, receive, send)
+
+
+class CompressionMiddleware:
+    """Сжатие ответов (brotli/gzip по Accept-Encoding) больше minimum_size;
+    большие тела сжимаются в пуле потоков, чтобы не блокировать цикл событий"""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = settings.COMPRESSION_MIN_SIZE,
+        offload_size: int = settings.COMPRESSION_OFFLOAD_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(header_value(scope, b"accept-encoding"))
+        if not encodings:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            # Потоковые ответы, уже сжатые и несжимаемые типы отдаются как есть
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"))
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= self.offload_size:
+                body = await asyncio.get_running_loop().run_in_executor(None, compress, body, encodings[0])
+            else:
+                body = compress(body, encodings[0])
+
+            headers["Content-Encoding"] = encodings[0]
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
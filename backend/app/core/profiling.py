@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# 20261019T132233-1a2b3c4d: имена файлов сортируются по времени
+PROFILE_ID_RE = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+# Запросы профилируемого запроса: (SQL, секунд); None — профилирование не идет
+sql_log: "contextvars.ContextVar[Optional[List[Tuple[str, float]]]]" = contextvars.ContextVar(
+    "profile_sql_log", default=None
+)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if sql_log.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = sql_log.get()
+    started = conn.info.get("profile_started")
+    if log is not None and started:
+        log.append((statement, time.perf_counter() - started.pop()))
+
+
+def sql_summary(log: List[Tuple[str, float]]) -> List[dict]:
+    """Запросы, сгруппированные по тексту, по убыванию суммарного времени"""
+    groups = {}
+    for statement, seconds in log:
+        item = groups.setdefault(statement, {"statement": statement, "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        item["count"] += 1
+        item["total_ms"] += seconds * 1000
+        item["max_ms"] = max(item["max_ms"], seconds * 1000)
+    return sorted(groups.values(), key=lambda item: item["total_ms"], reverse=True)
+
+
+def profile_path(profile_id: str, suffix: str = ".json") -> str:
+    if not PROFILE_ID_RE.match(profile_id):
+        raise FileNotFoundError(profile_id)
+    return os.path.join(settings.PROFILING_DIR, profile_id + suffix)
+
+
+def list_profiles(limit: int) -> List[dict]:
+    """Последние профили (без разбивки по SQL), новые первыми"""
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    # Сводки профилей: <id>.json (рядом <id>.speedscope.json)
+    names = sorted(
+        (name[:-5] for name in os.listdir(settings.PROFILING_DIR) if PROFILE_ID_RE.match(name[:-5])),
+        reverse=True,
+    )
+    profiles = []
+    for profile_id in names[:limit]:
+        with open(profile_path(profile_id), encoding="utf-8") as file:
+            profile = json.load(file)
+        profile.pop("sql", None)
+        profiles.append(profile)
+    return profiles
+
+
+def read_profile(profile_id: str) -> dict:
+    with open(profile_path(profile_id), encoding="utf-8") as file:
+        return json.load(file)
+
+
+class RequestProfiler:
+    """Сэмплирующий профиль одного запроса (нужен пакет pyinstrument) и время SQL.
+    Обработчики событий SQLAlchemy подключаются только на время профилирования"""
+
+    def __init__(self):
+        # Один профиль за раз: профилировщик и замер SQL не смешивают параллельные запросы
+        self.busy = False
+
+    async def run(self, app, scope, receive, send) -> None:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("Профилирование запроса недоступно: не установлен pyinstrument")
+            await app(scope, receive, send)
+            return
+
+        now = datetime.now(timezone.utc)
+        profile_id = f"{now:%Y%m%dT%H%M%S}-{uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        self.busy = True
+        log: List[Tuple[str, float]] = []
+        token = sql_log.set(log)
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - started
+            event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+            event.remove(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+            sql_log.reset(token)
+            self.busy = False
+
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status_code": status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "sql_ms": round(sum(seconds for _, seconds in log) * 1000, 2),
+                "sql_count": len(log),
+                "created_at": now.isoformat(),
+                "sql": sql_summary(log),
+            }
+            try:
+                # Отрисовка и запись файлов — в пуле потоков
+                await asyncio.to_thread(self.save, profile_id, profiler.last_session, summary)
+            except Exception:
+                logger.exception("Не удалось сохранить профиль %s", profile_id)
+
+    @staticmethod
+    def save(profile_id: str, session, summary: dict) -> None:
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        with open(profile_path(profile_id, ".speedscope.json"), "w", encoding="utf-8") as file:
+            file.write(SpeedscopeRenderer().render(session))
+        with open(profile_path(profile_id), "w", encoding="utf-8") as file:
+            json.dump(summary, file, ensure_ascii=False)
+
+        # Хранятся последние PROFILING_MAX_FILES профилей
+        names = sorted(name for name in os.listdir(settings.PROFILING_DIR) if name.endswith(".speedscope.json"))
+        for name in names[:-settings.PROFILING_MAX_FILES]:
+            old_id = name[: -len(".speedscope.json")]
+            for suffix in (".speedscope.json", ".json"):
+                try:
+                    os.remove(profile_path(old_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+
+request_profiler = RequestProfiler()
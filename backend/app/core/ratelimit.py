@@ -0,0 +1,93 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBuckets:
+    """Корзины токенов в памяти процесса (один воркер или бот)"""
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 100000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, cost: float = 1) -> float:
+        """Списать cost токенов; 0 — разрешено, иначе сколько секунд ждать"""
+        now = time.monotonic()
+        cost = min(cost, self.capacity)
+        tokens, updated = self._buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+
+        # Ключ переносится в конец: вытесняются давно неактивные корзины
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Атомарное пополнение и списание на стороне Redis
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = math.min(tonumber(ARGV[4]), capacity)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Общие корзины для нескольких воркеров (нужен пакет redis)"""
+
+    def __init__(self, url: str, rate: float, capacity: float):
+        import redis.asyncio as redis
+
+        self.rate = rate
+        self.capacity = capacity
+        self._client = redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, cost: float = 1) -> float:
+        wait = await self._take(
+            keys=[f"ratelimit:{key}"], args=[self.capacity, self.rate, time.time(), cost]
+        )
+        return float(wait)
+
+
+def create_rate_limiter():
+    """Хранилище корзин по настройке RATE_LIMIT_BACKEND"""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBuckets(settings.REDIS_URL, settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST)
+    # Корзины в памяти у каждого процесса API свои: с полными лимитами общий лимит
+    # был бы в WEB_CONCURRENCY раз выше настроенного, поэтому процесс получает свою долю
+    workers = settings.WEB_CONCURRENCY or 1
+    if workers > 1:
+        logger.warning(
+            "Ограничение частоты в памяти при %d процессах API: лимиты поделены между процессами, "
+            "нужен RATE_LIMIT_BACKEND=redis",
+            workers,
+        )
+    return MemoryBuckets(settings.RATE_LIMIT_RATE / workers, settings.RATE_LIMIT_BURST / workers)
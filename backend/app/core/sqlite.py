@@ -0,0 +1,129 @@
+import asyncio
+import re
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from sqlalchemy.util import await_only
+
+from .config import settings
+
+# Транзакцию в sqlite3 открывает первый изменяющий запрос; чтения до него идут вне транзакции
+WRITE_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+WRITE_KEYWORDS = {"INSERT", "UPDATE", "DELETE", "REPLACE"}
+MAIN_KEYWORDS = WRITE_KEYWORDS | {"SELECT", "VALUES"}
+# Строки, идентификаторы в кавычках, скобки и слова текста запроса
+SQL_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|[()]|\w+")
+WITH_RE = re.compile(r"^\s*WITH\b", re.IGNORECASE)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # Читатели не блокируют писателя и друг друга
+    "PRAGMA synchronous=NORMAL",  # В WAL не теряет целостность, fsync только на контрольных точках
+    "PRAGMA foreign_keys=ON",  # Как в PostgreSQL
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",  # 20 МБ на соединение
+)
+
+
+def is_write(statement: str, context=None) -> bool:
+    """Изменяющий запрос: флаги скомпилированного выражения, для текста — первое слово
+    или, после общего табличного выражения WITH ..., первое ключевое слово вне скобок"""
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        return True
+    if WRITE_RE.match(statement):
+        return True
+    if not WITH_RE.match(statement):
+        return False
+    depth = 0
+    for token in SQL_TOKEN_RE.findall(statement):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and token.upper() in MAIN_KEYWORDS:
+            return token.upper() in WRITE_KEYWORDS
+    return False
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def is_memory(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def sqlite_engine_options(url: str) -> dict:
+    """Параметры create_async_engine для SQLite"""
+    if is_memory(url):
+        # База в памяти живет в одном соединении: оно общее для всех сессий
+        return {"poolclass": StaticPool}
+    # Соединение SQLite — поток без сетевого подключения: сверх постоянных открываются по мере
+    # надобности, но не больше SQLITE_MAX_OVERFLOW (каждое — отдельный поток aiosqlite)
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.SQLITE_POOL_SIZE,
+        "max_overflow": settings.SQLITE_MAX_OVERFLOW,
+    }
+
+
+class WriterLock:
+    """Одна пишущая транзакция на процесс: остальные ждут в очереди asyncio,
+    а не получают "database is locked". Между процессами (API, бот) — busy_timeout.
+    Держит блокировку соединение (conn.info), а не задача: вторая пишущая сессия
+    в той же задаче ждала бы первую вечно, поэтому это ошибка, а не ожидание"""
+
+    def __init__(self):
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owner: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> None:
+        task = asyncio.current_task()
+        if task is not None and self._owner is task:
+            raise RuntimeError("Вторая пишущая транзакция SQLite в той же задаче: пишите в одной сессии")
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        await self._lock.acquire()
+        self._owner = task
+
+    def release(self) -> None:
+        self._owner = None
+        self._lock.release()
+
+
+writer_lock = WriterLock()
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """Прагмы для каждого соединения и очередь писателей (engine — sync_engine)"""
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in PRAGMAS:
+            cursor.execute(pragma)
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+        cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def acquire_writer(conn, cursor, statement, parameters, context, executemany):
+        if not conn.info.get("sqlite_writer") and is_write(statement, context):
+            await_only(writer_lock.acquire())
+            conn.info["sqlite_writer"] = True
+            # sqlite3 сам открывает транзакцию только перед INSERT/UPDATE/DELETE/REPLACE:
+            # WITH ... UPDATE без BEGIN зафиксировался бы сразу, вне транзакции сессии
+            if not WRITE_RE.match(statement):
+                cursor.execute("BEGIN")
+
+    def release_writer(info: dict) -> None:
+        if info.pop("sqlite_writer", False):
+            writer_lock.release()
+
+    event.listen(engine, "commit", lambda conn: release_writer(conn.info))
+    event.listen(engine, "rollback", lambda conn: release_writer(conn.info))
+    # Соединение вернулось в пул без commit/rollback через Connection
+    event.listen(engine.pool, "reset", lambda dbapi_connection, record, *args: release_writer(record.info))
+
@@ -1,11 +1,23 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from .core.compression import PrecompressedStaticFiles
 from .core.config import settings
-from .api import auth, tickets, users
+from .core.database import engine, warm_pool
+from .core.middleware import AdmissionMiddleware, CompressionMiddleware, ProfilingMiddleware, RateLimitMiddleware
+from .api import auth, profiles, tickets, users
+from .services.assignment import workload_reconciler
+from .services.history import history_flusher
+from .services.idempotency import idempotency_cleanup
+from .services.leader import Leader
+from .services.partitions import partition_maintenance
+from .services.similarity import similarity_index
+from .services.sla import sla_scheduler
+import asyncio
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="IT Helpdesk API",
     description="Система управления заявками для IT поддержки",
@@ -14,6 +26,22 @@ app = FastAPI(
     redoc_url="/api/redoc",
 )
 
+# Профилирование запроса администратором (внутренний слой: в профиль не попадает ожидание в очереди допуска)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Сжатие ответов (внешний слой: сжимается итоговое тело)
+app.add_middleware(CompressionMiddleware)
+
+# Допуск по числу одновременных запросов: при перегрузке БД быстрый отказ 503 вместо очереди к пулу
+# (внутри ограничения частоты: отброшенные им запросы не занимают места)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# Ограничение частоты запросов (внутри CORS, чтобы ответ 429 получал CORS-заголовки)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -23,17 +51,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Создание директории для загрузок
+# Создание директории для загрузок; вложения отдаются с проверкой прав
+# через GET /api/tickets/{id}/attachments/{attachment_id} (см. services/storage.py)
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
-# Подключение статических файлов
-if os.path.exists(settings.UPLOAD_DIR):
-    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
-
 # Подключение роутеров
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(tickets.router, prefix="/api/tickets", tags=["Tickets"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["Profiles"])
+
+
+@app.on_event("startup")
+async def warm_up():
+    """Соединения с БД открываются до приема трафика"""
+    try:
+        await warm_pool()
+    except Exception:
+        logger.exception("Не удалось прогреть пул соединений")
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Обслуживание БД — в одном процессе API из всех (см. services/leader.py)
+    maintenance = [
+        # Секции ticket_history на будущие месяцы создаются автоматически
+        partition_maintenance,
+        # Планировщик SLA: куча сроков восстанавливается из БД при старте
+        # (сроки заявок других процессов и бота подбирает опрос индекса due_at)
+        sla_scheduler.run,
+        # Просроченные ключи Idempotency-Key
+        idempotency_cleanup,
+        # Сверка счетчиков нагрузки инженеров для автоназначения
+        workload_reconciler,
+    ]
+    # Перенос событий истории из outbox (в том числе записанных ботом)
+    if settings.HISTORY_WRITE_BEHIND:
+        maintenance.append(history_flusher)
+    app.state.leader_task = asyncio.create_task(Leader(maintenance).run())
+    # Индекс похожих заявок в памяти каждого процесса строится из БД при старте и обновляется при записи
+    app.state.similarity_task = asyncio.create_task(similarity_index.run())
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    tasks = [app.state.leader_task, app.state.similarity_task]
+    for task in tasks:
+        task.cancel()
+    # Ведущий процесс снимает блокировку до закрытия соединений
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Соединения закрываются явно (у aiosqlite это потоки, без закрытия процесс не завершится)
+    await engine.dispose()
 
 
 @app.get("/")
@@ -50,16 +118,20 @@ async def health_check():
     return {"status": "healthy"}
 
 
-# Serve frontend
+# Serve frontend: собранная статика (build_static.py) с хешами в именах и сжатием, иначе исходники
 frontend_path = os.path.join(os.path.dirname(__file__), '..', '..', 'frontend')
+if os.path.exists(os.path.join(frontend_path, 'dist', 'static')):
+    frontend_path = os.path.join(frontend_path, 'dist')
 
+frontend_templates = None
 if os.path.exists(os.path.join(frontend_path, 'static')):
-    app.mount("/static", StaticFiles(directory=os.path.join(frontend_path, 'static')), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory=os.path.join(frontend_path, 'static')), name="static")
+    frontend_templates = PrecompressedStaticFiles(directory=os.path.join(frontend_path, 'templates'))
+
 
 @app.get("/dashboard")
-async def dashboard():
+async def dashboard(request: Request):
     """Serve frontend dashboard"""
-    index_path = os.path.join(frontend_path, 'templates', 'index.html')
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+    if frontend_templates:
+        return await frontend_templates.get_response("index.html", request.scope)
     return {"message": "Frontend not found"}
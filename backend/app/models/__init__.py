@@ -1,4 +1,30 @@
 from .user import User
-from .ticket import Ticket, Comment, TicketHistory, Attachment
+from .ticket import Ticket, Comment, TicketHistory, HistoryOutbox, TicketTombstone, Attachment
+from .job import Job
+from .idempotency import IdempotencyKey
+from .workload import EngineerWorkload
+from .archive import (
+    tickets_archive,
+    comments_archive,
+    ticket_history_archive,
+    attachments_archive,
+    ARCHIVE_TABLES,
+)
 
-__all__ = ["User", "Ticket", "Comment", "TicketHistory", "Attachment"]
+__all__ = [
+    "User",
+    "Ticket",
+    "Comment",
+    "TicketHistory",
+    "HistoryOutbox",
+    "TicketTombstone",
+    "Attachment",
+    "Job",
+    "IdempotencyKey",
+    "EngineerWorkload",
+    "tickets_archive",
+    "comments_archive",
+    "ticket_history_archive",
+    "attachments_archive",
+    "ARCHIVE_TABLES",
+]
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, DateTime, Index, Table
+from sqlalchemy.sql import func
+from ..core.database import Base
+from .ticket import Ticket, Comment, TicketHistory, Attachment
+
+
+def archive_table(source: Table, name: str, *extra) -> Table:
+    """Архивная копия таблицы: те же колонки, без внешних ключей и секционирования"""
+    columns = [
+        Column(
+            column.name,
+            column.type,
+            primary_key=column.name == "id",
+            autoincrement=False,
+            nullable=column.name != "id",
+        )
+        for column in source.columns
+    ]
+    return Table(name, Base.metadata, *columns, *extra)
+
+
+# Закрытые заявки старше ARCHIVE_AFTER_MONTHS переносятся сюда вместе с дочерними строками
+tickets_archive = archive_table(
+    Ticket.__table__,
+    "tickets_archive",
+    Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_tickets_archive_ticket_number", "ticket_number", unique=True),
+)
+comments_archive = archive_table(
+    Comment.__table__, "comments_archive", Index("ix_comments_archive_ticket_id", "ticket_id")
+)
+ticket_history_archive = archive_table(
+    TicketHistory.__table__, "ticket_history_archive", Index("ix_ticket_history_archive_ticket_id", "ticket_id")
+)
+attachments_archive = archive_table(
+    Attachment.__table__, "attachments_archive", Index("ix_attachments_archive_ticket_id", "ticket_id")
+)
+
+# Горячая таблица -> архивная
+ARCHIVE_TABLES = {
+    Ticket.__table__: tickets_archive,
+    Comment.__table__: comments_archive,
+    TicketHistory.__table__: ticket_history_archive,
+    Attachment.__table__: attachments_archive,
+}
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class IdempotencyKey(Base):
+    """Ответ на запрос создания по ключу Idempotency-Key (см. services/idempotency.py)"""
+
+    __tablename__ = "idempotency_keys"
+
+    # Ключи разных пользователей не пересекаются
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # Тот же ключ с другим телом запроса — ошибка
+    status_code = Column(Integer, nullable=True)
+    response = Column(Text, nullable=True)  # JSON исходного ответа
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} user #{self.user_id}>"
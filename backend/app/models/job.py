@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, JSON
+from sqlalchemy.sql import func
+from ..core.database import Base, partial_index
+
+
+class Job(Base):
+    """Фоновая задача (см. services/jobs.py); выполненные задачи удаляются"""
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    task = Column(String(100), nullable=False)  # Имя обработчика
+    payload = Column(JSON, nullable=False, default=dict)
+    priority = Column(Integer, nullable=False, default=0)  # Больше — раньше
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Выборка готовых задач: только очередь, без выполняющихся и dead-letter
+        Index("ix_jobs_queued", priority.desc(), run_at, **partial_index(status == "queued")),
+        Index("ix_jobs_running", locked_at, **partial_index(status == "running")),
+    )
+
+    def __repr__(self):
+        return f"<Job #{self.id} {self.task} ({self.status})>"
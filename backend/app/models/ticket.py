@@ -1,7 +1,31 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON, false
+from sqlalchemy.sql import func, literal_column
 from sqlalchemy.orm import relationship
-from ..core.database import Base
+from ..core.database import SQLITE, Base, partial_index
+
+
+# Следующий номер изменения в SQLite: записи идут по одной, номер больше всех зафиксированных
+NEXT_CHANGE_SQLITE = (
+    "(SELECT COALESCE(MAX(x), 0) + 1 FROM (SELECT MAX(change_xid) AS x FROM tickets "
+    "UNION ALL SELECT MAX(change_xid) FROM ticket_tombstones))"
+)
+
+
+def next_change_xid():
+    """Номер изменения заявки или отметки об удалении (GET /api/tickets/changes):
+    в PostgreSQL — номер транзакции (64 бита, с эпохой)"""
+    if SQLITE:
+        return literal_column(NEXT_CHANGE_SQLITE)
+    return func.txid_current()
+
+
+def change_cursor():
+    """Курсор читателя: все изменения с номером меньше уже зафиксированы (или отменены).
+    В PostgreSQL — xmin снимка: транзакции с меньшими номерами завершены, с большими могут
+    зафиксироваться позже, поэтому следующий запрос выбирает change_xid >= курсора"""
+    if SQLITE:
+        return literal_column(NEXT_CHANGE_SQLITE)
+    return func.txid_snapshot_xmin(func.txid_current_snapshot())
 
 
 class Ticket(Base):
@@ -19,13 +43,51 @@ class Ticket(Base):
     location = Column(String(200))  # Местоположение техники
     equipment_type = Column(String(100))  # Тип техники
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Заполняется и при создании: по нему GET /api/tickets/changes выбирает измененные заявки
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+    # Курсор синхронизации изменений: номер транзакции, а не время (см. change_cursor)
+    change_xid = Column(
+        BigInteger, nullable=False, default=next_change_xid(), onupdate=next_change_xid(), server_default="0", index=True
+    )
     closed_at = Column(DateTime(timezone=True), nullable=True)
+    duplicate_of = Column(Integer, ForeignKey("tickets.id", ondelete="SET NULL"), nullable=True)  # Похожая открытая заявка
+
+    # SLA (см. services/sla.py)
+    response_due_at = Column(DateTime(timezone=True), nullable=True)
+    resolve_due_at = Column(DateTime(timezone=True), nullable=True)
+    due_at = Column(DateTime(timezone=True), nullable=True)  # Ближайший активный срок
+    sla_breached_due_at = Column(DateTime(timezone=True), nullable=True)  # Срок, нарушение которого уже записано
+
+    # Версия для оптимистичной блокировки: ORM пишет UPDATE ... WHERE id = ? AND version = ?
+    # и увеличивает ее; клиент передает версию в If-Match (см. api/tickets.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        # Только открытые заявки со сроком: фильтр overdue=true и загрузка планировщика SLA
+        Index("ix_tickets_due_at", "due_at", **partial_index(due_at.isnot(None))),
+        Index("ix_tickets_duplicate_of", "duplicate_of", **partial_index(duplicate_of.isnot(None))),
+        # Сверка счетчиков нагрузки инженеров с открытыми заявками (services/assignment.py)
+        Index(
+            "ix_tickets_open_workload",
+            "category",
+            "assigned_to",
+            "priority",
+            **partial_index(status.in_(("new", "in_progress"))),
+        ),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     creator = relationship("User", back_populates="created_tickets", foreign_keys=[creator_id])
     assigned_engineer = relationship("User", back_populates="assigned_tickets", foreign_keys=[assigned_to])
     comments = relationship("Comment", back_populates="ticket", cascade="all, delete-orphan")
+    # Комментарии, видимые автору заявки: внутренние не загружаются из БД
+    public_comments = relationship(
+        "Comment",
+        primaryjoin="and_(Ticket.id == Comment.ticket_id, Comment.is_internal == false())",
+        order_by="Comment.created_at",
+        viewonly=True,
+    )
     history = relationship("TicketHistory", back_populates="ticket", cascade="all, delete-orphan")
     attachments = relationship("Attachment", back_populates="ticket", cascade="all, delete-orphan")
 
@@ -40,9 +102,15 @@ class Comment(Base):
     ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     comment_text = Column(Text, nullable=False)
-    is_internal = Column(String(10), default="false")  # Внутренний комментарий
+    is_internal = Column(Boolean, nullable=False, default=False, server_default=false())  # Внутренний комментарий
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_comments_ticket_id", "ticket_id", "created_at"),
+        # Комментарии заявки для обычного пользователя: внутренние строки не читаются
+        Index("ix_comments_public", "ticket_id", "created_at", **partial_index(is_internal == false())),
+    )
+
     # Relationships
     ticket = relationship("Ticket", back_populates="comments")
     user = relationship("User", back_populates="comments")
@@ -53,14 +121,18 @@ class Comment(Base):
 
 class TicketHistory(Base):
     __tablename__ = "ticket_history"
-
-    id = Column(Integer, primary_key=True, index=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    action = Column(String(50), nullable=False)  # created, status_changed, assigned, commented, closed
+    # В PostgreSQL таблица секционирована по месяцам (см. services/partitions.py),
+    # поэтому ключ секционирования входит в первичный ключ. В SQLite секций нет,
+    # а автоинкремент есть только у одиночного INTEGER PRIMARY KEY: ключ — id
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL для системных событий
+    action = Column(String(50), nullable=False)  # created, status_changed, assigned, commented, closed, sla_breached
     old_value = Column(Text)
     new_value = Column(Text)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=not SQLITE, server_default=func.now())
 
     # Relationships
     ticket = relationship("Ticket", back_populates="history")
@@ -70,6 +142,38 @@ class TicketHistory(Base):
         return f"<History: {self.action} on Ticket #{self.ticket_id}>"
 
 
+class HistoryOutbox(Base):
+    """Очередь событий истории (HISTORY_WRITE_BEHIND): одна строка на транзакцию,
+    переносится в ticket_history пакетами (см. services/history.py)"""
+
+    __tablename__ = "ticket_history_outbox"
+
+    id = Column(Integer, primary_key=True)
+    events = Column(JSON, nullable=False)  # [{ticket_id, user_id, action, old_value, new_value, created_at}]
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Строка, которую не удалось перенести HISTORY_OUTBOX_MAX_ATTEMPTS раз, уходит в dead и не задерживает очередь
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending, dead
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<HistoryOutbox #{self.id}: {len(self.events)} events ({self.status})>"
+
+
+class TicketTombstone(Base):
+    """Заявка, удаленная из горячей таблицы (архивация), для клиентов GET /api/tickets/changes"""
+
+    __tablename__ = "ticket_tombstones"
+
+    ticket_id = Column(Integer, primary_key=True)
+    creator_id = Column(Integer, nullable=True)  # Пользователь видит только свои заявки
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    change_xid = Column(BigInteger, nullable=False, default=next_change_xid(), server_default="0", index=True)
+
+    def __repr__(self):
+        return f"<TicketTombstone #{self.ticket_id}>"
+
+
 class Attachment(Base):
     __tablename__ = "attachments"
 
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
+from ..core.database import Base
+
+
+class EngineerWorkload(Base):
+    """Взвешенная нагрузка инженера по открытым заявкам категории (см. services/assignment.py).
+    Меняется в транзакции изменения заявки, периодически сверяется с tickets"""
+
+    __tablename__ = "engineer_workload"
+
+    engineer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String(50), primary_key=True)  # "" — заявки без категории
+    load = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_engineer_workload_category", "category", "load"),
+    )
+
+    def __repr__(self):
+        return f"<EngineerWorkload #{self.engineer_id} {self.category}: {self.load}>"
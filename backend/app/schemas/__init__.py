@@ -1,28 +1,39 @@
-from .user import UserCreate, UserUpdate, UserResponse, UserLogin, Token, TokenData
+from .user import UserCreate, UserUpdate, UserResponse, UserBrief, UserLogin, Token, TokenData
 from .ticket import (
     TicketCreate,
     TicketUpdate,
     TicketResponse,
+    TicketExpandedResponse,
+    TicketRow,
     TicketDetailResponse,
+    TicketDetailRow,
     CommentCreate,
     CommentResponse,
     TicketHistoryResponse,
     AttachmentResponse,
 )
+from .profile import ProfileResponse, ProfileDetailResponse, SqlTiming
 
 __all__ = [
     "UserCreate",
     "UserUpdate",
     "UserResponse",
+    "UserBrief",
     "UserLogin",
     "Token",
     "TokenData",
     "TicketCreate",
     "TicketUpdate",
     "TicketResponse",
+    "TicketExpandedResponse",
+    "TicketRow",
     "TicketDetailResponse",
+    "TicketDetailRow",
     "CommentCreate",
     "CommentResponse",
     "TicketHistoryResponse",
     "AttachmentResponse",
+    "ProfileResponse",
+    "ProfileDetailResponse",
+    "SqlTiming",
 ]
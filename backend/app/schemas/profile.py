@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List
+
+
+class SqlTiming(BaseModel):
+    """Запросы с одинаковым текстом SQL"""
+
+    statement: str
+    count: int
+    total_ms: float
+    max_ms: float
+
+
+class ProfileResponse(BaseModel):
+    id: str
+    method: str
+    path: str
+    query: str
+    status_code: int
+    duration_ms: float
+    sql_ms: float
+    sql_count: int
+    created_at: datetime
+
+
+class ProfileDetailResponse(ProfileResponse):
+    sql: List[SqlTiming] = []
@@ -1,7 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, List
+from typing_extensions import TypedDict
 from datetime import datetime
 
+from .user import UserBrief, UserBriefRow
+
 
 class TicketBase(BaseModel):
     title: str = Field(..., min_length=3, max_length=200)
@@ -36,11 +39,70 @@ class TicketResponse(TicketBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     closed_at: Optional[datetime] = None
+    response_due_at: Optional[datetime] = None
+    resolve_due_at: Optional[datetime] = None
+    due_at: Optional[datetime] = None
+    duplicate_of: Optional[int] = None
+    version: int = 1  # Передается в If-Match при изменении заявки
 
     class Config:
         from_attributes = True
 
 
+class TicketExpandedResponse(TicketResponse):
+    """Заявка с данными автора и исполнителя (expand=creator,assignee)"""
+
+    creator: Optional[UserBrief] = None
+    assignee: Optional[UserBrief] = None
+
+
+class TicketRow(TypedDict, total=False):
+    """Строка списка заявок из Core-запроса (без ORM); поля как в TicketResponse"""
+
+    title: str
+    description: Optional[str]
+    category: str
+    priority: str
+    location: Optional[str]
+    equipment_type: Optional[str]
+    id: int
+    ticket_number: str
+    status: str
+    creator_id: int
+    assigned_to: Optional[int]
+    created_at: datetime
+    updated_at: Optional[datetime]
+    closed_at: Optional[datetime]
+    response_due_at: Optional[datetime]
+    resolve_due_at: Optional[datetime]
+    due_at: Optional[datetime]
+    duplicate_of: Optional[int]
+    version: int
+    creator: Optional[UserBriefRow]
+    assignee: Optional[UserBriefRow]
+
+
+# Сериализатор строк в JSON компилируется один раз при импорте
+ticket_rows_adapter = TypeAdapter(List[TicketRow])
+
+
+class TicketChangesResponse(BaseModel):
+    """Изменения списка заявок после водяного знака"""
+
+    watermark: str  # Передается как since в следующем запросе
+    tickets: List[TicketResponse] = []  # Созданные и измененные заявки, подходящие под фильтры
+    removed: List[int] = []  # Удаленные или переставшие подходить под фильтры
+
+
+class TicketChangesRow(TypedDict):
+    watermark: str
+    tickets: List[TicketRow]
+    removed: List[int]
+
+
+ticket_changes_adapter = TypeAdapter(TicketChangesRow)
+
+
 class CommentBase(BaseModel):
     comment_text: str = Field(..., min_length=1)
     is_internal: bool = False
@@ -63,7 +125,7 @@ class CommentResponse(CommentBase):
 class TicketHistoryResponse(BaseModel):
     id: int
     ticket_id: int
-    user_id: int
+    user_id: Optional[int] = None
     action: str
     old_value: Optional[str] = None
     new_value: Optional[str] = None
@@ -85,7 +147,18 @@ class AttachmentResponse(BaseModel):
         from_attributes = True
 
 
-class TicketDetailResponse(TicketResponse):
+class TicketDetailResponse(TicketExpandedResponse):
     comments: List[CommentResponse] = []
     history: List[TicketHistoryResponse] = []
     attachments: List[AttachmentResponse] = []
+
+
+class TicketDetailRow(TicketRow, total=False):
+    """Детальная заявка, собранная из Core-строк; поля как в TicketDetailResponse"""
+
+    comments: List[CommentResponse]
+    history: List[TicketHistoryResponse]
+    attachments: List[AttachmentResponse]
+
+
+ticket_detail_adapter = TypeAdapter(TicketDetailRow)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
+from typing_extensions import TypedDict
 from datetime import datetime
 
 
@@ -30,6 +31,22 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserBrief(BaseModel):
+    """Краткие данные пользователя внутри заявки (expand=creator,assignee)"""
+
+    id: int
+    username: Optional[str] = None
+    full_name: str
+    role: str
+
+
+class UserBriefRow(TypedDict):
+    id: int
+    username: Optional[str]
+    full_name: str
+    role: str
+
+
 class UserLogin(BaseModel):
     username: str
     password: str
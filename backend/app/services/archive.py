@@ -0,0 +1,86 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..core.config import settings
+from ..core.database import engine
+from ..models.ticket import Ticket, Comment, TicketHistory, TicketTombstone, Attachment
+from ..models.archive import ARCHIVE_TABLES
+from .cache import ticket_cache
+from .partitions import drop_empty_history_partitions
+
+logger = logging.getLogger(__name__)
+
+# Дочерние таблицы переносятся раньше заявок из-за внешних ключей
+ARCHIVE_ORDER = [Comment.__table__, TicketHistory.__table__, Attachment.__table__, Ticket.__table__]
+
+
+async def archive_closed_tickets(
+    months: int = settings.ARCHIVE_AFTER_MONTHS,
+    batch_size: int = settings.ARCHIVE_BATCH_SIZE,
+    bind: AsyncEngine = engine,
+) -> int:
+    """Перенос заявок, закрытых более months месяцев назад, в архивные таблицы"""
+    tickets = Ticket.__table__
+    cutoff = datetime.now(timezone.utc) - relativedelta(months=months)
+    total = 0
+
+    while True:
+        # Каждая пачка переносится в отдельной транзакции
+        async with bind.begin() as conn:
+            result = await conn.execute(
+                select(tickets.c.id)
+                .where(tickets.c.status == "closed", tickets.c.closed_at < cutoff)
+                .order_by(tickets.c.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            ticket_ids = result.scalars().all()
+            if not ticket_ids:
+                break
+
+            # Клиенты синхронизации узнают, что заявки пропали из списка
+            await conn.execute(
+                insert(TicketTombstone.__table__).from_select(
+                    ["ticket_id", "creator_id"],
+                    select(tickets.c.id, tickets.c.creator_id).where(tickets.c.id.in_(ticket_ids)),
+                )
+            )
+
+            for source in ARCHIVE_ORDER:
+                target = ARCHIVE_TABLES[source]
+                key = source.c.id if source is tickets else source.c.ticket_id
+                await conn.execute(
+                    insert(target).from_select(
+                        [column.name for column in source.columns],
+                        select(*source.columns).where(key.in_(ticket_ids)),
+                    )
+                )
+                await conn.execute(delete(source).where(key.in_(ticket_ids)))
+
+        for ticket_id in ticket_ids:
+            await ticket_cache.invalidate(ticket_id)
+        total += len(ticket_ids)
+        logger.info("В архив перенесено заявок: %s", total)
+
+    # Клиенты с более старым водяным знаком все равно загружают список заново.
+    # Последняя отметка остается: в SQLite по ней считается следующий номер изменения
+    tombstones = TicketTombstone.__table__
+    expired = datetime.now(timezone.utc) - timedelta(days=settings.CHANGES_RETENTION_DAYS)
+    async with bind.begin() as conn:
+        await conn.execute(
+            delete(tombstones).where(
+                tombstones.c.deleted_at < expired,
+                tombstones.c.change_xid < select(func.max(tombstones.c.change_xid)).scalar_subquery(),
+            )
+        )
+
+    async with bind.begin() as conn:
+        dropped = await drop_empty_history_partitions(conn, cutoff)
+    if dropped:
+        logger.info("Удалены пустые секции: %s", ", ".join(dropped))
+
+    return total
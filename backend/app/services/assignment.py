@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from collections import defaultdict
+from itertools import chain
+from typing import Optional, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SQLITE, engine
+from ..models.ticket import Ticket
+from ..models.user import User
+from ..models.workload import EngineerWorkload
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ("new", "in_progress")
+
+# Вес открытой заявки в нагрузке инженера: приоритет x категория
+PRIORITY_WEIGHTS = {"low": 1, "medium": 2, "high": 4, "critical": 8}
+CATEGORY_WEIGHTS = {"hardware": 3, "software": 2}  # Оборудование требует выезда
+
+# Первый ключ advisory-блокировки выбора инженера, второй — хеш категории:
+# назначения в одной категории сериализованы между процессами API и ботом, в разных — нет
+ASSIGN_LOCK_CLASS = 7283
+
+# Поля заявки, от которых зависит нагрузка
+TRACKED = ("assigned_to", "status", "category", "priority")
+
+workload = EngineerWorkload.__table__
+
+
+def ticket_weight(category: Optional[str], priority: Optional[str]) -> int:
+    return PRIORITY_WEIGHTS.get(priority, 2) * CATEGORY_WEIGHTS.get(category, 2)
+
+
+# Тот же вес в SQL для сверки счетчиков
+ticket_weight_sql = case(PRIORITY_WEIGHTS, value=Ticket.priority, else_=2) * case(
+    CATEGORY_WEIGHTS, value=Ticket.category, else_=2
+)
+
+
+def open_load(assigned_to, status, category, priority) -> Optional[Tuple[Tuple[int, str], int]]:
+    """((инженер, категория), вес) для открытой назначенной заявки"""
+    if assigned_to is None or (status or "new") not in OPEN_STATUSES:
+        return None
+    return (assigned_to, category or ""), ticket_weight(category, priority)
+
+
+def tracked_changed(ticket: Ticket) -> bool:
+    state = inspect(ticket)
+    return any(state.attrs[name].history.added for name in TRACKED)
+
+
+def tracked_values(session: Session, ticket: Ticket, before: bool) -> tuple:
+    """Значения TRACKED до или после сброса. Прежнее значение, которого нет в сессии
+    (поле не загружалось, например assigned_to после вставки), читается из строки заявки"""
+    state = inspect(ticket)
+    histories = [state.attrs[name].history for name in TRACKED]
+    if not before:
+        return tuple((history.added or history.unchanged or [None])[0] for history in histories)
+    if all(history.deleted or history.unchanged for history in histories):
+        return tuple((history.deleted or history.unchanged)[0] for history in histories)
+    columns = [getattr(Ticket, name) for name in TRACKED]
+    return tuple(session.connection().execute(select(*columns).where(Ticket.id == ticket.id)).one())
+
+
+def upsert_load(dialect: str, engineer_id: int, category: str, delta: int):
+    """INSERT ... ON CONFLICT DO UPDATE load = load + delta (PostgreSQL и SQLite)"""
+    stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(workload).values(
+        engineer_id=engineer_id, category=category, load=delta
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[workload.c.engineer_id, workload.c.category],
+        set_={"load": workload.c.load + stmt.excluded.load},
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def track_workload(session: Session, flush_context, instances) -> None:
+    """Изменение нагрузки инженеров в той же транзакции, что и изменение заявок"""
+    deltas = defaultdict(int)
+    for ticket in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(ticket, Ticket):
+            continue
+        existing = ticket not in session.new
+        if existing and ticket not in session.deleted and not tracked_changed(ticket):
+            continue
+        if existing:
+            before = open_load(*tracked_values(session, ticket, before=True))
+            if before:
+                deltas[before[0]] -= before[1]
+        if ticket not in session.deleted:
+            after = open_load(*tracked_values(session, ticket, before=False))
+            if after:
+                deltas[after[0]] += after[1]
+
+    # Строки по порядку ключа: параллельные транзакции блокируют их в одном порядке
+    changes = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if changes:
+        connection = session.connection()
+        for (engineer_id, category), delta in changes:
+            connection.execute(upsert_load(connection.dialect.name, engineer_id, category, delta))
+
+
+async def least_loaded_engineer(db: AsyncSession, category: Optional[str]) -> Optional[int]:
+    """Инженер с наименьшей взвешенной нагрузкой по открытым заявкам категории
+    (при равенстве — с меньшим id): чтение счетчиков, без агрегата по заявкам"""
+    return await db.scalar(
+        select(User.id)
+        .outerjoin(
+            EngineerWorkload,
+            (EngineerWorkload.engineer_id == User.id) & (EngineerWorkload.category == (category or "")),
+        )
+        .where(User.role == "engineer")
+        .order_by(func.coalesce(EngineerWorkload.load, 0), User.id)
+        .limit(1)
+    )
+
+
+async def auto_assign(db: AsyncSession, ticket: Ticket) -> Optional[int]:
+    """Назначение новой заявки на наименее загруженного инженера категории (AUTO_ASSIGN_ENABLED).
+    Вызывается после вставки заявки в той же транзакции: блокировка категории держится
+    до фиксации, поэтому параллельные создания видят счетчики друг друга.
+    PostgreSQL — advisory-блокировка транзакции, SQLite — блокировка записи, взятая вставкой"""
+    if not settings.AUTO_ASSIGN_ENABLED:
+        return None
+    if not SQLITE:
+        await db.execute(select(func.pg_advisory_xact_lock(ASSIGN_LOCK_CLASS, func.hashtext(ticket.category or ""))))
+    engineer_id = await least_loaded_engineer(db, ticket.category)
+    if engineer_id is not None:
+        ticket.assigned_to = engineer_id
+        await db.flush()
+    return engineer_id
+
+
+async def reconcile_workload() -> None:
+    """Пересчет счетчиков по открытым заявкам: исправляет расхождения после записей
+    в обход ORM (загрузка тестовых данных, ручные правки)"""
+    category = func.coalesce(Ticket.category, "")
+    load = (
+        select(Ticket.assigned_to, category, func.sum(ticket_weight_sql))
+        .where(Ticket.status.in_(OPEN_STATUSES), Ticket.assigned_to.isnot(None))
+        .group_by(Ticket.assigned_to, category)
+    )
+    async with engine.begin() as conn:
+        await conn.execute(delete(workload))
+        await conn.execute(insert(workload).from_select(["engineer_id", "category", "load"], load))
+
+
+async def workload_reconciler(interval: float = settings.WORKLOAD_RECONCILE_INTERVAL) -> None:
+    """Фоновая задача ведущего процесса: сверка при старте и раз в interval секунд"""
+    while True:
+        try:
+            await reconcile_workload()
+        except Exception:
+            logger.exception("Ошибка сверки нагрузки инженеров")
+        await asyncio.sleep(interval)
@@ -0,0 +1,189 @@
+import logging
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Optional, Sequence, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Поколение ключа живет дольше любого чтения из БД: истекшее поколение не совпадет с прочитанным
+GENERATION_TTL = 3600
+
+# Запись значения, только если поколение не изменилось с начала чтения из БД (атомарно в Redis)
+SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[1]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[3])
+end
+"""
+
+
+class MemoryCache:
+    """LRU-кэш в памяти процесса с ограничением по числу записей и TTL"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._clock = count(1)
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def generation(self, tag: str) -> int:
+        return self._generations.get(tag, 0)
+
+    async def bump(self, tag: str) -> None:
+        self._generations[tag] = next(self._clock)
+        self._generations.move_to_end(tag)
+        while len(self._generations) > self.max_entries:
+            self._generations.popitem(last=False)
+
+    async def set_if_generation(self, tag: str, generation: int, key: str, value: bytes) -> None:
+        if self._generations.get(tag, 0) == generation:
+            await self.set(key, value)
+
+
+class RedisCache:
+    """Общий кэш для нескольких воркеров и узлов (нужен пакет redis)"""
+
+    def __init__(self, url: str, ttl: float):
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self._client = redis.from_url(url)
+        self._set_if_generation = self._client.register_script(SET_IF_GENERATION)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        await self._client.set(key, value, px=int((ttl or self.ttl) * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def generation(self, tag: str) -> int:
+        return int(await self._client.get(f"gen:{tag}") or 0)
+
+    async def bump(self, tag: str) -> None:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.incr(f"gen:{tag}")
+            pipe.expire(f"gen:{tag}", GENERATION_TTL)
+            await pipe.execute()
+
+    async def set_if_generation(self, tag: str, generation: int, key: str, value: bytes) -> None:
+        await self._set_if_generation(keys=[f"gen:{tag}", key], args=[generation, value, int(self.ttl * 1000)])
+
+
+class NullCache:
+    """Кэш выключен: каждый запрос читает БД"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    async def generation(self, tag: str) -> int:
+        return 0
+
+    async def bump(self, tag: str) -> None:
+        pass
+
+    async def set_if_generation(self, tag: str, generation: int, key: str, value: bytes) -> None:
+        pass
+
+
+def create_cache():
+    """Бэкенд кэша по настройке CACHE_BACKEND"""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache(settings.REDIS_URL, settings.CACHE_TTL)
+    # Инвалидация в памяти видна только своему процессу: при нескольких процессах API
+    # остальные отдавали бы устаревшие заявки до CACHE_TTL
+    if (settings.WEB_CONCURRENCY or 1) > 1:
+        logger.warning("Кэш заявок выключен: несколько процессов API, нужен CACHE_BACKEND=redis")
+        return NullCache()
+    return MemoryCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL)
+
+
+class TicketCache:
+    """Кэш сериализованной детальной заявки по видимости (сотрудник / пользователь)"""
+
+    SCOPES = ("staff", "user")
+    # Варианты expand детальной заявки (TICKET_EXPANSIONS в api/tickets.py), по отсортированным именам;
+    # смена имени пользователя видна в развернутых заявках не позже чем через CACHE_TTL
+    EXPANDS = ((), ("assignee",), ("creator",), ("assignee", "creator"))
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def key(ticket_id: int, scope: str, expand: Sequence[str] = ()) -> str:
+        if expand:
+            return f"ticket:{ticket_id}:{scope}:{','.join(expand)}"
+        return f"ticket:{ticket_id}:{scope}"
+
+    async def generation(self, ticket_id: int) -> int:
+        """Отметка перед чтением из БД. Поколения защищают от записи устаревших данных:
+        если заявку инвалидировали, пока запрос читал БД, результат в кэш не попадет"""
+        return await self.backend.generation(f"ticket:{ticket_id}")
+
+    async def get(self, ticket_id: int, scope: str, expand: Sequence[str] = ()) -> Optional[Tuple[int, bytes]]:
+        """(creator_id, JSON) или None"""
+        value = await self.backend.get(self.key(ticket_id, scope, expand))
+        if value is None:
+            return None
+        creator_id, payload = value.split(b"\n", 1)
+        return int(creator_id), payload
+
+    async def set(
+        self,
+        ticket_id: int,
+        scope: str,
+        creator_id: int,
+        payload: bytes,
+        generation: int,
+        expand: Sequence[str] = (),
+    ) -> None:
+        # creator_id хранится рядом с JSON для проверки прав без запроса к БД
+        await self.backend.set_if_generation(
+            f"ticket:{ticket_id}",
+            generation,
+            self.key(ticket_id, scope, expand),
+            b"%d\n%s" % (creator_id or 0, payload),
+        )
+
+    async def invalidate(self, ticket_id: int) -> None:
+        """Вызывается после каждой записи, затрагивающей заявку (API, бот, архивация)"""
+        await self.backend.bump(f"ticket:{ticket_id}")
+        await self.backend.delete(
+            *(self.key(ticket_id, scope, expand) for scope in self.SCOPES for expand in self.EXPANDS)
+        )
+
+
+ticket_cache = TicketCache(create_cache())
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from sqlalchemy import select, func
+
+from ..core.config import settings
+from ..core.database import async_session_maker
+from ..models.ticket import Ticket
+from ..models.user import User
+from .assignment import OPEN_STATUSES
+
+# Счетчики заявок обычного пользователя (только свои заявки)
+USER_STATUSES = ("new", "in_progress", "resolved")
+
+# (status, assigned_to, critical, count) по открытым заявкам
+StaffRows = List[Tuple[str, int, bool, int]]
+
+
+async def load_staff_rows() -> StaffRows:
+    """Один сгруппированный запрос по открытым заявкам; из него считаются счетчики любого сотрудника"""
+    critical = (Ticket.priority == "critical").label("critical")
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(Ticket.status, Ticket.assigned_to, critical, func.count())
+            .where(Ticket.status.in_(OPEN_STATUSES))
+            .group_by(Ticket.status, Ticket.assigned_to, critical)
+        )
+        return [tuple(row) for row in result]
+
+
+async def load_user_counts(user_id: int) -> Dict[str, int]:
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(Ticket.status, func.count())
+            .where(Ticket.creator_id == user_id, Ticket.status.in_(USER_STATUSES))
+            .group_by(Ticket.status)
+        )
+        counts = dict(result.all())
+    return {status: counts.get(status, 0) for status in USER_STATUSES}
+
+
+def staff_counts(rows: StaffRows, user_id: int) -> Dict[str, int]:
+    counts = {"new": 0, "in_progress": 0, "mine": 0, "critical": 0}
+    for status, assigned_to, critical, total in rows:
+        counts[status] += total
+        if assigned_to == user_id:
+            counts["mine"] += total
+        if critical:
+            counts["critical"] += total
+    return counts
+
+
+class CountersCache:
+    """Кэш счетчиков на несколько секунд; одновременные запросы ждут один запрос к БД"""
+
+    def __init__(self, ttl: float, max_entries: int = settings.CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._values: Dict[str, Tuple[float, object]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._generation = 0
+
+    async def get(self, key: str, loader: Callable[[], Awaitable]):
+        item = self._values.get(key)
+        if item and item[0] > time.monotonic():
+            return item[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            # Отдельная задача со своей сессией: отмена запроса-инициатора не отменяет остальных
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, generation=self._generation: self._store(key, done, generation))
+        return await asyncio.shield(task)
+
+    def _store(self, key: str, task: asyncio.Task, generation: int) -> None:
+        # После invalidate() по ключу мог начаться новый запрос: его не трогаем
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Результат запроса, начатого до записи, в кэш не попадает
+        if task.cancelled() or task.exception() or generation != self._generation:
+            return
+        if len(self._values) >= self.max_entries:
+            now = time.monotonic()
+            self._values = {k: v for k, v in self._values.items() if v[0] > now}
+        self._values[key] = (time.monotonic() + self.ttl, task.result())
+
+    def invalidate(self) -> None:
+        """Вызывается после записи, меняющей статус, приоритет или исполнителя заявки;
+        новые запросы не присоединяются к загрузкам, начатым до нее"""
+        self._generation += 1
+        self._values.clear()
+        self._inflight.clear()
+
+
+ticket_counters = CountersCache(settings.COUNTERS_TTL)
+
+
+async def get_counters(user: User) -> Dict[str, int]:
+    """Счетчики для стартовой страницы по роли пользователя"""
+    if user.role == "user":
+        return await ticket_counters.get(f"user:{user.id}", lambda: load_user_counts(user.id))
+    return staff_counts(await ticket_counters.get("staff", load_staff_rows), user.id)
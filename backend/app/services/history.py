@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import engine
+from ..models.ticket import HistoryOutbox, TicketHistory
+from .cache import ticket_cache
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки: пакеты переносит один воркер, чтобы id истории шли по порядку
+OUTBOX_LOCK_KEY = 0x6F757462
+
+PENDING_KEY = "history_events"
+INSERT_CHUNK = 1000
+
+
+def add_history(
+    db: AsyncSession,
+    ticket_id: int,
+    user_id: Optional[int],
+    action: str,
+    old_value: Optional[str] = None,
+    new_value: Optional[str] = None,
+) -> None:
+    """Запись события истории в текущей транзакции: сразу в ticket_history
+    или, при HISTORY_WRITE_BEHIND, одной строкой outbox на транзакцию"""
+    if not settings.HISTORY_WRITE_BEHIND:
+        db.add(TicketHistory(
+            ticket_id=ticket_id,
+            user_id=user_id,
+            action=action,
+            old_value=old_value,
+            new_value=new_value,
+        ))
+        return
+
+    # Время события фиксируется сейчас, а не при переносе: хронология остается точной
+    db.info.setdefault(PENDING_KEY, []).append({
+        "ticket_id": ticket_id,
+        "user_id": user_id,
+        "action": action,
+        "old_value": old_value,
+        "new_value": new_value,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+@event.listens_for(Session, "before_commit")
+def write_outbox(session: Session) -> None:
+    """События транзакции сохраняются в outbox вместе с изменениями заявки"""
+    events = session.info.pop(PENDING_KEY, None)
+    if events:
+        session.add(HistoryOutbox(events=events))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_pending(session: Session, previous_transaction) -> None:
+    """События отмененной транзакции не пишутся"""
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
+
+
+def outbox_events(batches: Iterable[List[dict]]) -> List[dict]:
+    """Строки ticket_history из событий outbox: по времени, при равенстве — в порядке записи"""
+    events = [dict(item, created_at=datetime.fromisoformat(item["created_at"])) for batch in batches for item in batch]
+    events.sort(key=lambda item: item["created_at"])
+    return events
+
+
+async def insert_history(conn, events: List[dict]) -> None:
+    # Многострочные INSERT частями: не упираемся в лимит параметров запроса
+    for start in range(0, len(events), INSERT_CHUNK):
+        await conn.execute(insert(TicketHistory).values(events[start:start + INSERT_CHUNK]))
+
+
+async def flush_history_outbox(batch_size: int = settings.HISTORY_FLUSH_BATCH) -> int:
+    """Перенос пакета событий в ticket_history одним многострочным INSERT; возвращает число событий.
+    Если пакет не вставляется (например, заявку уже перенесли в архив), строки outbox переносятся
+    по одной в своих точках сохранения: ошибочная строка получает попытку и после
+    HISTORY_OUTBOX_MAX_ATTEMPTS уходит в dead, остальные переносятся"""
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            locked = await conn.scalar(select(func.pg_try_advisory_xact_lock(OUTBOX_LOCK_KEY)))
+            if not locked:
+                return 0
+
+        result = await conn.execute(
+            select(HistoryOutbox.id, HistoryOutbox.events, HistoryOutbox.attempts)
+            .where(HistoryOutbox.status == "pending")
+            .order_by(HistoryOutbox.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return 0
+
+        moved = rows
+        try:
+            async with conn.begin_nested():
+                await insert_history(conn, outbox_events(row.events for row in rows))
+        except DBAPIError:
+            moved = []
+            for row in rows:
+                try:
+                    async with conn.begin_nested():
+                        await insert_history(conn, outbox_events([row.events]))
+                except DBAPIError as exc:
+                    attempts = row.attempts + 1
+                    dead = attempts >= settings.HISTORY_OUTBOX_MAX_ATTEMPTS
+                    await conn.execute(
+                        update(HistoryOutbox)
+                        .where(HistoryOutbox.id == row.id)
+                        .values(attempts=attempts, status="dead" if dead else "pending", last_error=repr(exc.orig))
+                    )
+                    log = logger.error if dead else logger.warning
+                    log("Строка outbox истории #%s, попытка %s: %r", row.id, attempts, exc.orig)
+                else:
+                    moved.append(row)
+
+        # Удаление в той же транзакции: при сбое события останутся в outbox
+        if moved:
+            await conn.execute(delete(HistoryOutbox).where(HistoryOutbox.id.in_([row.id for row in moved])))
+
+    events = [item for row in moved for item in row.events]
+    for ticket_id in {item["ticket_id"] for item in events}:
+        await ticket_cache.invalidate(ticket_id)
+    return len(events)
+
+
+async def history_flusher(interval: float = settings.HISTORY_FLUSH_INTERVAL) -> None:
+    """Фоновая задача: переносит outbox, пока он не опустеет, затем ждет interval секунд"""
+    while True:
+        try:
+            while await flush_history_outbox():
+                pass
+        except Exception:
+            logger.exception("Ошибка переноса событий истории")
+        await asyncio.sleep(interval)
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import engine
+from ..models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+keys = IdempotencyKey.__table__
+
+
+class Replay(NamedTuple):
+    """Сохраненный ответ на первый запрос с тем же ключом"""
+
+    status_code: int
+    body: bytes
+
+
+class KeyReused(Exception):
+    """Ключ уже использован для запроса с другим телом"""
+
+
+def request_hash(operation: str, payload: dict) -> str:
+    data = json.dumps([operation, payload], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def insert_ignore(dialect: str):
+    """INSERT ... ON CONFLICT DO NOTHING (PostgreSQL и SQLite)"""
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    return insert(keys).on_conflict_do_nothing()
+
+
+async def claim(db: AsyncSession, user_id: int, key: str, fingerprint: str) -> Optional[Replay]:
+    """Захват ключа в транзакции создания: None — запрос выполняется впервые (ответ сохраняет
+    complete до фиксации), иначе — сохраненный ответ. Одновременный повтор ждет на уникальном
+    ключе, пока первый запрос не зафиксируется или не откатится"""
+    match = (keys.c.user_id == user_id) & (keys.c.key == key)
+    expired = datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+    # Просроченный ключ можно использовать заново
+    await db.execute(delete(keys).where(match, keys.c.created_at < expired))
+
+    result = await db.execute(
+        insert_ignore(db.get_bind().dialect.name).values(user_id=user_id, key=key, request_hash=fingerprint)
+    )
+    if result.rowcount:
+        return None
+
+    row = (await db.execute(select(keys.c.request_hash, keys.c.status_code, keys.c.response).where(match))).first()
+    if row.request_hash != fingerprint or row.response is None:
+        raise KeyReused(key)
+    return Replay(row.status_code, row.response.encode())
+
+
+async def complete(db: AsyncSession, user_id: int, key: str, status_code: int, body: bytes) -> None:
+    """Ответ сохраняется в той же транзакции, что и созданные данные"""
+    await db.execute(
+        update(keys)
+        .where(keys.c.user_id == user_id, keys.c.key == key)
+        .values(status_code=status_code, response=body.decode())
+    )
+
+
+async def prune_idempotency_keys() -> int:
+    expired = datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+    async with engine.begin() as conn:
+        result = await conn.execute(delete(keys).where(keys.c.created_at < expired))
+    return result.rowcount
+
+
+async def idempotency_cleanup(interval: float = settings.IDEMPOTENCY_CLEANUP_INTERVAL) -> None:
+    """Фоновая задача: удаляет ключи старше IDEMPOTENCY_TTL_HOURS"""
+    while True:
+        try:
+            await prune_idempotency_keys()
+        except Exception:
+            logger.exception("Ошибка очистки ключей идемпотентности")
+        await asyncio.sleep(interval)
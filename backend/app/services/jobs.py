@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import engine
+from ..models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Имя задачи -> обработчик; регистрируются декоратором job_handler
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(task: str):
+    """Регистрация обработчика фоновой задачи"""
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[task] = func
+        return func
+    return decorator
+
+
+def enqueue(
+    db: AsyncSession,
+    task: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    delay: Optional[timedelta] = None,
+    max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+) -> Job:
+    """Постановка задачи в текущей транзакции: задача появится только вместе с изменениями"""
+    job = Job(
+        task=task,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=datetime.now(timezone.utc) + (delay or timedelta()),
+    )
+    db.add(job)
+    return job
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Экспоненциальная задержка повтора с разбросом, чтобы повторы не шли волной"""
+    seconds = min(settings.JOB_BACKOFF_BASE * 2 ** (attempts - 1), settings.JOB_BACKOFF_MAX)
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+async def dequeue(batch_size: int, worker_id: str) -> List[Job]:
+    """Захват пакета готовых задач; SKIP LOCKED позволяет воркерам не ждать друг друга"""
+    now = datetime.now(timezone.utc)
+    ready = (
+        select(Job.id)
+        .where(Job.status == "queued", Job.run_at <= now)
+        .order_by(Job.priority.desc(), Job.run_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            update(Job)
+            .where(Job.id.in_(ready))
+            .values(status="running", attempts=Job.attempts + 1, locked_at=now, locked_by=worker_id)
+            .returning(Job.id, Job.task, Job.payload, Job.attempts, Job.max_attempts)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+
+async def finish(job, error: Optional[str] = None) -> None:
+    """Выполненная задача удаляется; ошибка — повтор с задержкой или dead-letter"""
+    async with engine.begin() as conn:
+        if error is None:
+            await conn.execute(delete(Job).where(Job.id == job.id))
+        elif job.attempts >= job.max_attempts:
+            logger.error("Задача #%s %s перемещена в dead-letter: %s", job.id, job.task, error)
+            await conn.execute(
+                update(Job).where(Job.id == job.id).values(status="dead", locked_at=None, last_error=error)
+            )
+        else:
+            await conn.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(
+                    status="queued",
+                    locked_at=None,
+                    locked_by=None,
+                    last_error=error,
+                    run_at=datetime.now(timezone.utc) + retry_delay(job.attempts),
+                )
+            )
+
+
+async def execute(job) -> None:
+    handler = JOB_HANDLERS.get(job.task)
+    try:
+        if handler is None:
+            raise LookupError(f"Неизвестная задача: {job.task}")
+        await asyncio.wait_for(handler(job.payload), settings.JOB_TIMEOUT)
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        logger.warning("Задача #%s %s, попытка %s: %r", job.id, job.task, job.attempts, exc)
+        await finish(job, repr(exc))
+    else:
+        await finish(job)
+
+
+async def requeue_stale() -> int:
+    """Возврат в очередь задач аварийно завершившихся воркеров (исчерпавших попытки — в dead-letter)"""
+    stale = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            update(Job)
+            .where(Job.status == "running", Job.locked_at < stale)
+            .values(
+                status=case((Job.attempts >= Job.max_attempts, "dead"), else_="queued"),
+                locked_at=None,
+                locked_by=None,
+                last_error="Истекло время блокировки",
+            )
+        )
+        return result.rowcount
+
+
+async def retry_dead(task: Optional[str] = None) -> int:
+    """Повторный запуск задач из dead-letter"""
+    query = update(Job).where(Job.status == "dead")
+    if task:
+        query = query.where(Job.task == task)
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            query.values(status="queued", attempts=0, run_at=datetime.now(timezone.utc))
+        )
+        return result.rowcount
+
+
+class Worker:
+    """Воркер очереди: пакетная выборка и параллельное выполнение до concurrency задач"""
+
+    def __init__(
+        self,
+        concurrency: int = settings.JOB_CONCURRENCY,
+        batch_size: int = settings.JOB_BATCH_SIZE,
+        poll_interval: float = settings.JOB_POLL_INTERVAL,
+    ):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = asyncio.Event()
+        self._running: set = set()
+
+    def stop(self) -> None:
+        """Мягкая остановка: новые задачи не берутся, текущие дорабатывают"""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        logger.info("Воркер %s запущен", self.worker_id)
+        stale_checked = 0.0
+        loop = asyncio.get_running_loop()
+
+        while not self._stopping.is_set():
+            try:
+                if loop.time() - stale_checked > settings.JOB_LOCK_TIMEOUT / 2:
+                    await requeue_stale()
+                    stale_checked = loop.time()
+
+                free = self.concurrency - len(self._running)
+                if not free:
+                    await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                limit = min(free, self.batch_size)
+                jobs = await dequeue(limit, self.worker_id)
+                for job in jobs:
+                    task = asyncio.create_task(execute(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+
+                # Полный пакет — в очереди, вероятно, есть еще: берем сразу
+                if len(jobs) == limit:
+                    continue
+            except Exception:
+                logger.exception("Ошибка воркера очереди")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        if self._running:
+            await asyncio.wait(self._running)
+        logger.info("Воркер %s остановлен", self.worker_id)
@@ -0,0 +1,117 @@
+"""
+Фоновое обслуживание в одном процессе API
+Процессов API несколько (serve.py --workers N), а секции истории, планировщик SLA,
+чистка ключей идемпотентности и перенос outbox истории нужны в одном экземпляре.
+Ведущий процесс выбирается блокировкой: PostgreSQL — сессионная advisory-блокировка
+на отдельном соединении, SQLite — flock файла рядом с базой. Остальные процессы
+повторяют попытку раз в LEADER_RETRY_INTERVAL секунд и подхватывают задачи,
+если ведущий остановился.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from ..core.config import settings
+from ..core.database import SQLITE, engine
+from ..core.sqlite import is_memory
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки ведущего процесса
+LEADER_LOCK_ID = 7_283_415_001
+
+Probe = Callable[[], Awaitable[None]]
+
+
+@asynccontextmanager
+async def postgres_leadership():
+    """Probe, пока блокировка у этого процесса, иначе None. Соединение держится до ухода с поста"""
+    async with engine.connect() as conn:
+        acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": LEADER_LOCK_ID})
+        # Блокировка сессионная: транзакция не нужна и не должна висеть открытой
+        await conn.commit()
+        if not acquired:
+            yield None
+            return
+
+        async def probe() -> None:
+            await conn.execute(text("SELECT 1"))
+            await conn.commit()
+
+        try:
+            yield probe
+        finally:
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": LEADER_LOCK_ID})
+                await conn.commit()
+            except Exception:
+                # Соединение с блокировкой не должно вернуться в пул
+                await conn.invalidate()
+
+
+async def noop_probe() -> None:
+    return None
+
+
+@asynccontextmanager
+async def sqlite_leadership():
+    """flock на файле <база>.leader; база в памяти — всегда один процесс"""
+    database = make_url(settings.DATABASE_URL).database
+    if is_memory(settings.DATABASE_URL):
+        yield noop_probe
+        return
+    fd = os.open(f"{database}.leader", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield None
+            return
+        yield noop_probe
+    finally:
+        # Закрытие файла снимает блокировку
+        os.close(fd)
+
+
+class Leader:
+    """Запускает задачи, пока процесс ведущий; при потере блокировки задачи отменяются"""
+
+    def __init__(
+        self,
+        factories: List[Callable[[], Awaitable[None]]],
+        retry_interval: float = settings.LEADER_RETRY_INTERVAL,
+    ):
+        self.factories = factories
+        self.retry_interval = retry_interval
+
+    async def lead(self, probe: Probe) -> None:
+        tasks = [asyncio.create_task(factory()) for factory in self.factories]
+        logger.info("Процесс %s выполняет фоновое обслуживание", os.getpid())
+        try:
+            while True:
+                await asyncio.sleep(self.retry_interval)
+                # Ошибка соединения с блокировкой — блокировку мог получить другой процесс
+                await probe()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self) -> None:
+        leadership = sqlite_leadership if SQLITE else postgres_leadership
+        while True:
+            try:
+                async with leadership() as probe:
+                    if probe is not None:
+                        await self.lead(probe)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка выбора ведущего процесса")
+            await asyncio.sleep(self.retry_interval)
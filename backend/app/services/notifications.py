@@ -0,0 +1,113 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import async_session_maker
+from ..models.ticket import Ticket
+from ..models.user import User
+from .jobs import enqueue, job_handler
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/sendMessage"
+
+# Уведомления видны пользователю — выполняются раньше служебных задач
+NOTIFY_PRIORITY = 10
+
+STATUS_NAMES = {"new": "Новая", "in_progress": "В работе", "resolved": "Решена", "closed": "Закрыта"}
+
+_client = None
+
+
+def notify_ticket(db: AsyncSession, ticket_id: int, event: str, actor_id: Optional[int] = None) -> None:
+    """Уведомление участников заявки через очередь задач (assigned, status_changed, commented)"""
+    enqueue(
+        db,
+        "notify_ticket",
+        {"ticket_id": ticket_id, "event": event, "actor_id": actor_id},
+        priority=NOTIFY_PRIORITY,
+    )
+
+
+def ticket_messages(ticket: Ticket, event: str) -> List[Tuple[Optional[int], str]]:
+    """(id получателя, текст) для события заявки"""
+    header = f"<code>{ticket.ticket_number}</code> {ticket.title}"
+    if event == "assigned":
+        return [
+            (ticket.assigned_to, f"📌 Вам назначена заявка {header}"),
+            (ticket.creator_id, f"👨‍🔧 Заявка {header} передана инженеру"),
+        ]
+    if event == "status_changed":
+        status = STATUS_NAMES.get(ticket.status, ticket.status)
+        return [(ticket.creator_id, f"🔄 Заявка {header}: статус «{status}»")]
+    if event == "commented":
+        return [
+            (ticket.creator_id, f"💬 Новый комментарий к заявке {header}"),
+            (ticket.assigned_to, f"💬 Новый комментарий к заявке {header}"),
+        ]
+    return []
+
+
+async def send_telegram(chat_id: int, text: str) -> None:
+    global _client
+    import httpx
+
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=10)
+
+    response = await _client.post(
+        TELEGRAM_API_URL.format(token=settings.TELEGRAM_BOT_TOKEN),
+        json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"},
+    )
+    # Пользователь заблокировал бота или чат не найден — повтор не поможет
+    if response.status_code in (400, 403):
+        logger.info("Уведомление в чат %s не доставлено: %s", chat_id, response.text)
+        return
+    # 429 и 5xx — исключение, задача будет повторена с задержкой
+    response.raise_for_status()
+
+
+@job_handler("notify_ticket")
+async def notify_ticket_job(payload: Dict[str, Any]) -> None:
+    """Разбор события на получателей: каждому — отдельная задача notify_user,
+    чтобы повтор после сбоя отправки не дублировал уже доставленные сообщения"""
+    if not settings.TELEGRAM_BOT_TOKEN:
+        logger.debug("TELEGRAM_BOT_TOKEN не задан, уведомление пропущено: %s", payload)
+        return
+
+    async with async_session_maker() as db:
+        ticket = await db.get(Ticket, payload["ticket_id"])
+        if ticket is None:
+            return
+
+        messages = [
+            (user_id, text)
+            for user_id, text in ticket_messages(ticket, payload["event"])
+            if user_id and user_id != payload.get("actor_id")
+        ]
+        if not messages:
+            return
+
+        result = await db.execute(
+            select(User.id, User.telegram_id).where(User.id.in_({user_id for user_id, _ in messages}))
+        )
+        chats = {user_id: telegram_id for user_id, telegram_id in result if telegram_id}
+
+        queued = set()
+        for user_id, text in messages:
+            if user_id in chats and user_id not in queued:
+                enqueue(db, "notify_user", {"chat_id": chats[user_id], "text": text}, priority=NOTIFY_PRIORITY)
+                queued.add(user_id)
+        # Задачи получателей фиксируются одной транзакцией: после нее разбор не повторяется
+        await db.commit()
+
+
+@job_handler("notify_user")
+async def notify_user_job(payload: Dict[str, Any]) -> None:
+    """Отправка одного сообщения; повторяется только для этого получателя"""
+    if not settings.TELEGRAM_BOT_TOKEN:
+        return
+    await send_telegram(payload["chat_id"], payload["text"])
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..core.config import settings
+from ..core.database import engine
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = "ticket_history"
+DEFAULT_PARTITION = f"{HISTORY_TABLE}_default"
+PARTITION_NAME_RE = re.compile(rf"^{HISTORY_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Ключ advisory-блокировки: воркеры не создают секции одновременно
+PARTITION_LOCK_KEY = 0x68697374
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{HISTORY_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def partitions_ddl(start: date, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """DDL месячных секций ticket_history от start до months_ahead месяцев вперед"""
+    last = add_months(month_start(today or datetime.now(timezone.utc)), months_ahead)
+    statements = [f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {HISTORY_TABLE} DEFAULT"]
+
+    month = month_start(start)
+    while month <= last:
+        upper = add_months(month, 1)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {HISTORY_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        month = upper
+    return statements
+
+
+async def ensure_history_partitions(
+    conn: AsyncConnection,
+    start: Optional[date] = None,
+    months_ahead: int = settings.HISTORY_PARTITIONS_AHEAD,
+) -> None:
+    """Создание недостающих секций ticket_history (только PostgreSQL)"""
+    if conn.dialect.name != "postgresql":
+        return
+
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    for statement in partitions_ddl(start or datetime.now(timezone.utc), months_ahead):
+        try:
+            async with conn.begin_nested():
+                await conn.exec_driver_sql(statement)
+        except DBAPIError as exc:
+            # Например, в секции по умолчанию уже есть строки за этот месяц
+            logger.warning("Не удалось создать секцию ticket_history: %s", exc)
+
+
+async def drop_empty_history_partitions(conn: AsyncConnection, before: date) -> List[str]:
+    """Удаление пустых месячных секций старше before (после архивации)"""
+    if conn.dialect.name != "postgresql":
+        return []
+
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": HISTORY_TABLE},
+    )
+
+    dropped = []
+    for name in result.scalars():
+        match = PARTITION_NAME_RE.match(name)
+        if not match or date(int(match[1]), int(match[2]), 1) >= month_start(before):
+            continue
+        if await conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})")):
+            continue
+        await conn.exec_driver_sql(f"DROP TABLE {name}")
+        dropped.append(name)
+    return dropped
+
+
+async def partition_maintenance(interval: float = 24 * 60 * 60) -> None:
+    """Фоновая задача: раз в interval секунд создает секции на будущие месяцы"""
+    while True:
+        try:
+            async with engine.begin() as conn:
+                await ensure_history_partitions(conn)
+        except Exception:
+            logger.exception("Ошибка обслуживания секций ticket_history")
+        await asyncio.sleep(interval)
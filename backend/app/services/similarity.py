@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import async_session_maker
+from ..models.ticket import Ticket, change_cursor
+from .assignment import OPEN_STATUSES
+from .sla import as_utc
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+")
+
+
+def normalize(value: Optional[str]) -> str:
+    return " ".join(WORD_RE.findall((value or "").lower()))
+
+
+def shingles(title: Optional[str], description: Optional[str] = None) -> FrozenSet[str]:
+    """Символьные триграммы заголовка и описания: устойчивы к опечаткам и порядку слов"""
+    text = f" {normalize(title)} {normalize(description)} "
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def bucket_key(location: Optional[str], equipment_type: Optional[str]) -> Tuple[str, str]:
+    return normalize(location), normalize(equipment_type)
+
+
+# Заявки без места и типа техники не связаны между собой: корзина ("", "") общая для всей системы
+EMPTY_BUCKET = ("", "")
+
+# Поля заявки, которые нужны индексу
+INDEX_COLUMNS = (
+    Ticket.id,
+    Ticket.ticket_number,
+    Ticket.title,
+    Ticket.description,
+    Ticket.location,
+    Ticket.equipment_type,
+    Ticket.status,
+    Ticket.duplicate_of,
+    Ticket.created_at,
+)
+
+
+class Entry(NamedTuple):
+    ticket_number: str
+    bucket: Tuple[str, str]
+    shingles: FrozenSet[str]
+    created_at: datetime
+
+
+class SimilarTicket(NamedTuple):
+    id: int
+    ticket_number: str
+    score: float
+
+
+class SimilarityIndex:
+    """Инвертированный индекс триграмм недавних открытых заявок по (location, equipment_type).
+    Индекс свой в каждом процессе API и в боте; заявки других процессов подгружаются
+    из БД по курсору изменений (change_xid), если в своем индексе похожей нет"""
+
+    def __init__(
+        self,
+        threshold: float = settings.SIMILARITY_THRESHOLD,
+        window: timedelta = timedelta(hours=settings.SIMILARITY_WINDOW_HOURS),
+    ):
+        self.threshold = threshold
+        self.window = window
+        self._entries: Dict[int, Entry] = {}
+        # bucket -> триграмма -> id заявок
+        self._postings: Dict[Tuple[str, str], Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        # Курсор изменений на момент последней загрузки из БД; None — индекс еще не построен
+        self._cursor: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, ticket: Ticket) -> None:
+        """Индексация заявки после создания или изменения; закрытые удаляются из индекса.
+        Дубликаты не индексируются: новые заявки связываются с исходной заявкой, а не с дубликатом"""
+        self.remove(ticket.id)
+        bucket = bucket_key(ticket.location, ticket.equipment_type)
+        if ticket.status not in OPEN_STATUSES or ticket.duplicate_of is not None or bucket == EMPTY_BUCKET:
+            return
+        self._insert(ticket.id, Entry(
+            ticket.ticket_number,
+            bucket,
+            shingles(ticket.title, ticket.description),
+            as_utc(ticket.created_at or datetime.now(timezone.utc)),
+        ))
+
+    def _insert(self, ticket_id: int, entry: Entry) -> None:
+        self._entries[ticket_id] = entry
+        postings = self._postings[entry.bucket]
+        for shingle in entry.shingles:
+            postings[shingle].add(ticket_id)
+
+    def remove(self, ticket_id: int) -> None:
+        entry = self._entries.pop(ticket_id, None)
+        if entry is None:
+            return
+        postings = self._postings[entry.bucket]
+        for shingle in entry.shingles:
+            ids = postings.get(shingle)
+            if ids is not None:
+                ids.discard(ticket_id)
+                if not ids:
+                    del postings[shingle]
+        if not postings:
+            del self._postings[entry.bucket]
+
+    def find(
+        self,
+        title: Optional[str],
+        description: Optional[str],
+        location: Optional[str],
+        equipment_type: Optional[str],
+        exclude: Optional[int] = None,
+    ) -> Optional[SimilarTicket]:
+        """Самая похожая заявка того же места и типа техники (коэффициент Жаккара >= threshold);
+        без места и типа техники поиск не выполняется"""
+        bucket = bucket_key(location, equipment_type)
+        if bucket == EMPTY_BUCKET:
+            return None
+        postings = self._postings.get(bucket)
+        query = shingles(title, description)
+        if not postings or not query:
+            return None
+
+        # Пересечения считаются только по заявкам с общими триграммами
+        common: Counter = Counter()
+        for shingle in query:
+            ids = postings.get(shingle)
+            if ids:
+                common.update(ids)
+
+        oldest = datetime.now(timezone.utc) - self.window
+        best = None
+        for ticket_id, shared in common.items():
+            entry = self._entries[ticket_id]
+            if ticket_id == exclude:
+                continue
+            if entry.created_at < oldest:
+                self.remove(ticket_id)
+                continue
+            score = shared / (len(query) + len(entry.shingles) - shared)
+            if score >= self.threshold and (best is None or (score, -ticket_id) > (best.score, -best.id)):
+                best = SimilarTicket(ticket_id, entry.ticket_number, score)
+        return best
+
+    async def search(
+        self,
+        db: AsyncSession,
+        title: Optional[str],
+        description: Optional[str],
+        location: Optional[str],
+        equipment_type: Optional[str],
+    ) -> Optional[SimilarTicket]:
+        """find по индексу процесса; без совпадения — повторно после подгрузки изменений из БД,
+        чтобы дубликаты сбоя, пришедшие через разные процессы, связывались сразу"""
+        found = self.find(title, description, location, equipment_type)
+        if found is None and self._cursor is not None and bucket_key(location, equipment_type) != EMPTY_BUCKET:
+            await self.catch_up(db)
+            found = self.find(title, description, location, equipment_type)
+        return found
+
+    async def catch_up(self, db: AsyncSession) -> None:
+        """Заявки, созданные или измененные с последней загрузки, в том числе другими процессами.
+        Курсор берется до выборки: изменения незавершенных транзакций попадут в следующую"""
+        cursor = await db.scalar(select(change_cursor()))
+        result = await db.execute(select(*INDEX_COLUMNS).where(Ticket.change_xid >= self._cursor))
+        for row in result:
+            self.add(row)
+        self._cursor = cursor
+
+    async def rebuild(self) -> None:
+        """Загрузка недавних открытых заявок из БД (при старте и для истечения окна)"""
+        started = datetime.now(timezone.utc)
+        async with async_session_maker() as db:
+            cursor = await db.scalar(select(change_cursor()))
+            result = await db.execute(
+                select(*INDEX_COLUMNS).where(
+                    Ticket.status.in_(OPEN_STATUSES),
+                    Ticket.duplicate_of.is_(None),
+                    Ticket.created_at >= started - self.window,
+                )
+            )
+            rows = result.all()
+
+        index = SimilarityIndex(self.threshold, self.window)
+        for row in rows:
+            index.add(row)
+        # Заявки, проиндексированные этим процессом во время запроса, не теряются
+        for ticket_id, entry in self._entries.items():
+            if entry.created_at >= started and ticket_id not in index._entries:
+                index._insert(ticket_id, entry)
+        self._entries, self._postings = index._entries, index._postings
+        self._cursor = cursor
+
+    async def run(self, interval: float = settings.SIMILARITY_REBUILD_INTERVAL) -> None:
+        """Фоновая задача: периодическое перестроение индекса"""
+        while True:
+            try:
+                started = time.monotonic()
+                await self.rebuild()
+                logger.info(
+                    "Индекс похожих заявок: %d записей за %.3f с", len(self), time.monotonic() - started
+                )
+            except Exception:
+                logger.exception("Ошибка перестроения индекса похожих заявок")
+            await asyncio.sleep(interval)
+
+
+similarity_index = SimilarityIndex()
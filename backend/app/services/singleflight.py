@@ -0,0 +1,34 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых чтений: пока запрос к БД выполняется,
+    остальные запросы с тем же ключом ждут его результат"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            # Отдельная задача со своей сессией: отмена запроса-инициатора не отменяет остальных
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Ошибка доставлена ожидающим; если их не осталось, она не попадает в лог как необработанная
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate(self) -> None:
+        """Вызывается после записи: новые запросы не присоединяются к чтениям, начатым до нее"""
+        self._inflight.clear()
+
+
+# Список и детальная заявка (api/tickets.py)
+ticket_reads = SingleFlight()
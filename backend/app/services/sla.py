@@ -0,0 +1,200 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+
+from ..core.config import settings
+from ..core.database import async_session_maker
+from ..models.ticket import Ticket
+from .cache import ticket_cache
+from .history import add_history
+
+logger = logging.getLogger(__name__)
+
+# Целевое время реакции и решения по приоритету
+RESPONSE_TARGETS = {
+    "critical": timedelta(minutes=15),
+    "high": timedelta(hours=1),
+    "medium": timedelta(hours=4),
+    "low": timedelta(hours=24),
+}
+RESOLUTION_TARGETS = {
+    "critical": timedelta(hours=4),
+    "high": timedelta(hours=8),
+    "medium": timedelta(days=3),
+    "low": timedelta(days=7),
+}
+
+# Переопределения для категорий: (категория, приоритет) -> (реакция, решение).
+# Ремонт оборудования требует выезда и закупок, поэтому решение дольше
+CATEGORY_TARGETS = {
+    ("hardware", "critical"): (timedelta(minutes=15), timedelta(hours=8)),
+    ("hardware", "high"): (timedelta(hours=1), timedelta(days=1)),
+    ("hardware", "medium"): (timedelta(hours=4), timedelta(days=5)),
+    ("hardware", "low"): (timedelta(hours=24), timedelta(days=10)),
+}
+
+
+def as_utc(value: datetime) -> datetime:
+    """SQLite возвращает наивные даты; считаем их UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def sla_targets(category: Optional[str], priority: Optional[str]) -> Tuple[timedelta, timedelta]:
+    priority = priority or "medium"
+    return CATEGORY_TARGETS.get(
+        (category, priority), (RESPONSE_TARGETS[priority], RESOLUTION_TARGETS[priority])
+    )
+
+
+def apply_sla(ticket: Ticket, now: Optional[datetime] = None) -> None:
+    """Пересчет сроков SLA заявки после создания или изменения приоритета, категории, статуса"""
+    created_at = as_utc(ticket.created_at or now or datetime.now(timezone.utc))
+    response, resolution = sla_targets(ticket.category, ticket.priority)
+    ticket.response_due_at = created_at + response
+    ticket.resolve_due_at = created_at + resolution
+
+    # due_at — ближайший активный срок; по нему строится индекс просроченных заявок
+    status = ticket.status or "new"
+    if status == "new":
+        ticket.due_at = ticket.response_due_at
+    elif status == "in_progress":
+        ticket.due_at = ticket.resolve_due_at
+    else:
+        ticket.due_at = None
+
+
+class SLAScheduler:
+    """Мин-куча ближайших сроков SLA; нарушения записываются в ticket_history.
+    Работает только в ведущем процессе (services/leader.py): сроки заявок из других
+    процессов API и бота он подбирает опросом индекса ix_tickets_due_at раз в
+    SLA_POLL_INTERVAL секунд — заранее, до наступления срока"""
+
+    def __init__(
+        self,
+        rescan_interval: float = settings.SLA_RESCAN_INTERVAL,
+        poll_interval: float = settings.SLA_POLL_INTERVAL,
+    ):
+        self.rescan_interval = rescan_interval
+        self.poll_interval = poll_interval
+        self.active = False
+        self._heap: List[Tuple[datetime, int]] = []
+        self._queued: Set[Tuple[datetime, int]] = set()
+        self._wakeup = asyncio.Event()
+
+    def push(self, due_at: datetime, ticket_id: int) -> bool:
+        """True, если срок стал ближайшим"""
+        entry = (as_utc(due_at), ticket_id)
+        if entry in self._queued:
+            return False
+        self._queued.add(entry)
+        heapq.heappush(self._heap, entry)
+        return self._heap[0] == entry
+
+    def schedule(self, ticket_id: int, due_at: Optional[datetime]) -> None:
+        """Добавить срок заявки; вне ведущего процесса срок подберет опрос ведущего"""
+        if not self.active or due_at is None:
+            return
+        if self.push(due_at, ticket_id):
+            self._wakeup.set()
+
+    async def load(self, *conditions) -> None:
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(Ticket.due_at, Ticket.id).where(
+                    Ticket.due_at.isnot(None),
+                    Ticket.sla_breached_due_at.is_distinct_from(Ticket.due_at),
+                    *conditions,
+                )
+            )
+            for due_at, ticket_id in result:
+                self.push(due_at, ticket_id)
+
+    async def rebuild(self) -> None:
+        """Все незафиксированные сроки из БД: при старте и раз в SLA_RESCAN_INTERVAL"""
+        self._heap = []
+        self._queued = set()
+        await self.load()
+
+    async def poll(self, now: datetime) -> None:
+        """Сроки, наступающие до следующего опроса, в том числе заявок других процессов"""
+        await self.load(Ticket.due_at <= now + timedelta(seconds=self.poll_interval))
+
+    async def report_breach(self, ticket_id: int, due_at: datetime) -> bool:
+        """Фиксация нарушения; условный UPDATE гарантирует одну запись на срок среди всех воркеров"""
+        async with async_session_maker() as db:
+            result = await db.execute(
+                update(Ticket)
+                .where(
+                    Ticket.id == ticket_id,
+                    Ticket.due_at == due_at,
+                    Ticket.sla_breached_due_at.is_distinct_from(due_at),
+                )
+                .values(sla_breached_due_at=due_at)
+                .returning(Ticket.status)
+            )
+            row = result.first()
+            if not row:
+                return False
+
+            kind = "response" if row.status == "new" else "resolution"
+            add_history(db, ticket_id, None, "sla_breached", kind, due_at.isoformat())
+            await db.commit()
+
+        await ticket_cache.invalidate(ticket_id)
+        logger.warning("Нарушен SLA (%s) по заявке #%s", kind, ticket_id)
+        return True
+
+    async def run(self) -> None:
+        """Фоновая задача ведущего: спит до ближайшего срока, появления более раннего или опроса"""
+        self.active = True
+        try:
+            await self.rebuild()
+            rebuilt_at = polled_at = time.monotonic()
+
+            while True:
+                try:
+                    now = datetime.now(timezone.utc)
+                    while self._heap and self._heap[0][0] <= now:
+                        entry = heapq.heappop(self._heap)
+                        self._queued.discard(entry)
+                        due_at, ticket_id = entry
+                        await self.report_breach(ticket_id, due_at)
+
+                    elapsed = time.monotonic()
+                    timeout = min(
+                        self.rescan_interval - (elapsed - rebuilt_at),
+                        self.poll_interval - (elapsed - polled_at),
+                    )
+                    if self._heap:
+                        timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+                    except asyncio.TimeoutError:
+                        pass
+
+                    if time.monotonic() - rebuilt_at >= self.rescan_interval:
+                        await self.rebuild()
+                        rebuilt_at = polled_at = time.monotonic()
+                    elif time.monotonic() - polled_at >= self.poll_interval:
+                        await self.poll(datetime.now(timezone.utc))
+                        polled_at = time.monotonic()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Ошибка планировщика SLA")
+                    await asyncio.sleep(1)
+        finally:
+            # Процесс перестал быть ведущим: куча больше не читается
+            self.active = False
+            self._heap = []
+            self._queued = set()
+
+
+sla_scheduler = SLAScheduler()
@@ -0,0 +1,229 @@
+import asyncio
+import os
+import re
+from typing import AsyncIterator, Optional, Tuple, Union
+from urllib.parse import quote
+from uuid import uuid4
+
+import aiofiles
+
+from ..core.config import settings
+
+CHUNK_SIZE = 65536
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def new_key(file_name: str) -> str:
+    """Ключ вложения ab/cd/<uuid>.ext: файлы равномерно распределены по 65536 каталогам"""
+    ext = os.path.splitext(file_name)[1].lower()[:10]
+    name = uuid4().hex
+    return f"{name[:2]}/{name[2:4]}/{name}{ext}"
+
+
+def incoming_path(key: str) -> str:
+    """Временный файл для загрузки до передачи в хранилище"""
+    return os.path.join(settings.UPLOAD_DIR, ".incoming", key.replace("/", "_") + ".part")
+
+
+def content_disposition(file_name: str) -> str:
+    quoted = quote(file_name)
+    if quoted != file_name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{file_name}"'
+
+
+def parse_range(header: str, size: int) -> Union[None, bool, Tuple[int, int]]:
+    """(start, end) включительно; None — отдать файл целиком; False — диапазон вне файла"""
+    match = RANGE_RE.match(header.strip())
+    # Несколько диапазонов не поддерживаются: отдается весь файл
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # bytes=-N: последние N байт
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+async def read_range(path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as file:
+        await file.seek(start)
+        while length > 0:
+            chunk = await file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def write_chunks(path: str, chunks: AsyncIterator[bytes]) -> int:
+    """Запись потока в файл через .part: недописанный файл не виден под итоговым именем"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.part"
+    size = 0
+    try:
+        async with aiofiles.open(partial, "wb") as file:
+            async for chunk in chunks:
+                size += len(chunk)
+                await file.write(chunk)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return size
+
+
+class LocalStorage:
+    """Вложения на локальном диске; отдача с поддержкой Range или через X-Accel-Redirect (sendfile в nginx)"""
+
+    def __init__(self, root: str, accel_redirect: Optional[str] = None):
+        self.root = os.path.realpath(root)
+        self.accel_redirect = accel_redirect
+
+    def path(self, key: str) -> str:
+        # Старые записи хранят абсолютный путь внутри UPLOAD_DIR
+        path = os.path.realpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise FileNotFoundError(key)
+        return path
+
+    async def save(self, key: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        return await write_chunks(self.path(key), chunks)
+
+    async def save_file(self, key: str, source: str, content_type: Optional[str] = None) -> None:
+        """Перенос готового файла (тот же диск — переименование без копирования)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source, path)
+
+    async def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def response(self, key: str, file_name: str, content_type: Optional[str], range_header: Optional[str]):
+        # Импорт здесь: бот пишет в хранилище без веб-зависимостей
+        from starlette.responses import FileResponse, Response, StreamingResponse
+
+        path = self.path(key)
+        stat = os.stat(path)
+
+        if self.accel_redirect:
+            # nginx отдает файл сам (sendfile, Range), процесс API не читает ни байта
+            return Response(
+                headers={
+                    "X-Accel-Redirect": self.accel_redirect.rstrip("/") + "/" + os.path.relpath(path, self.root),
+                    "Content-Disposition": content_disposition(file_name),
+                },
+                media_type=content_type,
+            )
+
+        response = FileResponse(path, media_type=content_type, filename=file_name, stat_result=stat)
+        response.headers["Accept-Ranges"] = "bytes"
+        byte_range = parse_range(range_header, stat.st_size) if range_header else None
+        if byte_range is None:
+            return response
+        if byte_range is False:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{stat.st_size}"})
+
+        start, end = byte_range
+        headers = dict(response.headers)
+        headers["content-length"] = str(end - start + 1)
+        headers["content-range"] = f"bytes {start}-{end}/{stat.st_size}"
+        return StreamingResponse(read_range(path, start, end - start + 1), status_code=206, headers=headers)
+
+
+class S3Storage:
+    """S3-совместимое хранилище (AWS, MinIO): скачивание по временной подписанной ссылке мимо API
+    (нужен пакет boto3)"""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str],
+        public_endpoint_url: Optional[str],
+        region: str,
+        access_key: Optional[str],
+        secret_key: Optional[str],
+        url_ttl: int,
+    ):
+        import boto3
+        from botocore.config import Config
+
+        def client(endpoint):
+            return boto3.client(
+                "s3",
+                endpoint_url=endpoint,
+                region_name=region,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                config=Config(signature_version="s3v4"),
+            )
+
+        self.bucket = bucket
+        self.url_ttl = url_ttl
+        self._client = client(endpoint_url)
+        # Подпись включает хост: ссылки для браузера подписываются внешним адресом хранилища
+        self._signer = client(public_endpoint_url) if public_endpoint_url else self._client
+
+    async def save(self, key: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        # Поток пишется во временный файл через aiofiles (запись в пуле потоков, не в цикле событий),
+        # затем загружается в S3 из потока
+        path = incoming_path(key)
+        size = await write_chunks(path, chunks)
+        try:
+            await self.save_file(key, path, content_type)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+        return size
+
+    async def save_file(self, key: str, source: str, content_type: Optional[str] = None) -> None:
+        with open(source, "rb") as file:
+            await asyncio.to_thread(self._upload, file, key, content_type)
+        os.remove(source)
+
+    def _upload(self, file, key: str, content_type: Optional[str]) -> None:
+        extra = {"ContentType": content_type} if content_type else None
+        self._client.upload_fileobj(file, self.bucket, key, ExtraArgs=extra)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=key)
+
+    def url(self, key: str, file_name: str, content_type: Optional[str] = None) -> str:
+        """Подписанная ссылка на STORAGE_URL_TTL секунд; вычисляется локально, без запроса к S3"""
+        params = {"Bucket": self.bucket, "Key": key, "ResponseContentDisposition": content_disposition(file_name)}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self._signer.generate_presigned_url("get_object", Params=params, ExpiresIn=self.url_ttl)
+
+    def response(self, key: str, file_name: str, content_type: Optional[str], range_header: Optional[str]):
+        """Перенаправление на подписанную ссылку: файл и Range отдает хранилище, а не API"""
+        from starlette.responses import RedirectResponse
+
+        return RedirectResponse(self.url(key, file_name, content_type), status_code=307)
+
+
+def create_storage():
+    """Хранилище вложений по настройке STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            settings.S3_BUCKET,
+            settings.S3_ENDPOINT_URL,
+            settings.S3_PUBLIC_ENDPOINT_URL,
+            settings.S3_REGION,
+            settings.S3_ACCESS_KEY,
+            settings.S3_SECRET_KEY,
+            settings.STORAGE_URL_TTL,
+        )
+    return LocalStorage(settings.UPLOAD_DIR, settings.STORAGE_ACCEL_REDIRECT)
+
+
+storage = create_storage()
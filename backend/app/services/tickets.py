@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ticket import Ticket
+from ..models.archive import tickets_archive
+
+
+def generate_ticket_number(year: int, count: int) -> str:
+    """Генерация номера заявки"""
+    return f"IT-{year}-{count:04d}"
+
+
+async def next_ticket_number(db: AsyncSession) -> str:
+    """Следующий номер заявки за текущий год, включая архивные заявки"""
+    current_year = datetime.now().year
+    pattern = f"IT-{current_year}-%"
+
+    count = 0
+    for table in (Ticket.__table__, tickets_archive):
+        count += await db.scalar(
+            select(func.count()).select_from(table).where(table.c.ticket_number.like(pattern))
+        )
+
+    return generate_ticket_number(current_year, count + 1)
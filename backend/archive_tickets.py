@@ -0,0 +1,37 @@
+"""
+Архивация закрытых заявок
+Переносит заявки, закрытые более N месяцев назад, вместе с комментариями,
+историей и вложениями в архивные таблицы и создает будущие секции ticket_history.
+
+Пример (по cron раз в сутки):
+    python archive_tickets.py --months 12
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.archive import archive_closed_tickets
+from app.services.partitions import ensure_history_partitions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Архивация закрытых заявок")
+    parser.add_argument("--months", type=int, default=settings.ARCHIVE_AFTER_MONTHS,
+                        help="Архивировать заявки, закрытые более N месяцев назад")
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                        help="Заявок в одной транзакции")
+    args = parser.parse_args()
+
+    async with engine.begin() as conn:
+        await ensure_history_partitions(conn)
+
+    total = await archive_closed_tickets(args.months, args.batch_size)
+    print(f"Перенесено в архив заявок: {total}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Бенчмарк сериализации списка заявок
+Сравнивает прежний путь FastAPI (ORM-объекты, response_model=List[TicketResponse],
+serialize_response + jsonable_encoder + JSONResponse) с текущим (Core-строки +
+TypeAdapter.dump_json + FastJSONResponse) на данных из DATABASE_URL:
+  - эндпоинт — запрос GET через ASGI: прежний обработчик против get_tickets,
+    оба в одном приложении без middleware и авторизации;
+  - сериализация — только превращение уже загруженной страницы в байты ответа.
+
+Пример (после generate_data.py):
+    python bench_serialization.py --limit 50 --iterations 500
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.tickets import TICKET_LIST_COLUMNS, get_tickets
+from app.api.users import get_current_user
+from app.core.database import async_session_maker, engine, get_db
+from app.core.responses import FastJSONResponse
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.schemas.ticket import TicketExpandedResponse, TicketResponse, ticket_rows_adapter
+
+baseline_field = create_response_field("Response", List[TicketResponse])
+
+bench = FastAPI()
+
+
+@bench.get("/baseline", response_model=List[TicketResponse])
+async def get_tickets_baseline(limit: int = 50, db: AsyncSession = Depends(get_db)):
+    """Прежний get_tickets: ORM-гидрация, сериализация по response_model"""
+    result = await db.execute(select(Ticket).order_by(Ticket.created_at.desc()).limit(limit))
+    return result.scalars().all()
+
+
+bench.add_api_route(
+    "/current", get_tickets, response_model=List[TicketExpandedResponse], response_class=FastJSONResponse
+)
+# Администратор видит все заявки, как и прежний обработчик без фильтра по автору
+bench.dependency_overrides[get_current_user] = lambda: User(id=0, role="admin")
+
+
+async def fastapi_dump(tickets) -> bytes:
+    """Прежняя сериализация FastAPI для уже загруженных ORM-объектов"""
+    content = await serialize_response(field=baseline_field, response_content=tickets)
+    return JSONResponse(content).body
+
+
+def adapter_dump(rows) -> bytes:
+    return ticket_rows_adapter.dump_json(rows)
+
+
+async def measure(name: str, func, iterations: int) -> float:
+    await func()  # прогрев
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    elapsed = time.perf_counter() - started
+    rps = iterations / elapsed
+    print(f"{name:<10} {rps:>10.1f} запросов/с  {elapsed / iterations * 1000:>8.2f} мс/запрос")
+    return rps
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сериализации списка заявок")
+    parser.add_argument("--limit", type=int, default=50, help="Размер страницы")
+    parser.add_argument("--iterations", type=int, default=200, help="Число запросов на вариант")
+    args = parser.parse_args()
+    params = {"limit": args.limit}
+
+    async with async_session_maker() as session:
+        result = await session.execute(select(Ticket).order_by(Ticket.created_at.desc()).limit(args.limit))
+        tickets = result.scalars().all()
+        result = await session.execute(
+            select(*TICKET_LIST_COLUMNS).order_by(Ticket.created_at.desc()).limit(args.limit)
+        )
+        rows = [row._asdict() for row in result]
+
+    transport = httpx.ASGITransport(app=bench)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        baseline = await client.get("/baseline", params=params)
+        current = await client.get("/current", params=params)
+        if baseline.status_code != 200 or current.status_code != 200:
+            raise SystemExit(f"Ошибка запроса: {baseline.status_code}, {current.status_code}")
+        if baseline.json() != current.json():
+            raise SystemExit("Ответы различаются: формат списка изменился")
+        if json.loads(await fastapi_dump(tickets)) != json.loads(adapter_dump(rows)):
+            raise SystemExit("Сериализации различаются: формат списка изменился")
+
+        async def baseline_request():
+            await client.get("/baseline", params=params)
+
+        async def current_request():
+            await client.get("/current", params=params)
+
+        async def adapter_serialize():
+            adapter_dump(rows)
+
+        print(f"Эндпоинт, страница {args.limit} заявок")
+        baseline_rps = await measure("fastapi", baseline_request, args.iterations)
+        current_rps = await measure("adapter", current_request, args.iterations)
+        print(f"Ускорение: x{current_rps / baseline_rps:.2f}\n")
+
+        print("Сериализация загруженной страницы")
+        baseline_rps = await measure("fastapi", lambda: fastapi_dump(tickets), args.iterations)
+        current_rps = await measure("adapter", adapter_serialize, args.iterations)
+        print(f"Ускорение: x{current_rps / baseline_rps:.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
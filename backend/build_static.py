@@ -0,0 +1,125 @@
+"""
+Сборка статики фронтенда
+Копирует frontend/static в frontend/dist/static с хешем содержимого в именах
+файлов, рядом кладет сжатые варианты (.gz и, если установлен brotli, .br)
+и переписывает ссылки на них в шаблонах, url(...) в CSS и строки "/static/..." в JS.
+Исходные имена тоже копируются (без долгого кеширования) — для путей, собранных
+скриптом во время работы. Backend отдает dist, если он собран.
+
+Пример:
+    python build_static.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+
+from app.core.compression import SUFFIXES, available_encodings, compress, is_compressible
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend")
+
+TEXT_TYPES = {".css": "text/css", ".js": "application/javascript", ".svg": "image/svg+xml",
+              ".html": "text/html", ".json": "application/json", ".txt": "text/plain"}
+
+
+# url(...) в CSS; data: и внешние адреса не попадают в манифест и остаются как есть
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")\s]+)\1\s*\)""")
+
+# Сначала ресурсы, на которые ссылаются, затем JS и CSS: хеш считается после замены ссылок
+BUILD_ORDER = {".js": 1, ".css": 2}
+
+
+def fingerprint(name: str, content: bytes) -> str:
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+
+def write_compressed(path: str, content: bytes) -> None:
+    with open(path, "wb") as file:
+        file.write(content)
+    if is_compressible(TEXT_TYPES.get(os.path.splitext(path)[1])):
+        for encoding in available_encodings():
+            with open(path + SUFFIXES[encoding], "wb") as file:
+                file.write(compress(content, encoding, static=True))
+
+
+def rewrite_quoted(text: str, manifest: dict) -> str:
+    """Строки "/static/..." в шаблонах и JS"""
+    for original, hashed in manifest.items():
+        for quote in "\"'`":
+            text = text.replace(f"{quote}{original}{quote}", f"{quote}{hashed}{quote}")
+    return text
+
+
+def rewrite_css(css: str, relative: str, manifest: dict) -> str:
+    """url(...) в CSS: абсолютные и относительные пути, суффиксы ?v=1 и #id сохраняются"""
+    base = posixpath.dirname(f"/static/{relative}")
+
+    def replace(match):
+        quote, url = match.groups()
+        path, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+        absolute = path if path.startswith("/") else posixpath.normpath(posixpath.join(base, path))
+        hashed = manifest.get(absolute)
+        if hashed is None:
+            return match.group(0)
+        if not path.startswith("/"):
+            hashed = posixpath.relpath(hashed, base)
+        return f"url({quote}{hashed}{suffix}{quote})"
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка статики фронтенда")
+    parser.add_argument("--source", default=FRONTEND_DIR, help="Каталог frontend")
+    parser.add_argument("--output", default=None, help="Каталог сборки (по умолчанию frontend/dist)")
+    args = parser.parse_args()
+
+    source = os.path.abspath(args.source)
+    output = os.path.abspath(args.output or os.path.join(source, "dist"))
+    shutil.rmtree(output, ignore_errors=True)
+
+    # /static/css/style.css -> /static/css/style.3f2a9c1b0d.css
+    manifest = {}
+    static_dir = os.path.join(source, "static")
+    assets = sorted(
+        os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, "/")
+        for root, _, files in os.walk(static_dir)
+        for name in files
+    )
+    for relative in sorted(assets, key=lambda path: BUILD_ORDER.get(posixpath.splitext(path)[1], 0)):
+        with open(os.path.join(static_dir, relative), "rb") as file:
+            content = file.read()
+        ext = posixpath.splitext(relative)[1]
+        if ext == ".css":
+            content = rewrite_css(content.decode("utf-8"), relative, manifest).encode("utf-8")
+        elif ext == ".js":
+            content = rewrite_quoted(content.decode("utf-8"), manifest).encode("utf-8")
+
+        hashed = fingerprint(relative, content)
+        for name in (hashed, relative):
+            target = os.path.join(output, "static", name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            write_compressed(target, content)
+        manifest[f"/static/{relative}"] = f"/static/{hashed}"
+
+    templates_dir = os.path.join(source, "templates")
+    for name in os.listdir(templates_dir):
+        with open(os.path.join(templates_dir, name), encoding="utf-8") as file:
+            html = file.read()
+        html = rewrite_quoted(html, manifest)
+        target = os.path.join(output, "templates", name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        write_compressed(target, html.encode("utf-8"))
+
+    with open(os.path.join(output, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+
+    print(f"Собрано файлов: {len(manifest)}, сжатие: {', '.join(available_encodings())} -> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Генератор синтетических данных для нагрузочного тестирования
+Создает пользователей, заявки, комментарии, историю и вложения в объемах,
+близких к продакшн, через COPY и несколько процессов-воркеров.
+
+Результат детерминирован: одинаковые --seed и --end дают одинаковые данные
+независимо от числа воркеров.
+
+Пример:
+    python generate_data.py --users 20000 --tickets 2000000 --workers 8 --seed 42 --truncate
+"""
+import argparse
+import asyncio
+import bisect
+import math
+import multiprocessing
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.assignment import reconcile_workload
+from app.services.partitions import partitions_ddl
+from app.services.sla import sla_targets
+
+# Распределения (веса) для полей заявки
+STATUS_WEIGHTS_OLD = {"new": 1, "in_progress": 3, "resolved": 10, "closed": 86}
+STATUS_WEIGHTS_RECENT = {"new": 30, "in_progress": 40, "resolved": 15, "closed": 15}
+PRIORITY_WEIGHTS = {"low": 30, "medium": 45, "high": 18, "critical": 7}
+CATEGORY_WEIGHTS = {"hardware": 60, "software": 40}
+
+# Порядок статусов для построения цепочки истории
+STATUS_FLOW = ["new", "in_progress", "resolved", "closed"]
+
+LOCATIONS = [f"Корпус {b}, каб. {r}" for b in "АБВГД" for r in range(101, 121)]
+EQUIPMENT = ["принтер", "компьютер", "ноутбук", "монитор", "сканер", "МФУ", "телефон", "проектор"]
+HARDWARE_TITLES = [
+    "{eq} не включается",
+    "{eq} не печатает",
+    "{eq} шумит",
+    "Не работает {eq}",
+    "Замена картриджа: {eq}",
+    "{eq} зависает",
+]
+SOFTWARE_TITLES = [
+    "Не запускается 1С",
+    "Ошибка в Outlook",
+    "Нет доступа к сетевой папке",
+    "Установить ПО",
+    "Сбросить пароль",
+    "Не работает VPN",
+    "Обновление антивируса",
+]
+WORDS = (
+    "после обновления перестало работать при попытке открыть появляется ошибка "
+    "срочно нужно для отчета вчера все было нормально перезагрузка не помогает "
+    "пользователь сообщает проблема повторяется каждый день"
+).split()
+ATTACHMENT_TYPES = [("jpg", "image/jpeg"), ("png", "image/png"), ("pdf", "application/pdf"), ("log", "text/plain")]
+
+# Размер чанка фиксирован, чтобы разбиение (и данные) не зависело от числа воркеров
+CHUNK_SIZE = 50_000
+
+TICKET_COLUMNS = [
+    "id", "ticket_number", "title", "description", "category", "priority", "status",
+    "creator_id", "assigned_to", "location", "equipment_type", "created_at", "updated_at", "closed_at",
+    "response_due_at", "resolve_due_at", "due_at", "sla_breached_due_at", "version",
+]
+# Номер изменения — номер транзакции COPY, как у записи через ORM (models/ticket.py)
+TICKET_COPY_COLUMNS = TICKET_COLUMNS + ["change_xid"]
+COMMENT_COLUMNS = ["ticket_id", "user_id", "comment_text", "is_internal", "created_at"]
+HISTORY_COLUMNS = ["ticket_id", "user_id", "action", "old_value", "new_value", "created_at"]
+ATTACHMENT_COLUMNS = ["ticket_id", "file_name", "file_path", "file_type", "uploaded_by", "created_at"]
+
+# Состояние воркера (заполняется в init_worker)
+_worker = {}
+
+
+def asyncpg_dsn(url: str) -> str:
+    """Преобразование SQLAlchemy URL в DSN для asyncpg"""
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def cum_weights(weights: dict):
+    """Кумулятивные веса для random.choices"""
+    return list(weights), list(accumulate(weights.values()))
+
+
+def zipf_cum_weights(n: int, s: float = 1.1):
+    """Кумулятивные веса Zipf: несколько пользователей создают большую часть заявок"""
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def pick(rng: random.Random, items, cum):
+    """Выбор элемента по кумулятивным весам за O(log n)"""
+    return items[bisect.bisect_right(cum, rng.random() * cum[-1])]
+
+
+def geometric(rng: random.Random, mean: float) -> int:
+    """Случайное число с геометрическим распределением и заданным средним"""
+    if mean <= 0:
+        return 0
+    p = 1.0 / (1.0 + mean)
+    return int(math.log(1.0 - rng.random()) / math.log(1.0 - p))
+
+
+def sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words))).capitalize()
+
+
+class Timeline:
+    """Равномерная шкала времени создания заявок и нумерация IT-ГГГГ-NNNN по годам"""
+
+    def __init__(self, start: datetime, end: datetime, total: int):
+        self.start = start
+        self.step = (end - start) / max(total, 1)
+        self._year_first = {}
+
+    def at(self, index: int) -> datetime:
+        return self.start + self.step * index
+
+    def ticket_number(self, index: int) -> str:
+        year = self.at(index).year
+        first = self._year_first.get(year)
+        if first is None:
+            year_start = datetime(year, 1, 1, tzinfo=timezone.utc)
+            first = max(0, math.ceil((year_start - self.start) / self.step))
+            while first > 0 and self.at(first - 1).year == year:
+                first -= 1
+            while self.at(first).year < year:
+                first += 1
+            self._year_first[year] = first
+        return f"IT-{year}-{index - first + 1:04d}"
+
+
+def init_worker(args, user_ids, engineer_ids, first_ticket_id, timeline):
+    """Инициализация воркера: общие данные передаются один раз"""
+    _worker.update(
+        args=args,
+        user_ids=user_ids,
+        user_cum=zipf_cum_weights(len(user_ids)),
+        engineer_ids=engineer_ids,
+        engineer_cum=zipf_cum_weights(len(engineer_ids), 0.6),
+        first_ticket_id=first_ticket_id,
+        timeline=timeline,
+        status=cum_weights(STATUS_WEIGHTS_OLD),
+        status_recent=cum_weights(STATUS_WEIGHTS_RECENT),
+        priority=cum_weights(PRIORITY_WEIGHTS),
+        category=cum_weights(CATEGORY_WEIGHTS),
+    )
+
+
+def generate_ticket(rng: random.Random, index: int, tickets, comments, history, attachments):
+    """Генерация одной заявки и всех зависимых строк"""
+    w = _worker
+    args = w["args"]
+    timeline = w["timeline"]
+    ticket_id = w["first_ticket_id"] + index
+    created_at = timeline.at(index)
+    age = 1.0 - index / args.tickets
+
+    # Свежие заявки чаще открыты, старые почти все закрыты
+    status_table = w["status_recent"] if age < args.recent_share else w["status"]
+    status = pick(rng, *status_table)
+    priority = pick(rng, *w["priority"])
+    category = pick(rng, *w["category"])
+    creator_id = pick(rng, w["user_ids"], w["user_cum"])
+    engineer_id = pick(rng, w["engineer_ids"], w["engineer_cum"]) if w["engineer_ids"] else None
+
+    if category == "hardware":
+        equipment = rng.choice(EQUIPMENT)
+        title = rng.choice(HARDWARE_TITLES).format(eq=equipment).capitalize()
+    else:
+        equipment = None
+        title = rng.choice(SOFTWARE_TITLES)
+    location = rng.choice(LOCATIONS) if rng.random() < 0.8 else None
+    description = sentence(rng, 5, 60) if rng.random() < 0.9 else None
+
+    # Цепочка событий: статусы, назначение, комментарии
+    events = [(created_at, creator_id, "created", None, f"Заявка создана: {title}")]
+    moment = created_at
+    assigned_to = None
+    stage = STATUS_FLOW.index(status)
+    if stage > 0 and engineer_id is not None:
+        moment += timedelta(minutes=rng.expovariate(1 / 90))
+        assigned_to = engineer_id
+        events.append((moment, engineer_id, "assigned", "None", str(engineer_id)))
+    for previous, current in zip(STATUS_FLOW[:stage], STATUS_FLOW[1:stage + 1]):
+        moment += timedelta(minutes=rng.expovariate(1 / 240))
+        events.append((moment, assigned_to or creator_id, "status_changed", previous, current))
+
+    for _ in range(geometric(rng, args.comments)):
+        author = assigned_to if assigned_to and rng.random() < 0.6 else creator_id
+        is_internal = author == assigned_to and rng.random() < 0.3
+        commented_at = created_at + (moment - created_at) * rng.random() + timedelta(seconds=1)
+        text = sentence(rng, 3, 40)
+        comments.append((ticket_id, author, text, is_internal, commented_at))
+        events.append((commented_at, author, "commented", None, text[:100]))
+
+    # updated_at ставится при создании и меняется только при изменении самой заявки,
+    # комментарии его не трогают
+    updated_at = max(moment, created_at)
+    for _ in range(geometric(rng, args.extra_history)):
+        changed_at = created_at + (moment - created_at) * rng.random() + timedelta(seconds=1)
+        old, new = rng.sample(list(PRIORITY_WEIGHTS), 2)
+        events.append((changed_at, assigned_to or creator_id, "priority_changed", old, new))
+        updated_at = max(updated_at, changed_at)
+
+    # Сроки SLA как у apply_sla; срок, истекший до --end, уже отмечен планировщиком как нарушенный
+    response, resolution = sla_targets(category, priority)
+    response_due_at, resolve_due_at = created_at + response, created_at + resolution
+    due_at = {"new": response_due_at, "in_progress": resolve_due_at}.get(status)
+    breached_due_at = None
+    if due_at is not None and due_at < args.end:
+        breached_due_at = due_at
+        kind = "response" if status == "new" else "resolution"
+        events.append((due_at, None, "sla_breached", kind, due_at.isoformat()))
+
+    events.sort(key=lambda event: event[0])
+    for at, user_id, action, old_value, new_value in events:
+        history.append((ticket_id, user_id, action, old_value, new_value, at))
+
+    if rng.random() < args.attachments:
+        for n in range(rng.randint(1, 3)):
+            ext, mime = rng.choice(ATTACHMENT_TYPES)
+            name = f"file_{ticket_id}_{n}.{ext}"
+            key = f"{rng.getrandbits(64):016x}"
+            attachments.append((
+                ticket_id, name, f"{key[:2]}/{key[2:4]}/{key}.{ext}",
+                mime, creator_id, created_at + timedelta(seconds=n + 1),
+            ))
+
+    closed_at = moment if status == "closed" else None
+    tickets.append((
+        ticket_id, timeline.ticket_number(index), title, description, category, priority, status,
+        creator_id, assigned_to, location, equipment, created_at, updated_at, closed_at,
+        response_due_at, resolve_due_at, due_at, breached_due_at, 1,
+    ))
+
+
+async def copy_chunk(chunk: int) -> int:
+    """Генерация и загрузка одного чанка заявок через COPY"""
+    args = _worker["args"]
+    rng = random.Random(f"{args.seed}:{chunk}")
+    first = chunk * CHUNK_SIZE
+    last = min(first + CHUNK_SIZE, args.tickets)
+
+    conn = await asyncpg.connect(asyncpg_dsn(settings.DATABASE_URL))
+    try:
+        for batch_start in range(first, last, args.batch_size):
+            tickets, comments, history, attachments = [], [], [], []
+            for index in range(batch_start, min(batch_start + args.batch_size, last)):
+                generate_ticket(rng, index, tickets, comments, history, attachments)
+
+            async with conn.transaction():
+                xid = await conn.fetchval("SELECT txid_current()")
+                await conn.copy_records_to_table(
+                    "tickets", records=[(*ticket, xid) for ticket in tickets], columns=TICKET_COPY_COLUMNS
+                )
+                await conn.copy_records_to_table("comments", records=comments, columns=COMMENT_COLUMNS)
+                await conn.copy_records_to_table("ticket_history", records=history, columns=HISTORY_COLUMNS)
+                await conn.copy_records_to_table("attachments", records=attachments, columns=ATTACHMENT_COLUMNS)
+    finally:
+        await conn.close()
+
+    return last - first
+
+
+def run_chunk(chunk: int) -> int:
+    return asyncio.run(copy_chunk(chunk))
+
+
+async def prepare(args):
+    """Очистка таблиц заявок и создание пользователей"""
+    conn = await asyncpg.connect(asyncpg_dsn(settings.DATABASE_URL))
+    try:
+        if args.truncate:
+            print("Очистка таблиц заявок...")
+            await conn.execute(
+                "TRUNCATE attachments, comments, ticket_history, tickets, attachments_archive, "
+                "comments_archive, ticket_history_archive, tickets_archive RESTART IDENTITY CASCADE"
+            )
+            # Пользователи прошлых запусков: с тем же --seed набор данных должен получиться тем же
+            deleted = await conn.execute("DELETE FROM users WHERE username LIKE 'load\\_%'")
+            print(f"Удалено сгенерированных пользователей: {deleted.split()[-1]}")
+        elif await conn.fetchval("SELECT EXISTS (SELECT 1 FROM tickets)"):
+            raise SystemExit("Таблица tickets не пуста: используйте --truncate")
+
+        # Секции ticket_history на весь период генерации
+        for statement in partitions_ddl(args.start, settings.HISTORY_PARTITIONS_AHEAD):
+            await conn.execute(statement)
+
+        first_user_id = (await conn.fetchval("SELECT COALESCE(MAX(id), 0) FROM users")) + 1
+        rng = random.Random(f"{args.seed}:users")
+        admins = max(1, round(args.users * args.admin_ratio))
+        engineers = max(1, round(args.users * args.engineer_ratio))
+
+        users, user_ids, engineer_ids = [], [], []
+        registered = datetime.now(timezone.utc) - timedelta(days=args.days)
+        for n in range(args.users):
+            user_id = first_user_id + n
+            role = "admin" if n < admins else "engineer" if n < admins + engineers else "user"
+            # Пользователи бота приходят из Telegram, сотрудники — через веб
+            telegram_id = 10_000_000_000 + user_id if role == "user" and rng.random() < 0.7 else None
+            users.append((
+                user_id, telegram_id, f"load_{role}_{user_id}", f"Тестовый пользователь {user_id}",
+                f"load{user_id}@example.com" if telegram_id is None else None, role, registered,
+            ))
+            (user_ids if role == "user" else engineer_ids).append(user_id)
+
+        print(f"Создание пользователей: {len(users)} (инженеров {engineers}, админов {admins})...")
+        await conn.copy_records_to_table(
+            "users",
+            records=users,
+            columns=["id", "telegram_id", "username", "full_name", "email", "role", "created_at"],
+        )
+        await conn.execute("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT MAX(id) FROM users))")
+        first_ticket_id = (await conn.fetchval("SELECT COALESCE(MAX(id), 0) FROM tickets")) + 1
+    finally:
+        await conn.close()
+
+    return user_ids or engineer_ids, engineer_ids, first_ticket_id
+
+
+async def finish():
+    """Синхронизация последовательностей, статистики планировщика и счетчиков нагрузки"""
+    conn = await asyncpg.connect(asyncpg_dsn(settings.DATABASE_URL))
+    try:
+        await conn.execute(
+            "SELECT setval(pg_get_serial_sequence('tickets', 'id'), (SELECT MAX(id) FROM tickets))"
+        )
+        await conn.execute("ANALYZE users, tickets, comments, ticket_history, attachments")
+    finally:
+        await conn.close()
+
+    # Счетчики нагрузки для автоназначения: COPY идет в обход ORM
+    try:
+        await reconcile_workload()
+    finally:
+        await engine.dispose()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных для нагрузочного тестирования")
+    parser.add_argument("--users", type=int, default=10_000, help="Количество пользователей")
+    parser.add_argument("--engineer-ratio", type=float, default=0.02, help="Доля инженеров")
+    parser.add_argument("--admin-ratio", type=float, default=0.002, help="Доля администраторов")
+    parser.add_argument("--tickets", type=int, default=1_000_000, help="Количество заявок")
+    parser.add_argument("--comments", type=float, default=2.0, help="Среднее число комментариев на заявку")
+    parser.add_argument("--extra-history", type=float, default=0.5, help="Среднее число прочих изменений на заявку")
+    parser.add_argument("--attachments", type=float, default=0.15, help="Доля заявок с вложениями")
+    parser.add_argument("--recent-share", type=float, default=0.05, help="Доля свежих заявок (чаще открыты)")
+    parser.add_argument("--days", type=int, default=730, help="Глубина истории в днях")
+    parser.add_argument("--end", type=lambda s: datetime.fromisoformat(s).replace(tzinfo=timezone.utc),
+                        default=None, help="Дата последней заявки (YYYY-MM-DD), по умолчанию сегодня")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Число процессов")
+    parser.add_argument("--batch-size", type=int, default=5_000, help="Заявок в одной транзакции COPY")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора")
+    parser.add_argument("--truncate", action="store_true", help="Очистить таблицы заявок и сгенерированных пользователей перед генерацией")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    end = args.end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    args.end = end
+    args.start = end - timedelta(days=args.days)
+    timeline = Timeline(args.start, end, args.tickets)
+
+    user_ids, engineer_ids, first_ticket_id = asyncio.run(prepare(args))
+
+    chunks = range(math.ceil(args.tickets / CHUNK_SIZE))
+    print(f"Генерация заявок: {args.tickets} ({len(chunks)} чанков, {args.workers} воркеров)...")
+    started = time.monotonic()
+    done = 0
+    with multiprocessing.Pool(
+        args.workers,
+        initializer=init_worker,
+        initargs=(args, user_ids, engineer_ids, first_ticket_id, timeline),
+    ) as pool:
+        for count in pool.imap_unordered(run_chunk, chunks):
+            done += count
+            elapsed = time.monotonic() - started
+            print(f"  {done}/{args.tickets} заявок, {done / elapsed:.0f} заявок/с")
+
+    asyncio.run(finish())
+    print(f"\nГотово за {time.monotonic() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from app.core.config import settings
 from app.core.database import Base
 from app.models import User, Ticket, Comment
 from app.core.security import get_password_hash
+from app.services.partitions import ensure_history_partitions
 
 
 async def init_db():
@@ -18,11 +19,15 @@ async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_history_partitions(conn)
+
+    await engine.dispose()
 
     print("Таблицы созданы!")
+    print("Для миграций отметьте текущую схему: alembic stamp head")
 
     # Создание тестовых пользователей
-    from app.core.database import async_session_maker
+    from app.core.database import async_session_maker, engine as app_engine
 
     async with async_session_maker() as session:
         # Админ
@@ -56,6 +61,7 @@ async def init_db():
         session.add(user)
 
         await session.commit()
+    await app_engine.dispose()
 
     print("\nТестовые пользователи созданы:")
     print("  Admin: username=admin, password=admin123")
@@ -0,0 +1,52 @@
+"""
+Запуск API в production
+Несколько процессов (pre-fork), uvloop и httptools при наличии, прогрев пула
+соединений до приема трафика. По SIGTERM процессы перестают принимать
+соединения и дожидаются завершения текущих запросов (до GRACEFUL_TIMEOUT секунд).
+
+Пример:
+    python serve.py --workers 4
+"""
+import argparse
+import os
+
+import uvicorn
+
+from app.core.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запуск API")
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY or os.cpu_count() or 1,
+                        help="Число процессов API")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.GRACEFUL_TIMEOUT,
+                        help="Секунд на завершение текущих запросов при остановке")
+    args = parser.parse_args()
+
+    # Процессы API читают число воркеров и делят между собой пул соединений PostgreSQL
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    from app.core.database import pool_limits
+
+    pool_size, max_overflow = pool_limits(args.workers)
+    print(
+        f"Процессов: {args.workers}, пул на процесс: {pool_size} + {max_overflow}, "
+        f"всего соединений до {args.workers * (pool_size + max_overflow)}"
+    )
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="auto",  # uvloop, если установлен
+        http="auto",  # httptools, если установлен
+        proxy_headers=True,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level="debug" if settings.DEBUG else "info",
+    )
+
+
+if __name__ == "__main__":
+    main()
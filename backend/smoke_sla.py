@@ -0,0 +1,108 @@
+"""
+Смоук-тест SLA между процессами
+Ведущий процесс запускает планировщик SLA, заявку создает через API другой процесс
+(не ведущий: его schedule() ничего не делает). Нарушение должно быть записано
+не позже SLA_POLL_INTERVAL после срока. База — временный файл SQLite, срок реакции
+сокращен до нескольких секунд. Код выхода 1 — нарушение не записано вовремя.
+
+Пример:
+    python smoke_sla.py
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+CREATE = "--create"  # Режим дочернего процесса: создать заявку и выйти
+
+# Настройки читаются при импорте app: временная база задается до него
+if CREATE not in sys.argv:
+    workdir = tempfile.mkdtemp(prefix="helpdesk-sla-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'helpdesk.db')}"
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+os.environ.setdefault("SECRET_KEY", "smoke")
+os.environ.update(CACHE_BACKEND="memory", RATE_LIMIT_ENABLED="false", SLA_POLL_INTERVAL="1")
+
+import httpx  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.core.database import Base, async_session_maker, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.ticket import Ticket  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import sla  # noqa: E402
+
+RESPONSE_TARGET = timedelta(seconds=4)
+# Допуск на запись нарушения и опрос базы тестом
+TOLERANCE = timedelta(seconds=1.5)
+
+
+async def create_ticket() -> None:
+    """Дочерний процесс: заявка через API без планировщика"""
+    sla.CATEGORY_TARGETS[("hardware", "critical")] = (RESPONSE_TARGET, timedelta(hours=8))
+    token = create_access_token({"sub": "1", "role": "user"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://smoke") as client:
+        body = {
+            "title": "Не работает сеть",
+            "description": "Нет связи в кабинете",
+            "category": "hardware",
+            "priority": "critical",
+        }
+        response = await client.post("/api/tickets/", json=body, headers={"Authorization": f"Bearer {token}"})
+    if response.status_code != 201:
+        raise SystemExit(f"создание заявки: {response.status_code} {response.text[:500]}")
+    if sla.sla_scheduler._heap:
+        raise SystemExit("не ведущий процесс добавил срок в свою кучу")
+    await engine.dispose()
+
+
+async def scenario() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session_maker() as db:
+        db.add(User(username="user", full_name="user", role="user"))
+        await db.commit()
+
+    scheduler = sla.SLAScheduler(poll_interval=1)
+    task = asyncio.create_task(scheduler.run())
+    try:
+        process = await asyncio.create_subprocess_exec(sys.executable, os.path.abspath(__file__), CREATE)
+        if await process.wait():
+            raise SystemExit("дочерний процесс завершился с ошибкой")
+
+        async with async_session_maker() as db:
+            due_at = sla.as_utc(await db.scalar(select(Ticket.due_at)))
+        print(f"ok  заявка создана другим процессом, срок {due_at:%H:%M:%S}")
+
+        while datetime.now(timezone.utc) < due_at + TOLERANCE:
+            await asyncio.sleep(0.1)
+            async with async_session_maker() as db:
+                if await db.scalar(select(Ticket.sla_breached_due_at)) is not None:
+                    late = datetime.now(timezone.utc) - due_at
+                    print(f"ok  нарушение записано через {late.total_seconds():.1f} с после срока")
+                    return
+        raise SystemExit("нарушение SLA не записано вовремя")
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def main() -> None:
+    try:
+        await scenario()
+    finally:
+        # Соединения aiosqlite — потоки: без закрытия процесс не завершится
+        await engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("Смоук-тест SLA пройден")
+
+
+if __name__ == "__main__":
+    if CREATE in sys.argv:
+        asyncio.run(create_ticket())
+    else:
+        asyncio.run(main())
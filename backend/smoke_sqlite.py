@@ -0,0 +1,151 @@
+"""
+Смоук-тест API на SQLite
+Создает схему во временной базе SQLite и проходит основной сценарий через ASGI
+без сервера и без PostgreSQL: создание заявки, список, карточка, комментарий,
+назначение, смена статуса, изменения, счетчики и вложение; затем параллельные записи
+через WITH ... UPDATE (должны ждать в очереди писателей, а не получать "database is locked").
+Код выхода 1 — сценарий сломан.
+
+Пример:
+    python smoke_sqlite.py
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+# Настройки читаются при импорте app: временная база и каталоги задаются до него
+workdir = tempfile.mkdtemp(prefix="helpdesk-smoke-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'helpdesk.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+os.environ.setdefault("SECRET_KEY", "smoke")
+os.environ.update(
+    STORAGE_BACKEND="local",
+    CACHE_BACKEND="memory",
+    RATE_LIMIT_ENABLED="false",
+    PROFILING_ENABLED="false",
+    AUTO_ASSIGN_ENABLED="true",
+    SQLITE_BUSY_TIMEOUT="200",  # Запись мимо очереди писателей быстро получит "database is locked"
+)
+
+import httpx  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.core.database import Base, async_session_maker, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+# Запрос, начинающийся не с UPDATE: очередь писателей должна распознать его как запись
+CTE_UPDATE = text(
+    "WITH target AS (SELECT id FROM tickets WHERE id = :ticket_id) "
+    "UPDATE tickets SET location = :location WHERE id IN (SELECT id FROM target)"
+)
+
+
+def check(response: httpx.Response, expected: int, step: str) -> dict:
+    if response.status_code != expected:
+        raise SystemExit(f"{step}: {response.status_code} вместо {expected}: {response.text[:500]}")
+    print(f"ok  {step}")
+    return response.json() if response.content and "json" in response.headers.get("content-type", "") else {}
+
+
+async def scenario() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session_maker() as db:
+        users = [User(username=role, full_name=role, role=role) for role in ("admin", "engineer", "user")]
+        db.add_all(users)
+        await db.commit()
+    headers = {
+        user.role: {"Authorization": "Bearer " + create_access_token({"sub": str(user.id), "role": user.role})}
+        for user in users
+    }
+
+    # Запуск приложения без lifespan: фоновые задачи обслуживания не нужны
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://smoke") as client:
+        body = {
+            "title": "Не печатает принтер",
+            "description": "Замятие бумаги",
+            "category": "hardware",
+            "priority": "high",
+            "location": "Кабинет 101",
+            "equipment_type": "Принтер",
+        }
+        response = await client.post(
+            "/api/tickets/", json=body, headers={**headers["user"], "Idempotency-Key": "smoke-1"}
+        )
+        ticket = check(response, 201, "создание заявки")
+        ticket_id = ticket["id"]
+        if ticket["assigned_to"] != users[1].id:
+            raise SystemExit(f"автоназначение: {ticket['assigned_to']} вместо {users[1].id}")
+
+        listed = check(await client.get("/api/tickets/?expand=creator,assignee", headers=headers["engineer"]),
+                       200, "список заявок")
+        if [item["id"] for item in listed] != [ticket_id]:
+            raise SystemExit(f"список заявок: {listed}")
+        check(await client.get(f"/api/tickets/{ticket_id}", headers=headers["user"]), 200, "карточка заявки")
+        check(await client.post(f"/api/tickets/{ticket_id}/comments", params={"comment_text": "Выезжаю"},
+                                headers=headers["engineer"]), 201, "комментарий")
+        check(await client.post(f"/api/tickets/{ticket_id}/assign", headers=headers["admin"]), 200, "назначение")
+        check(await client.patch(f"/api/tickets/{ticket_id}", json={"status": "resolved"},
+                                 headers=headers["admin"]), 200, "смена статуса")
+        check(await client.get("/api/tickets/changes", headers=headers["engineer"]), 200, "изменения")
+        check(await client.get("/api/tickets/counters", headers=headers["engineer"]), 200, "счетчики")
+
+        attachment = check(await client.post(
+            f"/api/tickets/{ticket_id}/attachments",
+            files={"file": ("photo.txt", b"smoke" * 100, "text/plain")},
+            headers=headers["user"],
+        ), 201, "загрузка вложения")
+        response = await client.get(f"/api/tickets/{ticket_id}/attachments/{attachment['id']}",
+                                    headers=headers["user"])
+        check(response, 200, "скачивание вложения")
+        if response.content != b"smoke" * 100:
+            raise SystemExit("скачивание вложения: содержимое отличается")
+
+    await cte_writers(ticket_id)
+
+
+async def cte_writers(ticket_id: int) -> None:
+    """Обычный UPDATE и две транзакции WITH ... UPDATE, каждая держит запись дольше
+    busy_timeout; откат последней не должен оставить ее изменение"""
+
+    async def write(statement, location: str, commit: bool) -> None:
+        async with async_session_maker() as db:
+            await db.execute(statement, {"ticket_id": ticket_id, "location": location})
+            await asyncio.sleep(0.5)
+            await (db.commit() if commit else db.rollback())
+
+    plain_update = text("UPDATE tickets SET location = :location WHERE id = :ticket_id")
+    # Все транзакции доводятся до конца: иначе незакрытые сессии держали бы запись
+    results = await asyncio.gather(
+        write(plain_update, "Кабинет 101", commit=True),
+        write(CTE_UPDATE, "Кабинет 102", commit=True),
+        write(CTE_UPDATE, "Кабинет 103", commit=False),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise SystemExit(f"параллельные WITH ... UPDATE: {errors[0]}")
+    async with async_session_maker() as db:
+        location = await db.scalar(text("SELECT location FROM tickets WHERE id = :id"), {"id": ticket_id})
+    if location != "Кабинет 102":
+        raise SystemExit(f"WITH ... UPDATE вне транзакции: {location}")
+    print("ok  параллельные WITH ... UPDATE")
+
+
+async def main() -> None:
+    try:
+        await scenario()
+    finally:
+        # Соединения aiosqlite — потоки: без закрытия процесс не завершится
+        await engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("Смоук-тест на SQLite пройден")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
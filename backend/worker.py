@@ -0,0 +1,48 @@
+"""
+Воркер фоновых задач (таблица jobs)
+Выбирает готовые задачи через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+воркеров можно запускать сколько угодно. SIGTERM — мягкая остановка.
+
+Примеры:
+    python worker.py --concurrency 20
+    python worker.py --retry-dead notify_user
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services import notifications  # noqa: F401 — регистрация обработчиков
+from app.services.jobs import Worker, retry_dead
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Воркер фоновых задач")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_CONCURRENCY,
+                        help="Задач одновременно")
+    parser.add_argument("--batch-size", type=int, default=settings.JOB_BATCH_SIZE,
+                        help="Задач за одну выборку")
+    parser.add_argument("--retry-dead", nargs="?", const="", metavar="TASK",
+                        help="Вернуть задачи из dead-letter в очередь и выйти")
+    args = parser.parse_args()
+
+    if args.retry_dead is not None:
+        count = await retry_dead(args.retry_dead or None)
+        print(f"Возвращено в очередь задач: {count}")
+        await engine.dispose()
+        return
+
+    worker = Worker(args.concurrency, args.batch_size)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    await worker.run()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+import asyncio
+import os
+from typing import NamedTuple, Optional
+
+from aiogram import Bot
+from aiogram.types import Message
+
+from config import settings
+from app.services.storage import incoming_path, new_key, storage
+
+# Общий предел одновременных загрузок: пачка альбомов не занимает всю память и соединения
+download_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_DOWNLOADS)
+
+
+class IncomingFile(NamedTuple):
+    """Фото или документ из сообщения; хранится в данных FSM до создания заявки"""
+
+    file_id: str
+    file_name: str
+    file_type: Optional[str]
+    file_size: Optional[int]
+
+    @classmethod
+    def of(cls, message: Message) -> Optional["IncomingFile"]:
+        if message.photo:
+            # Последний элемент — наибольший размер
+            photo = message.photo[-1]
+            return cls(photo.file_id, f"photo_{photo.file_unique_id}.jpg", "image/jpeg", photo.file_size)
+        if message.document:
+            document = message.document
+            name = document.file_name or f"file_{document.file_unique_id}"
+            return cls(document.file_id, name, document.mime_type, document.file_size)
+        return None
+
+
+async def download(bot: Bot, incoming: IncomingFile) -> str:
+    """Загрузка файла из Telegram кусками, без чтения в память, и передача в хранилище; возвращает ключ"""
+    key = new_key(incoming.file_name)
+    partial = incoming_path(key)
+    os.makedirs(os.path.dirname(partial), exist_ok=True)
+
+    async with download_semaphore:
+        file = await bot.get_file(incoming.file_id)
+        try:
+            await bot.download_file(
+                file.file_path,
+                destination=partial,
+                timeout=settings.DOWNLOAD_TIMEOUT,
+                chunk_size=settings.DOWNLOAD_CHUNK_SIZE,
+            )
+            # Недокачанный файл не попадает в хранилище
+            await storage.save_file(key, partial, incoming.file_type)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+    return key
@@ -13,6 +13,16 @@ class Settings(BaseSettings):
     # API
     API_BASE_URL: str = "http://backend:8000"
 
+    # Ограничение частоты запросов от одного пользователя Telegram
+    RATE_LIMIT_RATE: float = 1.0  # Токенов в секунду
+    RATE_LIMIT_BURST: int = 10  # Емкость корзины
+
+    # Загрузка фото и документов из Telegram
+    MAX_CONCURRENT_DOWNLOADS: int = 4  # Одновременных загрузок на весь бот
+    DOWNLOAD_CHUNK_SIZE: int = 65536  # байт
+    DOWNLOAD_TIMEOUT: int = 60  # секунд
+    MAX_FORM_ATTACHMENTS: int = 10  # Файлов при создании одной заявки
+
     @property
     def admin_ids(self) -> List[int]:
         if not self.TELEGRAM_ADMIN_IDS:
@@ -1,23 +1,7 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from config import settings
-
-# Создание движка базы данных
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True,
-    pool_pre_ping=True,
-)
-
-# Создание фабрики сессий
-async_session_maker = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
-
-Base = declarative_base()
+# Один движок с сервисами backend (история, задачи, идемпотентность): один пул соединений.
+# Пул бота входит в резерв DB_RESERVED_CONNECTIONS — его размер задают DB_POOL_SIZE и
+# DB_MAX_OVERFLOW (см. docker-compose.yml); для SQLite — те же прагмы и очередь писателей, что в API
+from app.core.database import Base, async_session_maker, engine  # noqa: F401
 
 
 async def get_db():
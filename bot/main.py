@@ -1,10 +1,13 @@
 import asyncio
+import json
 import logging
+import re
+from typing import List, Optional
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
 from aiogram.types import Message, CallbackQuery
 
 from config import settings
@@ -15,15 +18,28 @@ from keyboards import (
     ticket_action_keyboard,
     cancel_keyboard,
 )
-from database import async_session_maker
 from sqlalchemy import select
 import sys
 import os
 
 # Добавляем путь к backend для импорта моделей
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from database import async_session_maker, engine
 from app.models.user import User
-from app.models.ticket import Ticket, Comment
+from app.models.ticket import Ticket, Comment, Attachment
+from app.core.config import settings as backend_settings
+from app.schemas.ticket import TicketResponse
+from app.services.assignment import auto_assign
+from app.services.cache import ticket_cache
+from app.services.history import add_history
+from app.services.idempotency import claim, complete, request_hash
+from app.services.notifications import notify_ticket
+from app.services.similarity import similarity_index
+from app.services.sla import apply_sla
+from app.services.storage import storage as attachment_storage
+from app.services.tickets import next_ticket_number
+from attachments import IncomingFile, download
+from middlewares import RateLimitMiddleware
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -31,8 +47,15 @@ logger = logging.getLogger(__name__)
 
 # Инициализация бота
 bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
+fsm_storage = MemoryStorage()
+# Обновления одного пользователя (например, файлы альбома) обрабатываются по очереди,
+# иначе параллельные update_data теряют изменения; разные пользователи не ждут друг друга
+dp = Dispatcher(storage=fsm_storage, events_isolation=SimpleEventIsolation())
+
+# Ограничение частоты: цена обработчика задается флагом rate_cost (по умолчанию 1)
+rate_limiter = RateLimitMiddleware(settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST)
+dp.message.middleware(rate_limiter)
+dp.callback_query.middleware(rate_limiter)
 
 
 # Состояния для создания заявки
@@ -45,6 +68,10 @@ class TicketForm(StatesGroup):
     waiting_for_equipment = State()
 
 
+# Номер заявки в подписи к файлу
+TICKET_NUMBER_RE = re.compile(r"IT-\d{4}-\d+", re.IGNORECASE)
+
+
 # Состояние для добавления комментария
 class CommentForm(StatesGroup):
     waiting_for_comment = State()
@@ -73,7 +100,47 @@ async def get_or_create_user(telegram_id: int, username: str, full_name: str):
         return user
 
 
-@dp.message(Command("start"))
+def too_large(incoming: IncomingFile) -> bool:
+    return bool(incoming.file_size and incoming.file_size > backend_settings.MAX_UPLOAD_SIZE)
+
+
+async def store_attachments(ticket_id: int, user_id: int, files: List[IncomingFile]) -> int:
+    """Загрузка файлов и запись Attachment; соединение с БД берется только после загрузки"""
+    results = await asyncio.gather(
+        *(download(bot, incoming) for incoming in files),
+        return_exceptions=True,
+    )
+    saved = []
+    for incoming, result in zip(files, results):
+        if isinstance(result, BaseException):
+            logger.warning("Не удалось загрузить файл %s: %s", incoming.file_name, result)
+        else:
+            saved.append((incoming, result))
+    if not saved:
+        return 0
+
+    async with async_session_maker() as session:
+        try:
+            for incoming, key in saved:
+                session.add(Attachment(
+                    ticket_id=ticket_id,
+                    file_name=incoming.file_name[:255],
+                    file_path=key,
+                    file_type=incoming.file_type[:50] if incoming.file_type else None,
+                    uploaded_by=user_id,
+                ))
+                add_history(session, ticket_id, user_id, "attachment_added", None, incoming.file_name[:100])
+            await session.commit()
+        except Exception:
+            for _, key in saved:
+                await attachment_storage.delete(key)
+            raise
+    # Детальная заявка в кэше API (общем при CACHE_BACKEND=redis) показывает новые вложения
+    await ticket_cache.invalidate(ticket_id)
+    return len(saved)
+
+
+@dp.message(Command("start"), flags={"rate_cost": 2})
 async def cmd_start(message: Message):
     """Обработка команды /start"""
     user = await get_or_create_user(
@@ -105,6 +172,9 @@ async def cmd_help(message: Message):
 📝 Создать заявку - создание новой заявки
 📋 Мои заявки - просмотр ваших заявок
 
+<b>Фото и документы:</b>
+📎 Отправьте их во время создания заявки или с номером заявки в подписи
+
 <b>Категории заявок:</b>
 🖥 Оборудование - ремонт и обслуживание техники
 💾 ПО - помощь с программами
@@ -130,7 +200,7 @@ async def start_create_ticket(message: Message, state: FSMContext):
     await state.set_state(TicketForm.waiting_for_title)
 
 
-@dp.message(TicketForm.waiting_for_title)
+@dp.message(TicketForm.waiting_for_title, F.text)
 async def process_title(message: Message, state: FSMContext):
     """Обработка заголовка заявки"""
     await state.update_data(title=message.text)
@@ -141,7 +211,7 @@ async def process_title(message: Message, state: FSMContext):
     await state.set_state(TicketForm.waiting_for_description)
 
 
-@dp.message(TicketForm.waiting_for_description)
+@dp.message(TicketForm.waiting_for_description, F.text)
 async def process_description(message: Message, state: FSMContext):
     """Обработка описания заявки"""
     await state.update_data(description=message.text)
@@ -191,7 +261,7 @@ async def process_priority(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@dp.message(TicketForm.waiting_for_location)
+@dp.message(TicketForm.waiting_for_location, F.text, flags={"rate_cost": 5})
 async def process_location(message: Message, state: FSMContext):
     """Обработка местоположения"""
     location = None if message.text.lower() in ['нет', 'no', '-'] else message.text
@@ -207,7 +277,7 @@ async def process_location(message: Message, state: FSMContext):
         await create_ticket_in_db(message, state)
 
 
-@dp.message(TicketForm.waiting_for_equipment)
+@dp.message(TicketForm.waiting_for_equipment, F.text, flags={"rate_cost": 5})
 async def process_equipment(message: Message, state: FSMContext):
     """Обработка типа оборудования"""
     equipment_type = message.text
@@ -215,6 +285,10 @@ async def process_equipment(message: Message, state: FSMContext):
     await create_ticket_in_db(message, state)
 
 
+# Поля заявки из данных формы (как в TicketCreate)
+TICKET_FIELDS = ("title", "description", "category", "priority", "location", "equipment_type")
+
+
 async def create_ticket_in_db(message: Message, state: FSMContext):
     """Создание заявки в БД"""
     data = await state.get_data()
@@ -226,14 +300,22 @@ async def create_ticket_in_db(message: Message, state: FSMContext):
         )
         user = result.scalar_one()
 
+        # Повторная доставка того же сообщения Telegram не создает вторую заявку
+        fields = {name: data.get(name) for name in TICKET_FIELDS}
+        idempotency_key = f"telegram:{message.chat.id}:{message.message_id}"
+        replay = await claim(session, user.id, idempotency_key, request_hash("create_ticket", fields))
+        if replay:
+            created = json.loads(replay.body)
+            await message.answer(
+                f"ℹ️ Заявка <code>{created['ticket_number']}</code> по этому сообщению уже создана",
+                parse_mode="HTML",
+                reply_markup=main_menu_keyboard(),
+            )
+            await state.clear()
+            return
+
         # Генерируем номер заявки
-        from datetime import datetime
-        current_year = datetime.now().year
-        result = await session.execute(
-            select(Ticket).where(Ticket.ticket_number.like(f"IT-{current_year}-%"))
-        )
-        existing_tickets = result.scalars().all()
-        ticket_number = f"IT-{current_year}-{len(existing_tickets) + 1:04d}"
+        ticket_number = await next_ticket_number(session)
 
         # Создаем заявку
         new_ticket = Ticket(
@@ -247,10 +329,31 @@ async def create_ticket_in_db(message: Message, state: FSMContext):
             creator_id=user.id,
             status='new',
         )
+        # Планировщик SLA в backend подхватит срок опросом ближайших сроков
+        apply_sla(new_ticket)
+
+        # Похожая открытая заявка: при массовом сбое пользователи пишут об одном и том же
+        similar = await similarity_index.search(
+            session, new_ticket.title, new_ticket.description, new_ticket.location, new_ticket.equipment_type
+        )
+        if similar:
+            new_ticket.duplicate_of = similar.id
 
         session.add(new_ticket)
+        await session.flush()
+        # Автоназначение: выбор инженера сериализован с API блокировкой до фиксации
+        engineer_id = await auto_assign(session, new_ticket)
+        if similar:
+            add_history(session, new_ticket.id, None, "duplicate_linked", None, similar.ticket_number)
+        if engineer_id:
+            add_history(session, new_ticket.id, None, "assigned", "None", str(engineer_id))
+            notify_ticket(session, new_ticket.id, "assigned")
+        await session.refresh(new_ticket)
+        body = TicketResponse.model_validate(new_ticket).model_dump_json().encode()
+        await complete(session, user.id, idempotency_key, 201, body)
         await session.commit()
         await session.refresh(new_ticket)
+        similarity_index.add(new_ticket)
 
         # Формируем сообщение
         category_emoji = "🖥" if new_ticket.category == "hardware" else "💾"
@@ -264,6 +367,8 @@ async def create_ticket_in_db(message: Message, state: FSMContext):
 {priority_emoji} Приоритет: {new_ticket.priority}
 📝 Заголовок: {new_ticket.title}
         """
+        if similar:
+            message_text += f"\nℹ️ Похожая заявка уже в работе: <code>{similar.ticket_number}</code>"
 
         await message.answer(
             message_text,
@@ -271,11 +376,87 @@ async def create_ticket_in_db(message: Message, state: FSMContext):
             reply_markup=main_menu_keyboard(),
         )
 
+    pending = [IncomingFile(*item) for item in data.get("attachments", [])]
+    if pending:
+        saved = await store_attachments(new_ticket.id, user.id, pending)
+        await message.answer(f"📎 Прикреплено файлов: {saved} из {len(pending)}")
+
     await state.clear()
 
 
-@dp.message(F.text == "📋 Мои заявки")
-@dp.message(Command("mytickets"))
+@dp.message(StateFilter(TicketForm), F.photo | F.document)
+async def collect_form_attachment(message: Message, state: FSMContext):
+    """Фото и документы при создании заявки: загружаются после ее сохранения"""
+    incoming = IncomingFile.of(message)
+    if too_large(incoming):
+        await message.answer(f"❌ Файл {incoming.file_name} больше {backend_settings.MAX_UPLOAD_SIZE // 1048576} МБ")
+        return
+
+    data = await state.get_data()
+    pending = data.get("attachments", [])
+    if len(pending) >= settings.MAX_FORM_ATTACHMENTS:
+        await message.answer(f"❌ К заявке можно приложить не более {settings.MAX_FORM_ATTACHMENTS} файлов")
+        return
+
+    await state.update_data(attachments=pending + [list(incoming)], media_group=message.media_group_id)
+    # На альбом — один ответ
+    if message.media_group_id is None or message.media_group_id != data.get("media_group"):
+        await message.answer("📎 Файлы будут прикреплены к заявке после ее создания")
+
+
+async def find_ticket_for_upload(telegram_id: int, ticket_number: str) -> Optional[tuple]:
+    """(id пользователя, id заявки) или None; пользователь прикрепляет файлы только к своим заявкам"""
+    async with async_session_maker() as session:
+        user = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
+        ticket = (
+            await session.execute(select(Ticket).where(Ticket.ticket_number == ticket_number.upper()))
+        ).scalar_one_or_none()
+    if not user or not ticket or (user.role == "user" and ticket.creator_id != user.id):
+        return None
+    return user.id, ticket.id
+
+
+@dp.message(StateFilter(None), F.photo | F.document, flags={"rate_cost": 2})
+async def attach_to_ticket(message: Message, state: FSMContext):
+    """Файл к существующей заявке: номер заявки в подписи, остальные файлы альбома — к той же заявке"""
+    data = await state.get_data()
+    same_album = message.media_group_id is not None and message.media_group_id == data.get("media_group")
+    match = TICKET_NUMBER_RE.search(message.caption or "")
+
+    if match:
+        target = await find_ticket_for_upload(message.from_user.id, match.group(0))
+        if target is None:
+            await message.answer("❌ Заявка не найдена")
+            return
+        ticket_number = match.group(0).upper()
+        await state.update_data(media_group=message.media_group_id, media_group_ticket=[*target, ticket_number])
+    elif same_album and data.get("media_group_ticket"):
+        *target, ticket_number = data["media_group_ticket"]
+    else:
+        if not same_album:
+            await state.update_data(media_group=message.media_group_id, media_group_ticket=None)
+            await message.answer(
+                "📎 Укажите номер заявки в подписи к файлу, например <code>IT-2025-0001</code>",
+                parse_mode="HTML",
+            )
+        return
+
+    incoming = IncomingFile.of(message)
+    if too_large(incoming):
+        await message.answer(f"❌ Файл {incoming.file_name} больше {backend_settings.MAX_UPLOAD_SIZE // 1048576} МБ")
+        return
+
+    user_id, ticket_id = target
+    if not await store_attachments(ticket_id, user_id, [incoming]):
+        await message.answer(f"❌ Не удалось загрузить файл {incoming.file_name}")
+    elif message.media_group_id is None:
+        await message.answer(f"📎 Файл прикреплен к заявке <code>{ticket_number}</code>", parse_mode="HTML")
+    elif not same_album:
+        await message.answer(f"📎 Файлы альбома прикрепляются к заявке <code>{ticket_number}</code>", parse_mode="HTML")
+
+
+@dp.message(F.text == "📋 Мои заявки", flags={"rate_cost": 3})
+@dp.message(Command("mytickets"), flags={"rate_cost": 3})
 async def show_my_tickets(message: Message):
     """Показать мои заявки"""
     async with async_session_maker() as session:
@@ -338,10 +519,14 @@ async def cancel_action(callback: CallbackQuery, state: FSMContext):
 async def main():
     """Запуск бота"""
     logger.info("🤖 Запуск бота...")
+    similarity_task = asyncio.create_task(similarity_index.run())
     try:
         await dp.start_polling(bot)
     finally:
+        similarity_task.cancel()
         await bot.session.close()
+        # Соединения закрываются явно (у aiosqlite это потоки, без закрытия процесс не завершится)
+        await engine.dispose()
 
 
 if __name__ == "__main__":
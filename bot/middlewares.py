@@ -0,0 +1,40 @@
+import math
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from app.core.ratelimit import MemoryBuckets
+
+
+class RateLimitMiddleware(BaseMiddleware):
+    """Корзины токенов по telegram_id; цена обработчика задается флагом rate_cost"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.buckets = MemoryBuckets(rate, capacity)
+        # Предупреждаем один раз за серию отклоненных сообщений, чтобы не отвечать на флуд
+        self._warned = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        wait = await self.buckets.take(str(user.id), get_flag(data, "rate_cost", default=1))
+        if not wait:
+            self._warned.discard(user.id)
+            return await handler(event, data)
+
+        text = f"⏳ Слишком много запросов, повторите через {math.ceil(wait)} с."
+        if isinstance(event, CallbackQuery):
+            await event.answer(text)
+        elif isinstance(event, Message) and user.id not in self._warned:
+            self._warned.add(user.id)
+            await event.answer(text)
+        return None
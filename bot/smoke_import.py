@@ -0,0 +1,18 @@
+"""
+Проверка образа бота: импорт main со всеми модулями backend, которые использует бот
+Ловит зависимости backend, которых нет в requirements.txt бота. Подключения к Telegram
+и БД не выполняются. Код выхода 1 — импорт не удался.
+
+Пример (в контейнере бота):
+    docker compose run --rm bot python smoke_import.py
+"""
+import os
+
+# Значения-заглушки только для недостающих переменных: проверяется импорт, а не настройки
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:smoke")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("SECRET_KEY", "smoke")
+
+import main  # noqa: E402,F401
+
+print("Импорт бота пройден")
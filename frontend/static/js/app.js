@@ -1,7 +1,14 @@
 // API Configuration
 const API_BASE_URL = 'http://localhost:8000/api';
+// Поля, которые нужны карточке в списке заявок
+const TICKET_LIST_FIELDS = 'id,ticket_number,title,status,priority,category,created_at';
+// Период подгрузки изменений списка, мс
+const SYNC_INTERVAL = 30000;
 let authToken = localStorage.getItem('authToken');
 let currentUser = null;
+// Локальная копия списка: { view, params, watermark, tickets: Map id -> заявка }
+let ticketList = null;
+let syncTimer = null;
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
@@ -92,6 +99,8 @@ async function checkAuth() {
         document.getElementById('user-name').textContent = currentUser.full_name;
         showScreen('dashboard');
         loadTickets();
+        clearInterval(syncTimer);
+        syncTimer = setInterval(syncTickets, SYNC_INTERVAL);
     } catch (error) {
         handleLogout();
     }
@@ -100,6 +109,8 @@ async function checkAuth() {
 function handleLogout() {
     authToken = null;
     currentUser = null;
+    ticketList = null;
+    clearInterval(syncTimer);
     localStorage.removeItem('authToken');
     showScreen('login');
 }
@@ -130,6 +141,7 @@ function loadView(view) {
     document.getElementById('content-title').textContent = titles[view] || 'Заявки';
 
     if (view === 'stats') {
+        ticketList = null;
         loadStats();
     } else {
         loadTickets(view);
@@ -137,34 +149,53 @@ function loadView(view) {
 }
 
 // Load Tickets
-async function loadTickets(view = 'tickets') {
-    const ticketsList = document.getElementById('tickets-list');
-    ticketsList.innerHTML = '<div class="loading">Загрузка...</div>';
+function ticketParams(view) {
+    const params = new URLSearchParams({ fields: TICKET_LIST_FIELDS });
 
-    try {
-        let url = `${API_BASE_URL}/tickets/`;
-        const params = new URLSearchParams();
+    if (view === 'my-tickets') {
+        params.append('created_by_me', 'true');
+    } else if (view === 'assigned') {
+        params.append('assigned_to_me', 'true');
+    }
+
+    // Apply filters
+    const status = document.getElementById('filter-status').value;
+    const priority = document.getElementById('filter-priority').value;
+    const category = document.getElementById('filter-category').value;
+
+    if (status) params.append('status', status);
+    if (priority) params.append('priority', priority);
+    if (category) params.append('category', category);
+
+    return params;
+}
 
-        if (view === 'my-tickets') {
-            params.append('created_by_me', 'true');
-        } else if (view === 'assigned') {
-            params.append('assigned_to_me', 'true');
+async function fetchTicketChanges(params, since) {
+    const query = new URLSearchParams(params);
+    if (since) query.append('since', since);
+
+    return fetch(`${API_BASE_URL}/tickets/changes?${query}`, {
+        headers: {
+            'Authorization': `Bearer ${authToken}`
         }
+    });
+}
 
-        // Apply filters
-        const status = document.getElementById('filter-status').value;
-        const priority = document.getElementById('filter-priority').value;
-        const category = document.getElementById('filter-category').value;
+async function loadTickets(view = 'tickets') {
+    const ticketsList = document.getElementById('tickets-list');
+    ticketsList.innerHTML = '<div class="loading">Загрузка...</div>';
 
-        if (status) params.append('status', status);
-        if (priority) params.append('priority', priority);
-        if (category) params.append('category', category);
+    try {
+        const params = ticketParams(view);
 
-        if (params.toString()) {
-            url += '?' + params.toString();
+        // Водяной знак берется до загрузки списка, чтобы не пропустить изменения между запросами
+        const changes = await fetchTicketChanges(params);
+        if (!changes.ok) {
+            throw new Error('Failed to load tickets');
         }
+        const { watermark } = await changes.json();
 
-        const response = await fetch(url, {
+        const response = await fetch(`${API_BASE_URL}/tickets/?${params}`, {
             headers: {
                 'Authorization': `Bearer ${authToken}`
             }
@@ -175,12 +206,50 @@ async function loadTickets(view = 'tickets') {
         }
 
         const tickets = await response.json();
-        renderTickets(tickets);
+        ticketList = { view, params, watermark, tickets: new Map(tickets.map(ticket => [ticket.id, ticket])) };
+        renderTicketList();
     } catch (error) {
         ticketsList.innerHTML = '<div class="error-message">Ошибка загрузки заявок</div>';
     }
 }
 
+// Подгрузка только изменившихся заявок вместо повторной загрузки списка
+async function syncTickets() {
+    if (!ticketList) return;
+
+    const list = ticketList;
+    try {
+        const response = await fetchTicketChanges(list.params, list.watermark);
+
+        // Водяной знак устарел или изменений слишком много
+        if (response.status === 410) {
+            loadTickets(list.view);
+            return;
+        }
+        if (!response.ok) return;
+
+        const changes = await response.json();
+        // Пока шел запрос, пользователь переключил вид или фильтры
+        if (list !== ticketList) return;
+
+        changes.tickets.forEach(ticket => list.tickets.set(ticket.id, ticket));
+        changes.removed.forEach(id => list.tickets.delete(id));
+        list.watermark = changes.watermark;
+
+        if (changes.tickets.length || changes.removed.length) {
+            renderTicketList();
+        }
+    } catch (error) {
+        // Повторим при следующей синхронизации
+    }
+}
+
+function renderTicketList() {
+    const tickets = [...ticketList.tickets.values()]
+        .sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+    renderTickets(tickets);
+}
+
 function renderTickets(tickets) {
     const ticketsList = document.getElementById('tickets-list');
 
@@ -215,7 +284,7 @@ async function showTicketDetail(ticketId) {
     detail.innerHTML = '<div class="loading">Загрузка...</div>';
 
     try {
-        const response = await fetch(`${API_BASE_URL}/tickets/${ticketId}`, {
+        const response = await fetch(`${API_BASE_URL}/tickets/${ticketId}?expand=creator,assignee`, {
             headers: {
                 'Authorization': `Bearer ${authToken}`
             }
@@ -253,6 +322,8 @@ function renderTicketDetail(ticket) {
         <div style="margin: 20px 0;">
             <strong>Категория:</strong> ${formatCategory(ticket.category)}<br>
             <strong>Создана:</strong> ${formatDate(ticket.created_at)}<br>
+            ${ticket.creator ? `<strong>Автор:</strong> ${ticket.creator.full_name}<br>` : ''}
+            ${ticket.assignee ? `<strong>Исполнитель:</strong> ${ticket.assignee.full_name}<br>` : ''}
             ${ticket.location ? `<strong>Местоположение:</strong> ${ticket.location}<br>` : ''}
             ${ticket.equipment_type ? `<strong>Оборудование:</strong> ${ticket.equipment_type}<br>` : ''}
         </div>
@@ -269,8 +340,8 @@ function renderTicketDetail(ticket) {
 
         ${currentUser.role !== 'user' ? `
             <div style="margin-top: 20px;">
-                <button class="btn btn-primary" onclick="assignToMe(${ticket.id})">Назначить на себя</button>
-                <button class="btn btn-secondary" onclick="changeStatus(${ticket.id})">Изменить статус</button>
+                <button class="btn btn-primary" onclick="assignToMe(${ticket.id}, ${ticket.version})">Назначить на себя</button>
+                <button class="btn btn-secondary" onclick="changeStatus(${ticket.id}, ${ticket.version})">Изменить статус</button>
             </div>
         ` : ''}
     `;
@@ -323,29 +394,40 @@ function formatDate(dateString) {
 }
 
 // Actions
-async function assignToMe(ticketId) {
+// Заявка изменена другим сотрудником после открытия карточки (412)
+function handleConflict(response, ticketId) {
+    if (response.status !== 412) return false;
+    alert('Заявка уже изменена другим сотрудником, карточка обновлена');
+    showTicketDetail(ticketId);
+    syncTickets();
+    return true;
+}
+
+async function assignToMe(ticketId, version) {
     try {
         const response = await fetch(`${API_BASE_URL}/tickets/${ticketId}/assign`, {
             method: 'POST',
             headers: {
                 'Authorization': `Bearer ${authToken}`,
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'If-Match': `"${version}"`
             }
         });
 
+        if (handleConflict(response, ticketId)) return;
         if (!response.ok) {
             throw new Error('Failed to assign ticket');
         }
 
         alert('Заявка назначена на вас');
         showTicketDetail(ticketId);
-        loadTickets();
+        syncTickets();
     } catch (error) {
         alert('Ошибка назначения заявки');
     }
 }
 
-async function changeStatus(ticketId) {
+async function changeStatus(ticketId, version) {
     const newStatus = prompt('Введите новый статус (new, in_progress, resolved, closed):');
 
     if (!newStatus) return;
@@ -355,18 +437,20 @@ async function changeStatus(ticketId) {
             method: 'PATCH',
             headers: {
                 'Authorization': `Bearer ${authToken}`,
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'If-Match': `"${version}"`
             },
             body: JSON.stringify({ status: newStatus })
         });
 
+        if (handleConflict(response, ticketId)) return;
         if (!response.ok) {
             throw new Error('Failed to update status');
         }
 
         alert('Статус обновлен');
         showTicketDetail(ticketId);
-        loadTickets();
+        syncTickets();
     } catch (error) {
         alert('Ошибка обновления статуса');
     }